@@ -0,0 +1,41 @@
+"""Compare two benchmark result files: python -m benchmarks.compare old new"""
+import sys
+import json
+
+# Metrics where a larger number is better; for every other one smaller is
+HIGHER_IS_BETTER = ("docs_per_sec", "qps")
+
+
+def flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        if key in ("config", "environment", "commit", "timestamp"):
+            continue
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def main(argv=None):
+    old_path, new_path = (argv or sys.argv[1:])[:2]
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"{'metric':<32}{old.get('commit') or 'old':>14}{new.get('commit') or 'new':>14}")
+    old_flat, new_flat = flatten(old), flatten(new)
+    for name, old_value in old_flat.items():
+        new_value = new_flat.get(name)
+        if new_value is None:
+            continue
+        change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+        better = change > 0 if name.endswith(HIGHER_IS_BETTER) else change < 0
+        marker = "" if abs(change) < 5 else (" better" if better else " WORSE")
+        print(f"{name:<32}{old_value:>14.3f}{new_value:>14.3f}{change:>+9.1f}%{marker}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import random
+from typing import Iterator, List
+from src.domain.entities.document import Document
+
+# A small fixed vocabulary split into topics, so queries have real neighbours
+TOPICS = {
+    "animals": "lion tiger elephant rodent capybara whale bird wing fur herd",
+    "cooking": "rice pasta oven boil fry spice garlic sauce knife recipe",
+    "space": "planet star orbit rocket galaxy moon comet telescope gravity nasa",
+    "finance": "stock bond market price loan bank interest budget tax fund",
+    "sports": "ball goal team match score coach league player field race",
+}
+FILLER = "the a of and to in is for on with as by at from that this it".split()
+
+
+def _sentence(rng: random.Random, topic: str, length: int) -> str:
+    words = TOPICS[topic].split()
+    return " ".join(
+        rng.choice(words) if rng.random() < 0.6 else rng.choice(FILLER)
+        for _ in range(length)
+    )
+
+
+def generate_documents(
+    count: int, words_per_doc: int = 60, seed: int = 0
+) -> Iterator[Document]:
+    """Yield ``count`` deterministic synthetic documents with metadata."""
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    for i in range(count):
+        topic = topics[i % len(topics)]
+        yield Document(
+            id=f"doc-{i}",
+            content=_sentence(rng, topic, words_per_doc),
+            metadata={"topic": topic, "year": 1990 + i % 35},
+        )
+
+
+def generate_queries(count: int, words_per_query: int = 8, seed: int = 1) -> List[str]:
+    rng = random.Random(seed)
+    topics = list(TOPICS)
+    return [
+        _sentence(rng, topics[i % len(topics)], words_per_query) for i in range(count)
+    ]
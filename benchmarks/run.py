@@ -0,0 +1,219 @@
+"""Benchmark ingestion, search, rebuild, startup and the /retrieve path.
+
+Usage:
+    python -m benchmarks.run --docs 100000 --queries 1000 --index-type hnsw
+
+Results are written as JSON (see --output) and can be compared across
+commits with ``python -m benchmarks.compare old.json new.json``.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import resource
+import tempfile
+import subprocess
+import faiss
+import numpy as np
+from benchmarks.corpus import generate_documents, generate_queries
+from benchmarks.stub_embedder import StubEmbedder
+from benchmarks.stub_llm import StubLLMServer
+from src.infrastructure.services.llm_backends import OllamaBackend
+from src.application.mediator import AppMediator
+from src.infrastructure.database.vector_db import VectorDB
+from src.infrastructure.database.index_factory import INDEX_TYPES
+
+
+def percentiles(latencies_ms) -> dict:
+    latencies_ms = np.asarray(latencies_ms)
+    return {
+        "count": int(len(latencies_ms)),
+        "mean_ms": float(latencies_ms.mean()),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "p99_ms": float(np.percentile(latencies_ms, 99)),
+    }
+
+
+def timed_calls(fn, inputs) -> dict:
+    latencies = []
+    for item in inputs:
+        start = time.perf_counter()
+        fn(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+    return percentiles(latencies)
+
+
+def memory_mb() -> dict:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    peak_mb = peak / 1024 / (1024 if sys.platform == "darwin" else 1)
+    current_mb = None
+    if os.path.exists("/proc/self/statm"):
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        current_mb = pages * os.sysconf("SC_PAGE_SIZE") / 1024 / 1024
+    return {"rss_mb": current_mb, "peak_rss_mb": peak_mb}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def open_db(db_path: str, args, embedder: StubEmbedder) -> VectorDB:
+    return VectorDB(
+        db_path=db_path,
+        embedding_model=embedder,
+        embedding_model_name=f"stub-{args.dim}",
+        index_type=args.index_type,
+        persistence_mode=args.persistence,
+    )
+
+
+def run_benchmark(args) -> dict:
+    workdir = args.workdir or tempfile.mkdtemp(prefix="rag-bench-")
+    db_path = os.path.join(workdir, "index")
+    embedder = StubEmbedder(args.dim)
+    queries = generate_queries(args.queries, seed=args.seed + 1)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "config": {
+            key: value for key, value in vars(args).items() if key != "output"
+        },
+        "environment": {
+            "python": platform.python_version(),
+            "faiss": faiss.__version__,
+            "cpu_count": os.cpu_count(),
+            "platform": platform.platform(),
+        },
+    }
+
+    try:
+        start = time.perf_counter()
+        db = open_db(db_path, args, embedder)
+        results["startup_empty_s"] = time.perf_counter() - start
+
+        # Ingest in batches straight from the generator
+        start, batch = time.perf_counter(), []
+        for document in generate_documents(args.docs, seed=args.seed):
+            batch.append(document)
+            if len(batch) >= args.ingest_batch:
+                db.add_documents(batch)
+                batch = []
+        if batch:
+            db.add_documents(batch)
+        db.flush()
+        elapsed = time.perf_counter() - start
+        results["ingest"] = {"seconds": elapsed, "docs_per_sec": args.docs / elapsed}
+
+        if args.index_type != "flat":
+            start = time.perf_counter()
+            db.train_index()
+            results["train_s"] = time.perf_counter() - start
+        results["memory_after_ingest"] = memory_mb()
+        results["index_file_mb"] = os.path.getsize(db_path) / 1024 / 1024
+
+        results["query"] = timed_calls(
+            lambda q: db.get_documents(q, top_k=args.top_k), queries
+        )
+        results["query_filtered"] = timed_calls(
+            lambda q: db.get_documents(
+                q, top_k=args.top_k, filters={"topic": "space"}
+            ),
+            queries,
+        )
+        start = time.perf_counter()
+        for i in range(0, len(queries), 32):
+            db.get_documents_batch(queries[i : i + 32], top_k=args.top_k)
+        results["query_batched_qps"] = len(queries) / (time.perf_counter() - start)
+
+        if args.rebuild:
+            start = time.perf_counter()
+            db._rebuild_index()
+            results["rebuild_s"] = time.perf_counter() - start
+
+        # Cold open of the persisted index and metadata
+        start = time.perf_counter()
+        reopened = open_db(db_path, args, embedder)
+        results["startup_s"] = time.perf_counter() - start
+        del reopened
+
+        with StubLLMServer(latency_ms=args.llm_latency_ms) as server:
+            mediator = AppMediator(db, llm_backend=OllamaBackend(server.url))
+            retrieve_queries = queries[: args.retrieve_queries]
+            results["retrieve"] = timed_calls(
+                lambda q: mediator.send("retrieve_data", {"query": q}),
+                retrieve_queries,
+            )
+            mediator.executor.shutdown()
+            mediator.langchain_service.close()
+
+        results["memory_final"] = memory_mb()
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="RAG system benchmarks")
+    parser.add_argument("--docs", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--retrieve-queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--index-type", default="flat", choices=INDEX_TYPES)
+    parser.add_argument("--persistence", default="snapshot", choices=["snapshot", "wal"])
+    parser.add_argument("--ingest-batch", type=int, default=10000)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument(
+        "--no-rebuild", dest="rebuild", action="store_false", help="Skip _rebuild_index"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workdir", default=None, help="Keep index files here")
+    parser.add_argument(
+        "--output",
+        default=None,
+        help="Result file (default: benchmarks/results/<commit>-<time>.json)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    results = run_benchmark(args)
+    output = args.output or os.path.join(
+        os.path.dirname(__file__),
+        "results",
+        f"{results['commit'] or 'nocommit'}-{time.strftime('%Y%m%d-%H%M%S')}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(f"ingest:   {results['ingest']['docs_per_sec']:.0f} docs/sec")
+    for name in ("query", "query_filtered", "retrieve"):
+        row = results[name]
+        print(
+            f"{name + ':':<16}p50={row['p50_ms']:.2f}ms "
+            f"p95={row['p95_ms']:.2f}ms p99={row['p99_ms']:.2f}ms"
+        )
+    print(f"startup:  {results['startup_s']:.2f}s")
+    print(f"peak rss: {results['memory_final']['peak_rss_mb']:.0f} MB")
+    print(f"results:  {output}")
+
+
+if __name__ == "__main__":
+    main()
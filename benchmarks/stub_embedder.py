@@ -0,0 +1,38 @@
+import zlib
+import numpy as np
+
+
+class StubEmbedder:
+    """Deterministic SentenceTransformer stand-in: hashed bag-of-words vectors.
+
+    Each token maps to a fixed pseudo-random vector (seeded by its crc32), and
+    a text is the sum of its token vectors, so texts sharing words are close.
+    Orders of magnitude faster than a real model, which keeps benchmarks
+    focused on indexing, search and serving overhead.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self._token_vectors = {}
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+    def _token_vector(self, token: str) -> np.ndarray:
+        vector = self._token_vectors.get(token)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(token.encode("utf-8")))
+            vector = rng.standard_normal(self.dim).astype("float32")
+            self._token_vectors[token] = vector
+        return vector
+
+    def _embed(self, text: str) -> np.ndarray:
+        tokens = text.lower().split()
+        if not tokens:
+            return np.zeros(self.dim, dtype="float32")
+        return np.sum([self._token_vector(token) for token in tokens], axis=0)
+
+    def encode(self, texts, batch_size: int = 32, **kwargs):
+        if isinstance(texts, str):
+            return self._embed(texts)
+        return np.vstack([self._embed(text) for text in texts]).astype("float32")
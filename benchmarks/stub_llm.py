@@ -0,0 +1,64 @@
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubLLMServer:
+    """Local stand-in for Ollama's /api/generate with a fixed response time.
+
+    ``latency_ms`` passes before the first token; the response is ``tokens``
+    words, streamed as NDJSON when the request asks for ``"stream": true``.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, tokens: int = 20, port: int = 0):
+        self.latency = latency_ms / 1000
+        self.tokens = tokens
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Keep-alive, like Ollama
+            # Headers and body are separate writes; without this, Nagle plus
+            # delayed ACKs add ~40ms to every response
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                stub.requests += 1
+                time.sleep(stub.latency)
+                words = [f"token{i} " for i in range(stub.tokens)]
+                if payload.get("stream"):
+                    lines = [{"response": word, "done": False} for word in words]
+                    lines.append({"response": "", "done": True})
+                    body = "".join(json.dumps(line) + "\n" for line in lines)
+                    content_type = "application/x-ndjson"
+                else:
+                    body = json.dumps({"response": "".join(words), "done": True})
+                    content_type = "application/json"
+                data = body.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass  # Keep benchmark output clean
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._server.shutdown()
+        self._server.server_close()
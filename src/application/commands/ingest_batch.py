@@ -0,0 +1,27 @@
+# FILE: src/application/commands/ingest_batch.py
+import uuid
+from src.domain.entities.document import Document
+from src.infrastructure.services.chunker import chunk_document, create_chunker
+
+class IngestBatchCommand:
+    def __init__(self, vector_db_repository, chunker=None):
+        self.vector_db_repository = vector_db_repository
+        self.chunker = chunker or create_chunker()
+
+    def execute(self, data: dict):
+        # Convert each dict to a Document instance and add them in one call
+        documents = [
+            Document(
+                id=str(uuid.uuid4()),
+                content=item["content"],
+                metadata=item["metadata"]
+            )
+            for item in data["documents"]
+        ]
+        chunks = [
+            chunk
+            for document in documents
+            for chunk in chunk_document(document, self.chunker)
+        ]
+        self.vector_db_repository.add_documents(chunks)
+        return len(documents)
\ No newline at end of file
@@ -1,10 +1,13 @@
 # FILE: src/application/commands/ingest_data.py
 import uuid
 from src.domain.entities.document import Document
+from src.infrastructure.services.chunker import chunk_document, create_chunker
 
 class IngestDataCommand:
-    def __init__(self, vector_db_repository):
+    def __init__(self, vector_db_repository, chunker=None):
         self.vector_db_repository = vector_db_repository
+        # Long content is split so every piece fits the embedding model
+        self.chunker = chunker or create_chunker()
 
     def execute(self, data: dict):
         # Convert dict to Document instance
@@ -13,4 +16,8 @@ class IngestDataCommand:
             content=data["content"],
             metadata=data["metadata"]
         )
-        self.vector_db_repository.add_document(document)
\ No newline at end of file
+        chunks = chunk_document(document, self.chunker)
+        if len(chunks) == 1:
+            self.vector_db_repository.add_document(document)
+        else:
+            self.vector_db_repository.add_documents(chunks)
\ No newline at end of file
@@ -0,0 +1,91 @@
+# FILE: src/application/commands/ingest_file.py
+import os
+import json
+import uuid
+from typing import Iterator
+from src.domain.entities.document import Document
+from src.infrastructure.services.chunker import (
+    chunk_document,
+    count_tokens,
+    create_chunker,
+)
+
+# Text is chunked in windows of this many chunks' worth of tokens at a time
+TEXT_WINDOW_CHUNKS = 8
+
+
+class IngestFileCommand:
+    """Streams a .jsonl or plain-text file into the vector database.
+
+    The file is read line by line and chunked as it goes; chunks are written
+    in batches of ``batch_size``, so memory use does not grow with file size.
+    JSONL lines are documents (``content`` plus optional ``id``/``metadata``);
+    any other file is one document.
+    """
+
+    def __init__(self, vector_db_repository, chunker=None, batch_size=None):
+        self.vector_db_repository = vector_db_repository
+        self.chunker = chunker or create_chunker()
+        self.batch_size = batch_size or int(os.getenv("INGEST_BATCH_SIZE", "512"))
+
+    def execute(self, data: dict):
+        path = data["path"]
+        metadata = {**data.get("metadata", {}), "source": path}
+        if path.endswith(".jsonl"):
+            chunks = self._jsonl_chunks(path, metadata)
+        else:
+            chunks = self._text_chunks(path, metadata)
+
+        count, batch = 0, []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= self.batch_size:
+                self.vector_db_repository.add_documents(batch)
+                count, batch = count + len(batch), []
+        if batch:
+            self.vector_db_repository.add_documents(batch)
+            count += len(batch)
+        return count
+
+    def _jsonl_chunks(self, path: str, metadata: dict) -> Iterator[Document]:
+        with open(path, "r") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                item = json.loads(line)
+                document = Document(
+                    id=item.get("id") or str(uuid.uuid4()),
+                    content=item["content"],
+                    metadata={**metadata, **item.get("metadata", {})},
+                )
+                yield from chunk_document(document, self.chunker)
+
+    def _text_chunks(self, path: str, metadata: dict) -> Iterator[Document]:
+        parent_id = str(uuid.uuid4())
+        window_tokens = self.chunker.chunk_size * TEXT_WINDOW_CHUNKS
+        index, lines, tokens = 0, [], 0
+
+        def emit(text):
+            nonlocal index
+            chunk = Document(
+                id=f"{parent_id}:{index}",
+                content=text,
+                metadata={**metadata, "parent_id": parent_id, "chunk_index": index},
+            )
+            index += 1
+            return chunk
+
+        with open(path, "r") as f:
+            for line in f:
+                lines.append(line)
+                tokens += count_tokens(line)
+                if tokens < window_tokens:
+                    continue
+                pieces = self.chunker.split("".join(lines))
+                for piece in pieces[:-1]:
+                    yield emit(piece)
+                # The last chunk may continue in the next window; carry it over
+                lines = [pieces[-1] + "\n"] if pieces else []
+                tokens = count_tokens(lines[0]) if lines else 0
+        for piece in self.chunker.split("".join(lines)):
+            yield emit(piece)
@@ -1,8 +1,12 @@
 # FILE: src/application/mediator.py
 from abc import ABC, abstractmethod
 from src.application.commands.ingest_data import IngestDataCommand
+from src.application.commands.ingest_batch import IngestBatchCommand
 from src.application.queries.retrieve_data import RetrieveDataQuery
+from src.application.queries.retrieve_batch import RetrieveBatchQuery
 from src.infrastructure.services.langchain_service import LangChainService
+from src.infrastructure.services.executor import BoundedExecutor
+from src.infrastructure.services.context_builder import ContextBuilder
 
 
 class Mediator(ABC):
@@ -10,18 +14,49 @@ class Mediator(ABC):
     def send(self, request_type: str, data: dict):
         pass
 
+    @abstractmethod
+    async def send_async(self, request_type: str, data: dict):
+        pass
+
+    @abstractmethod
+    def stream_async(self, request_type: str, data: dict):
+        pass
+
 
 class AppMediator(Mediator):
-    def __init__(self, vector_db_repository):
+    def __init__(
+        self,
+        vector_db_repository,
+        executor=None,
+        query_batcher=None,
+        response_cache=None,
+        reranker=None,
+        llm_backend=None,
+    ):
         self.vector_db_repository = vector_db_repository
-        self.langchain_service = LangChainService(
-            vector_db_repository
-        )  # Initialize LangChainService
+        # Bounded pool for CPU-bound handler work on the async path
+        self.executor = executor or BoundedExecutor()
+        self.query_batcher = query_batcher
+        self.response_cache = response_cache
+        self.reranker = reranker
+        # The model server comes from LLM_BACKEND unless one is given
+        self.langchain_service = LangChainService(vector_db_repository, llm_backend)
+        retrieve_data = RetrieveDataQuery(
+            vector_db_repository,
+            self.langchain_service,
+            self.executor,
+            self.query_batcher,
+            self.response_cache,
+            # Near-duplicates are found with the stored vectors the search
+            # returns; encode only embeds documents that came without one
+            ContextBuilder(encode=vector_db_repository.encode),
+            self.reranker,
+        )
         self.handlers = {
             "ingest_data": IngestDataCommand(vector_db_repository),
-            "retrieve_data": RetrieveDataQuery(
-                vector_db_repository, self.langchain_service
-            ),
+            "ingest_batch": IngestBatchCommand(vector_db_repository),
+            "retrieve_data": retrieve_data,
+            "retrieve_batch": RetrieveBatchQuery(retrieve_data, self.executor),
         }
 
     def send(self, request_type: str, data: dict):
@@ -29,3 +64,20 @@ class AppMediator(Mediator):
         if not handler:
             raise ValueError(f"No handler found for request type: {request_type}")
         return handler.execute(data)
+
+    async def send_async(self, request_type: str, data: dict):
+        handler = self.handlers.get(request_type)
+        if not handler:
+            raise ValueError(f"No handler found for request type: {request_type}")
+        if hasattr(handler, "execute_async"):
+            return await handler.execute_async(data)
+        # Handlers without an async path run on the bounded executor
+        return await self.executor.run(handler.execute, data)
+
+    def stream_async(self, request_type: str, data: dict):
+        handler = self.handlers.get(request_type)
+        if not handler or not hasattr(handler, "execute_stream_async"):
+            raise ValueError(
+                f"No streaming handler found for request type: {request_type}"
+            )
+        return handler.execute_stream_async(data)
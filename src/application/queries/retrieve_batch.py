@@ -0,0 +1,182 @@
+import os
+import json
+import time
+import asyncio
+import logging
+from itertools import islice
+from typing import Iterable, Iterator, List, Tuple
+from src.application.queries.retrieve_data import RetrieveDataQuery
+
+logger = logging.getLogger(__name__)
+
+# Fields of a query line passed on to RetrieveDataQuery
+CRITERIA_FIELDS = ("filters", "mode")
+
+
+def read_jsonl_queries(
+    lines: Iterable[str], query_field: str = "query", id_field: str = "id"
+) -> Iterator[dict]:
+    """Retrieval criteria from JSONL lines, e.g. ``{"id": "q1", "query": ...}``.
+
+    ``query_field`` and ``id_field`` name the fields holding the query text
+    and the id echoed in its result, so files written for other purposes
+    (``{"request_id": ..., "body": ...}``) can be replayed as they are.
+    """
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            item = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Line {number} is not valid JSON: {e}") from e
+        if not isinstance(item, dict):
+            raise ValueError(f"Line {number} is not a JSON object")
+        criteria = {"query": item.get(query_field)}
+        if id_field in item:
+            criteria["id"] = item[id_field]
+        for name in CRITERIA_FIELDS:
+            if item.get(name):
+                criteria[name] = item[name]
+        yield criteria
+
+
+class RetrieveBatchQuery:
+    """Answers many queries, streaming each result as soon as it is ready.
+
+    Queries are read ``batch_size`` at a time and each batch is searched as
+    a matrix (see RetrieveDataQuery.get_documents_batch) off the event loop,
+    while the previous batch is still generating. At most ``max_concurrency``
+    generations run at once and at most one batch of them waits, so the
+    input is consumed as fast as the LLM keeps up rather than all at once.
+    Results come in completion order; ``index`` is the query's position.
+    """
+
+    def __init__(
+        self,
+        retrieve_query: RetrieveDataQuery,
+        executor=None,
+        batch_size=None,
+        max_concurrency=None,
+    ):
+        self.retrieve_query = retrieve_query
+        self.executor = executor
+        self.batch_size = batch_size or int(os.getenv("RETRIEVE_BATCH_SIZE", "64"))
+        self.max_concurrency = max_concurrency or int(
+            os.getenv("RETRIEVE_BATCH_CONCURRENCY", "4")
+        )
+
+    async def execute_stream_async(self, data: dict):
+        """Yield one result dict per criteria dict in ``data["queries"]``.
+
+        A result carries ``index``, the criteria's ``id`` if it had one, the
+        fields of a /retrieve result (or an ``error``) and ``timings`` in
+        milliseconds: ``search`` (the query's share of its batch search),
+        ``generate`` and ``total`` (from the batch search to the result).
+        """
+        slots = asyncio.Semaphore(self.max_concurrency)
+        pending = set()
+        queries = enumerate(data["queries"])
+        try:
+            while True:
+                batch = list(islice(queries, self.batch_size))
+                if not batch:
+                    break
+                started = time.perf_counter()
+                found, errors = await self._offload(self._search, batch)
+                for result in errors:
+                    yield result
+                search_ms = (time.perf_counter() - started) * 1000 / len(batch)
+                for (index, criteria), documents in found:
+                    pending.add(
+                        asyncio.create_task(
+                            self._answer(
+                                index, criteria, documents, slots, started, search_ms
+                            )
+                        )
+                    )
+                # Stream what finished; wait while more than a batch is queued
+                done = {task for task in pending if task.done()}
+                while len(pending) - len(done) > self.batch_size:
+                    finished, _ = await asyncio.wait(
+                        pending - done, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    done |= finished
+                pending -= done
+                for task in done:
+                    yield task.result()
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    yield task.result()
+        finally:
+            # The client went away: stop generating for it
+            for task in pending:
+                task.cancel()
+
+    def _search(
+        self, batch: List[Tuple[int, dict]]
+    ) -> Tuple[List[Tuple[Tuple[int, dict], list]], List[dict]]:
+        """Documents for the batch's valid queries, and error results."""
+        valid, errors = [], []
+        for index, criteria in batch:
+            if criteria.get("query"):
+                valid.append((index, criteria))
+            else:
+                errors.append(self._error(index, criteria, "Query field is required"))
+        if not valid:
+            return [], errors
+        try:
+            found = self.retrieve_query.get_documents_batch([c for _, c in valid])
+            return list(zip(valid, found)), errors
+        except ValueError:
+            pass
+        # A bad filter or mode fails its whole group: search one by one to
+        # report it against the queries that have it
+        results = []
+        for index, criteria in valid:
+            try:
+                documents = self.retrieve_query.get_documents_batch([criteria])[0]
+            except ValueError as e:
+                errors.append(self._error(index, criteria, str(e)))
+            else:
+                results.append(((index, criteria), documents))
+        return results, errors
+
+    async def _answer(self, index, criteria, documents, slots, started, search_ms):
+        async with slots:
+            generate_started = time.perf_counter()
+            try:
+                result = await self.retrieve_query.answer_async(
+                    criteria["query"], documents
+                )
+            except Exception as e:
+                logger.exception("Batch query %d failed: %s", index, e)
+                return self._error(index, criteria, str(e))
+            generated = time.perf_counter()
+        return {
+            **self._head(index, criteria),
+            **result,
+            "timings": {
+                "search": search_ms,
+                "generate": (generated - generate_started) * 1000,
+                "total": (generated - started) * 1000,
+            },
+        }
+
+    @staticmethod
+    def _head(index: int, criteria: dict) -> dict:
+        head = {"index": index}
+        if "id" in criteria:
+            head["id"] = criteria["id"]
+        return head
+
+    def _error(self, index: int, criteria: dict, message: str) -> dict:
+        return {**self._head(index, criteria), "error": message}
+
+    async def _offload(self, fn, *args):
+        # The batch search embeds queries: keep it off the event loop
+        if self.executor is not None:
+            return await self.executor.run(fn, *args)
+        return await asyncio.to_thread(fn, *args)
@@ -1,44 +1,300 @@
-from typing import List
-from src.infrastructure.services.langchain_service import LangChainService
+import json
+import asyncio
+import logging
+from typing import List, Optional, Tuple
+from src.infrastructure.services.langchain_service import (
+    LangChainService,
+    LLMErrorMessage,
+)
+from src.infrastructure.services.chunker import count_tokens
+from src.infrastructure.services.context_builder import ContextBuilder
+from src.infrastructure.services.metrics import REGISTRY, span
 from src.domain.entities.document import Document
 
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKENS = REGISTRY.histogram(
+    "rag_prompt_tokens",
+    "Tokens in prompts sent to the LLM",
+    buckets=(64, 128, 256, 512, 1024, 2048, 4096, 8192),
+)
+
 
 class RetrieveDataQuery:
-    def __init__(self, vector_db_repository, langchain_service: LangChainService):
+    def __init__(
+        self,
+        vector_db_repository,
+        langchain_service: LangChainService,
+        executor=None,
+        query_batcher=None,
+        response_cache=None,
+        context_builder=None,
+        reranker=None,
+    ):
         self.vector_db_repository = vector_db_repository
         self.langchain_service = langchain_service
+        # Runs the CPU-bound search in execute_async (BoundedExecutor)
+        self.executor = executor
+        # Optional QueryBatcher coalescing concurrent searches in execute_async
+        self.query_batcher = query_batcher
+        # Optional ResponseCache reusing answers for paraphrased repeat queries
+        self.response_cache = response_cache
+        # Fits the retrieved documents into the prompt's token budget
+        self.context_builder = context_builder or ContextBuilder()
+        # Optional CrossEncoderReranker: retrieve its `candidates` documents
+        # and keep the `top_k` it scores best
+        self.reranker = reranker
 
     def execute(self, criteria: dict):
-        query = criteria.get("query")  # Extract the query string
-        if not query:
-            raise ValueError("Query field is required")
+        query = self._get_query(criteria)
 
         # Step 1: Retrieve relevant documents
-        documents: List[Document] = self.vector_db_repository.get_documents(query)
+        documents: List[Document] = self._get_documents(query, criteria)
+        vectors = self._vectors(documents)
+        documents = self._to_dicts(documents)
+        if not documents:
+            return self._no_documents(query)
 
-        # Convert Document objects to dictionaries
-        documents = [{"id": doc.id, "content": doc.content} for doc in documents]
+        # Step 2: Generate a response using the retrieved documents, unless a
+        # similar query over the same documents was already answered
+        doc_ids = [doc["id"] for doc in documents]
+        response = self._cached_response(query, doc_ids)
+        context = None
+        if response is None:
+            prompt, context = self._build_prompt(query, documents, vectors)
+            with span("llm"):
+                response = self.langchain_service.generate_response(prompt)
+            self._cache_response(query, doc_ids, response)
 
-        # print the retrieved documents for debugging
-        print(f"Retrieved documents: {documents}")
+        # Step 3: Return the response, the retrieved documents and what of
+        # them went into the prompt (None when the response was cached)
+        return {
+            "query": query,
+            "retrieved_documents": documents,
+            "generated_response": response,
+            "context": context,
+        }
+
+    async def execute_async(self, criteria: dict):
+        query = self._get_query(criteria)
+
+        # Step 1: Retrieve relevant documents off the event loop
+        documents = await self._get_documents_async(query, criteria)
+        return await self.answer_async(query, documents)
+
+    async def answer_async(self, query: str, documents: List[Document]) -> dict:
+        """Steps 2 and 3 of execute_async, for documents already retrieved."""
+        vectors = self._vectors(documents)
+        documents = self._to_dicts(documents)
         if not documents:
-            return {
-                "query": query,
-                "retrieved_documents": [],
-                "generated_response": "No relevant documents found.",
-            }
+            return self._no_documents(query)
 
-        # Step 2: Generate a response using the retrieved documents
-        context = " ".join(
-            [doc["content"] for doc in documents]
-        )  # Combine document content
-        response = self.langchain_service.generate_response(
-            f"Query: {query}\nContext: {context}"
-        )
+        # Step 2: Generate a response without blocking while the LLM works
+        doc_ids = [doc["id"] for doc in documents]
+        response = await self._cached_response_async(query, doc_ids)
+        context = None
+        if response is None:
+            # Deduplication may embed documents: keep it off the event loop
+            prompt, context = await self._offload(
+                self._build_prompt, query, documents, vectors
+            )
+            with span("llm"):
+                response = await self.langchain_service.generate_response_async(prompt)
+            await self._cache_response_async(query, doc_ids, response)
 
         # Step 3: Return the response and the retrieved documents
         return {
             "query": query,
             "retrieved_documents": documents,
             "generated_response": response,
+            "context": context,
+        }
+
+    def execute_stream(self, criteria: dict):
+        """Yield the retrieved documents first, then response tokens as they arrive.
+
+        Events are dicts: ``{"event": "documents", "data": [...]}``, one
+        ``{"event": "token", "data": str}`` per token and a final
+        ``{"event": "done", "data": None}``.
+        """
+        query = self._get_query(criteria)
+        documents = self._get_documents(query, criteria)
+        vectors = self._vectors(documents)
+        documents = self._to_dicts(documents)
+        yield {"event": "documents", "data": documents}
+        doc_ids = [doc["id"] for doc in documents]
+        if not documents:
+            response = self._no_documents(query)["generated_response"]
+        else:
+            response = self._cached_response(query, doc_ids)
+        if response is not None:
+            yield {"event": "token", "data": response}
+        else:
+            prompt, _ = self._build_prompt(query, documents, vectors)
+            tokens, failed = [], False
+            with span("llm"):
+                for token in self.langchain_service.generate_response_stream(prompt):
+                    tokens.append(token)
+                    failed = failed or isinstance(token, LLMErrorMessage)
+                    yield {"event": "token", "data": token}
+            # A stream that broke off is a partial answer: never serve it again
+            if not failed:
+                self._cache_response(query, doc_ids, "".join(tokens))
+        yield {"event": "done", "data": None}
+
+    async def execute_stream_async(self, criteria: dict):
+        # Async generator variant of execute_stream
+        query = self._get_query(criteria)
+        documents = await self._get_documents_async(query, criteria)
+        vectors = self._vectors(documents)
+        documents = self._to_dicts(documents)
+        yield {"event": "documents", "data": documents}
+        doc_ids = [doc["id"] for doc in documents]
+        if not documents:
+            response = self._no_documents(query)["generated_response"]
+        else:
+            response = await self._cached_response_async(query, doc_ids)
+        if response is not None:
+            yield {"event": "token", "data": response}
+        else:
+            prompt, _ = await self._offload(
+                self._build_prompt, query, documents, vectors
+            )
+            tokens, failed = [], False
+            stream = self.langchain_service.generate_response_stream_async(prompt)
+            with span("llm"):
+                async for token in stream:
+                    tokens.append(token)
+                    failed = failed or isinstance(token, LLMErrorMessage)
+                    yield {"event": "token", "data": token}
+            if not failed:
+                await self._cache_response_async(query, doc_ids, "".join(tokens))
+        yield {"event": "done", "data": None}
+
+    def _get_documents(self, query: str, criteria: dict) -> List[Document]:
+        # Optional metadata filters, e.g. {"category": "animals"}, and
+        # retrieval mode ("dense", "lexical" or "hybrid"; default RETRIEVAL_MODE)
+        options = {
+            name: criteria[name]
+            for name in ("filters", "mode")
+            if criteria.get(name)
         }
+        if self.reranker is None:
+            return self.vector_db_repository.get_documents(query, **options)
+        documents = self.vector_db_repository.get_documents(
+            query, top_k=self.reranker.candidates, **options
+        )
+        return self.reranker.rerank(query, documents)
+
+    def get_documents_batch(self, criteria_list: List[dict]) -> List[List[Document]]:
+        """Documents for many queries, searched as one matrix per distinct
+        filters and mode (one encode call and one index search each)."""
+        groups = {}
+        for i, criteria in enumerate(criteria_list):
+            key = (
+                json.dumps(criteria.get("filters") or None, sort_keys=True),
+                criteria.get("mode"),
+            )
+            groups.setdefault(key, []).append(i)
+
+        results = [None] * len(criteria_list)
+        for indexes in groups.values():
+            first = criteria_list[indexes[0]]
+            options = {
+                name: first[name] for name in ("filters", "mode") if first.get(name)
+            }
+            if self.reranker is not None:
+                options["top_k"] = self.reranker.candidates
+            queries = [criteria_list[i]["query"] for i in indexes]
+            found = self.vector_db_repository.get_documents_batch(queries, **options)
+            for i, query, documents in zip(indexes, queries, found):
+                if self.reranker is not None:
+                    documents = self.reranker.rerank(query, documents)
+                results[i] = documents
+        return results
+
+    async def _get_documents_async(self, query: str, criteria: dict) -> List[Document]:
+        # Filtered searches and explicit modes cannot share a batch with
+        # other queries
+        batchable = not criteria.get("filters") and not criteria.get("mode")
+        if self.query_batcher is None or not batchable:
+            return await self._offload(self._get_documents, query, criteria)
+        if self.reranker is None:
+            return await self.query_batcher.get_documents_async(query)
+        documents = await self.query_batcher.get_documents_async(
+            query, self.reranker.candidates
+        )
+        # The cross-encoder is CPU-bound too
+        return await self._offload(self.reranker.rerank, query, documents)
+
+    async def _offload(self, fn, *args):
+        # CPU-bound work (embedding, search) runs off the event loop
+        if self.executor is not None:
+            return await self.executor.run(fn, *args)
+        return await asyncio.to_thread(fn, *args)
+
+    def _cached_response(self, query: str, doc_ids: List[str]):
+        if self.response_cache is None:
+            return None
+        return self.response_cache.get(query, doc_ids)
+
+    def _cache_response(self, query: str, doc_ids: List[str], response: str):
+        # Error messages are returned as text; never serve them again
+        if self.response_cache is None or response.startswith(
+            LangChainService.ERROR_PREFIXES
+        ):
+            return
+        self.response_cache.put(query, doc_ids, response)
+
+    async def _cached_response_async(self, query: str, doc_ids: List[str]):
+        # Cache lookups embed the query, so keep them off the event loop too
+        if self.response_cache is None:
+            return None
+        return await self._offload(self._cached_response, query, doc_ids)
+
+    async def _cache_response_async(
+        self, query: str, doc_ids: List[str], response: str
+    ):
+        if self.response_cache is not None:
+            await self._offload(self._cache_response, query, doc_ids, response)
+
+    @staticmethod
+    def _get_query(criteria: dict) -> str:
+        query = criteria.get("query")  # Extract the query string
+        if not query:
+            raise ValueError("Query field is required")
+        return query
+
+    @staticmethod
+    def _to_dicts(documents: List[Document]) -> List[dict]:
+        # Convert Document objects to dictionaries
+        documents = [{"id": doc.id, "content": doc.content} for doc in documents]
+        logger.debug("Retrieved documents: %s", [doc["id"] for doc in documents])
+        return documents
+
+    @staticmethod
+    def _vectors(documents: List[Document]) -> list:
+        # Stored embeddings the search attached, reused for deduplication
+        return [doc.embedding for doc in documents]
+
+    @staticmethod
+    def _no_documents(query: str) -> dict:
+        return {
+            "query": query,
+            "retrieved_documents": [],
+            "generated_response": "No relevant documents found.",
+            "context": None,
+        }
+
+    def _build_prompt(
+        self, query: str, documents: List[dict], vectors: Optional[list] = None
+    ) -> Tuple[str, dict]:
+        """The prompt, and a report of the documents used and its token count."""
+        with span("prompt_build"):
+            # Relevant, non-duplicate document content within the token budget
+            context, report = self.context_builder.build(documents, vectors)
+            prompt = f"Query: {query}\nContext: {context}"
+        report["prompt_tokens"] = count_tokens(prompt)
+        PROMPT_TOKENS.observe(report["prompt_tokens"])
+        logger.debug("Prompt context: %s", report)
+        return prompt, report
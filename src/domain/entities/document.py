@@ -1,9 +1,11 @@
 # FILE: src/domain/entities/document.py
 class Document:
-    def __init__(self, id: str, content: str, metadata: dict):
+    def __init__(self, id: str, content: str, metadata: dict, embedding=None):
         self.id = id
         self.content = content
         self.metadata = metadata
+        # Stored vector attached by searches, so it is never re-computed
+        self.embedding = embedding
 
     def __repr__(self):
         return f"Document(id={self.id}, content={self.content}, metadata={self.metadata})"
\ No newline at end of file
@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import List
+from typing import List, Optional
 from ..entities.document import Document
 
 class VectorDBRepository(ABC):
@@ -8,9 +8,33 @@ class VectorDBRepository(ABC):
         pass
 
     @abstractmethod
-    def get_documents(self, criteria: dict) -> List[Document]:
+    def add_documents(self, documents: List[Document]) -> None:
+        pass
+
+    @abstractmethod
+    def get_documents(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[dict] = None,
+        mode: Optional[str] = None,
+    ) -> List[Document]:
+        pass
+
+    @abstractmethod
+    def get_documents_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filters: Optional[dict] = None,
+        mode: Optional[str] = None,
+    ) -> List[List[Document]]:
         pass
 
     @abstractmethod
     def delete_document(self, document_id: str) -> None:
+        pass
+
+    @abstractmethod
+    def delete_documents(self, document_ids: List[str]) -> None:
         pass
\ No newline at end of file
@@ -0,0 +1,95 @@
+import re
+import math
+import heapq
+from typing import Iterable, List, Optional, Tuple
+
+# Words, plus compounds such as error codes, versions and paths
+# ("ERR-4012", "v2.1.3", "api/v1") kept whole so they match exactly
+TOKEN_PATTERN = re.compile(r"\w+(?:[-./:]\w+)*")
+COMPOUND_SEPARATORS = re.compile(r"[-./:]")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased terms; compounds also yield their parts: "err-4012", "err", "4012"."""
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = COMPOUND_SEPARATORS.split(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 inverted index over ``Document.content``, keyed by row id.
+
+    Maintained incrementally like MetadataIndex: ``add``/``remove`` take the
+    same (row ids, records) pairs as the metadata store. Scores use
+    ``idf = log(1 + (N - df + 0.5) / (df + 0.5))`` and the usual ``k1``
+    term-frequency saturation and ``b`` length normalization.
+    """
+
+    def __init__(self, k1: float = 1.2, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings = {}  # term -> row id -> term frequency
+        self._lengths = {}  # row id -> number of tokens
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._lengths)
+
+    def add(self, row_ids: Iterable[int], records: Iterable[dict]) -> None:
+        for row_id, record in zip(row_ids, records):
+            row_id = int(row_id)
+            tokens = tokenize(record["content"])
+            self._lengths[row_id] = len(tokens)
+            self._total_length += len(tokens)
+            for token in tokens:
+                postings = self._postings.setdefault(token, {})
+                postings[row_id] = postings.get(row_id, 0) + 1
+
+    def remove(self, row_ids: Iterable[int], records: Iterable[dict]) -> None:
+        for row_id, record in zip(row_ids, records):
+            row_id = int(row_id)
+            if record is None or row_id not in self._lengths:
+                continue
+            self._total_length -= self._lengths.pop(row_id)
+            for token in set(tokenize(record["content"])):
+                postings = self._postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(row_id, None)
+                if not postings:
+                    del self._postings[token]
+
+    def search(
+        self, query: str, top_k: int, allowed: Optional[set] = None
+    ) -> List[Tuple[float, int]]:
+        """(score, row id) of the best matches, highest first.
+
+        ``allowed`` restricts the result to those row ids (metadata filters).
+        """
+        if not self._lengths:
+            return []
+        count = len(self._lengths)
+        average_length = self._total_length / count or 1.0
+        scores = {}
+        for token in set(tokenize(query)):
+            postings = self._postings.get(token)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for row_id, tf in postings.items():
+                if allowed is not None and row_id not in allowed:
+                    continue
+                length = self._lengths[row_id] / average_length
+                saturation = tf + self.k1 * (1 - self.b + self.b * length)
+                scores[row_id] = (
+                    scores.get(row_id, 0.0) + idf * tf * (self.k1 + 1) / saturation
+                )
+        best = heapq.nlargest(
+            top_k, scores.items(), key=lambda item: (item[1], -item[0])
+        )
+        return [(score, row_id) for row_id, score in best]
@@ -0,0 +1,135 @@
+import sqlite3
+import hashlib
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import List, Optional
+from src.infrastructure.database.metadata_store import in_batches
+
+
+class EmbeddingCache:
+    """Content-hash -> vector cache: in-memory LRU in front of optional SQLite storage."""
+
+    def __init__(
+        self, model_name: str, max_entries: int = 10000, path: Optional[str] = None
+    ):
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.path = path
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        if path:
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._conn.commit()
+
+    def key(self, text: str) -> str:
+        # Vectors from different models must never be mixed up
+        data = f"{self.model_name}\0{text}".encode("utf-8")
+        return hashlib.sha256(data).hexdigest()
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        keys = [self.key(text) for text in texts]
+        results = [None] * len(keys)
+        on_disk = []
+        with self._lock:
+            for i, key in enumerate(keys):
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    results[i] = vector
+                    self.memory_hits += 1
+                else:
+                    on_disk.append(i)
+
+            if on_disk and self._conn is not None:
+                wanted = list({keys[i] for i in on_disk})
+                found = {}
+                for batch in in_batches(wanted):
+                    placeholders = ",".join("?" * len(batch))
+                    found.update(
+                        self._conn.execute(
+                            "SELECT key, vector FROM embeddings "
+                            f"WHERE key IN ({placeholders})",
+                            batch,
+                        ).fetchall()
+                    )
+                for i in on_disk:
+                    blob = found.get(keys[i])
+                    if blob is not None:
+                        results[i] = np.frombuffer(blob, dtype="float32")
+                        self._remember(keys[i], results[i])
+                        self.disk_hits += 1
+
+            self.misses += sum(1 for vector in results if vector is None)
+        return results
+
+    def put_many(self, texts: List[str], vectors: np.ndarray) -> None:
+        keys = [self.key(text) for text in texts]
+        vectors = np.asarray(vectors, dtype="float32")
+        with self._lock:
+            for key, vector in zip(keys, vectors):
+                self._remember(key, vector)
+            if self._conn is not None:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embeddings VALUES (?, ?)",
+                    [(key, vector.tobytes()) for key, vector in zip(keys, vectors)],
+                )
+                self._conn.commit()
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if self.max_entries <= 0:
+            return
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+        }
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+def normalize_vectors(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0  # Leave all-zero embeddings untouched
+    return (vectors / norms).astype("float32")
+
+
+def encode_with_cache(
+    model, cache: EmbeddingCache, texts: List[str], batch_size: int
+) -> np.ndarray:
+    """Embed texts in batches and return L2-normalized float32 vectors."""
+    texts = list(texts)
+    cached = cache.get_many(texts)
+
+    # Only unique texts that missed the cache go through the model
+    missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+    if missing:
+        vectors = model.encode(missing, batch_size=batch_size)
+        vectors = np.asarray(vectors, dtype="float32").reshape(len(missing), -1)
+        vectors = normalize_vectors(vectors)
+        cache.put_many(missing, vectors)
+        encoded = dict(zip(missing, vectors))
+        cached = [encoded[t] if v is None else v for t, v in zip(texts, cached)]
+
+    return np.vstack(cached).astype("float32")
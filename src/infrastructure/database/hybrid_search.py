@@ -0,0 +1,130 @@
+import os
+from typing import Callable, List, Optional, Tuple
+from src.domain.entities.document import Document
+from src.infrastructure.services.metrics import span
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+FUSION_METHODS = ("rrf", "weighted")
+
+# Hits per query: (distance, Document) for dense, (score, Document) for lexical
+Hits = List[Tuple[float, Document]]
+
+
+def reciprocal_rank_fusion(rankings: List[Hits], k: int = 60) -> Hits:
+    """(score, Document) by summed ``1 / (k + rank)`` over the rankings.
+
+    Only ranks matter, so dense distances and BM25 scores need no common scale.
+    """
+    scores, documents = {}, {}
+    for hits in rankings:
+        for rank, (_, document) in enumerate(hits, start=1):
+            scores[document.id] = scores.get(document.id, 0.0) + 1.0 / (k + rank)
+            documents[document.id] = document
+    return sorted(
+        ((score, documents[doc_id]) for doc_id, score in scores.items()),
+        key=lambda hit: -hit[0],
+    )
+
+
+def weighted_fusion(dense: Hits, lexical: Hits, dense_weight: float = 0.5) -> Hits:
+    """(score, Document) by a weighted sum of min-max normalized scores.
+
+    Dense distances are flipped so that 1 is the nearest hit; a document
+    missing from one ranking scores 0 there.
+    """
+
+    def normalized(hits, lower_is_better):
+        if not hits:
+            return {}
+        values = [value for value, _ in hits]
+        low, high = min(values), max(values)
+        spread = high - low
+        result = {}
+        for value, document in hits:
+            score = (value - low) / spread if spread else 1.0
+            if lower_is_better and spread:
+                score = 1.0 - score
+            result[document.id] = score
+        return result
+
+    dense_scores = normalized(dense, lower_is_better=True)
+    lexical_scores = normalized(lexical, lower_is_better=False)
+    documents = {document.id: document for _, document in dense + lexical}
+    return sorted(
+        (
+            (
+                dense_weight * dense_scores.get(doc_id, 0.0)
+                + (1 - dense_weight) * lexical_scores.get(doc_id, 0.0),
+                document,
+            )
+            for doc_id, document in documents.items()
+        ),
+        key=lambda hit: -hit[0],
+    )
+
+
+class HybridRetrieval:
+    """Chooses dense, lexical (BM25) or fused retrieval for a batch of queries.
+
+    The default mode is ``RETRIEVAL_MODE`` and can be overridden per call.
+    Hybrid mode takes ``candidates`` hits from each retriever and fuses them
+    with reciprocal rank fusion (``rrf``, constant ``rrf_k``) or a weighted
+    sum of normalized scores (``weighted``, dense share ``dense_weight``).
+    """
+
+    def __init__(
+        self,
+        mode: Optional[str] = None,
+        fusion: Optional[str] = None,
+        rrf_k: Optional[int] = None,
+        dense_weight: Optional[float] = None,
+        candidates: Optional[int] = None,
+    ):
+        self.mode = self.check_mode(mode or os.getenv("RETRIEVAL_MODE", "dense"))
+        self.fusion = fusion or os.getenv("HYBRID_FUSION", "rrf")
+        if self.fusion not in FUSION_METHODS:
+            raise ValueError(
+                f"Unknown fusion method: {self.fusion}. Expected one of {FUSION_METHODS}."
+            )
+        self.rrf_k = rrf_k or int(os.getenv("HYBRID_RRF_K", "60"))
+        self.dense_weight = (
+            dense_weight
+            if dense_weight is not None
+            else float(os.getenv("HYBRID_DENSE_WEIGHT", "0.5"))
+        )
+        self.candidates = candidates or int(os.getenv("HYBRID_CANDIDATES", "50"))
+
+    @staticmethod
+    def check_mode(mode: str) -> str:
+        if mode not in RETRIEVAL_MODES:
+            raise ValueError(
+                f"Unknown retrieval mode: {mode}. Expected one of {RETRIEVAL_MODES}."
+            )
+        return mode
+
+    def retrieve(
+        self,
+        top_k: int,
+        mode: Optional[str],
+        dense: Callable[[int], List[Hits]],
+        lexical: Callable[[int], List[Hits]],
+    ) -> List[List[Document]]:
+        """Documents per query; ``dense``/``lexical`` return hits for a depth."""
+        mode = self.check_mode(mode or self.mode)
+        if mode == "dense":
+            results = dense(top_k)
+        elif mode == "lexical":
+            results = lexical(top_k)
+        else:
+            depth = max(top_k, self.candidates)
+            dense_hits, lexical_hits = dense(depth), lexical(depth)
+            with span("fusion"):
+                results = [
+                    self.fuse(d, l)[:top_k] for d, l in zip(dense_hits, lexical_hits)
+                ]
+        return [[document for _, document in hits] for hits in results]
+
+    def fuse(self, dense: Hits, lexical: Hits) -> Hits:
+        if self.fusion == "weighted":
+            return weighted_fusion(dense, lexical, self.dense_weight)
+        return reciprocal_rank_fusion([dense, lexical], self.rrf_k)
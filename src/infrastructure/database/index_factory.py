@@ -0,0 +1,309 @@
+import time
+import faiss
+import numpy as np
+from typing import List, Optional
+
+INDEX_TYPES = ("flat", "sq_fp16", "sq_int8", "pq", "ivf_flat", "ivf_pq", "hnsw")
+# Index types that store compressed codes instead of the float32 vectors
+LOSSY_INDEX_TYPES = ("sq_fp16", "sq_int8", "pq", "ivf_pq")
+SCALAR_QUANTIZERS = {
+    "sq_fp16": faiss.ScalarQuantizer.QT_fp16,
+    "sq_int8": faiss.ScalarQuantizer.QT_8bit,
+}
+
+
+def build_index(
+    index_type: str,
+    embedding_dim: int,
+    nlist: int = 1024,
+    pq_m: int = 16,
+    pq_bits: int = 8,
+    hnsw_m: int = 32,
+    ef_construction: int = 200,
+):
+    """Create an empty index of the given type that accepts add_with_ids().
+
+    Flat-layout indexes (flat, sq_fp16, sq_int8, pq) and HNSW are wrapped in
+    an ID map. IVF indexes store ids in their inverted lists natively;
+    wrapping them would break remove_ids().
+    """
+    if index_type == "flat":
+        base = faiss.IndexFlatL2(embedding_dim)
+    elif index_type in SCALAR_QUANTIZERS:
+        # 2 bytes (fp16) or 1 byte (int8, trained per-dimension ranges) per dim
+        base = faiss.IndexScalarQuantizer(
+            embedding_dim, SCALAR_QUANTIZERS[index_type], faiss.METRIC_L2
+        )
+    elif index_type == "pq":
+        base = faiss.IndexPQ(embedding_dim, pq_m, pq_bits)
+    elif index_type == "ivf_flat":
+        quantizer = faiss.IndexFlatL2(embedding_dim)
+        return faiss.IndexIVFFlat(quantizer, embedding_dim, nlist)
+    elif index_type == "ivf_pq":
+        quantizer = faiss.IndexFlatL2(embedding_dim)
+        return faiss.IndexIVFPQ(quantizer, embedding_dim, nlist, pq_m, pq_bits)
+    elif index_type == "hnsw":
+        base = faiss.IndexHNSWFlat(embedding_dim, hnsw_m)
+        base.hnsw.efConstruction = ef_construction
+    else:
+        raise ValueError(
+            f"Unknown index type: {index_type}. Expected one of {INDEX_TYPES}."
+        )
+    return faiss.IndexIDMap2(base)
+
+
+def base_index(index):
+    """The index doing the actual search, without the ID map wrapper."""
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.downcast_index(index.index)
+    return faiss.downcast_index(index)
+
+
+def index_type_of(index) -> str:
+    """Inverse of build_index for an index read back from disk."""
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(base, faiss.IndexIVFFlat):
+        return "ivf_flat"
+    if isinstance(base, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(base, faiss.IndexScalarQuantizer):
+        for index_type, qtype in SCALAR_QUANTIZERS.items():
+            if base.sq.qtype == qtype:
+                return index_type
+    if isinstance(base, faiss.IndexPQ):
+        return "pq"
+    return "flat"
+
+
+def min_training_vectors(index_type: str, params: dict) -> int:
+    """Vectors needed to train an index of this type (0 if it needs none)."""
+    if index_type in ("ivf_flat", "ivf_pq"):
+        return params.get("nlist", 1024)
+    if index_type == "pq":
+        # k-means needs at least one vector per centroid of each sub-quantizer
+        return 2 ** params.get("pq_bits", 8)
+    if index_type == "sq_int8":
+        return 1
+    return 0
+
+
+def set_search_parameters(
+    index, nprobe: Optional[int] = None, ef_search: Optional[int] = None
+) -> None:
+    """Apply runtime recall/latency knobs; ignored by index types without them."""
+    base = base_index(index)
+    if nprobe is not None and isinstance(base, faiss.IndexIVF):
+        base.nprobe = nprobe
+    if ef_search is not None and isinstance(base, faiss.IndexHNSW):
+        base.hnsw.efSearch = ef_search
+
+
+def search_parameters(index, selector, nprobe: Optional[int] = None):
+    """SearchParameters carrying an IDSelector plus the index's current knobs.
+
+    ``nprobe`` overrides the IVF setting for this search only.
+    """
+    base = base_index(index)
+    if isinstance(base, faiss.IndexIVF):
+        return faiss.SearchParametersIVF(sel=selector, nprobe=nprobe or base.nprobe)
+    if isinstance(base, faiss.IndexHNSW):
+        return faiss.SearchParametersHNSW(sel=selector, efSearch=base.hnsw.efSearch)
+    return faiss.SearchParameters(sel=selector)
+
+
+def stored_ids(index) -> np.ndarray:
+    """Ids of every vector in an index created by build_index()."""
+    if isinstance(index, faiss.IndexIDMap2):
+        return faiss.vector_to_array(index.id_map)
+    invlists = index.invlists
+    ids = [
+        faiss.rev_swig_ptr(invlists.get_ids(i), invlists.list_size(i)).copy()
+        for i in range(invlists.nlist)
+    ]
+    return np.concatenate(ids) if ids else np.zeros(0, dtype="int64")
+
+
+def reconstruct_all(index):
+    """Return (row_ids, vectors) stored in an index created by build_index().
+
+    Exact for flat, HNSW and IVF-Flat; LOSSY_INDEX_TYPES return lossy
+    reconstructions.
+    """
+    if isinstance(index, faiss.IndexIDMap2):
+        base = base_index(index)
+        vectors = base.reconstruct_n(0, base.ntotal)
+        return stored_ids(index), vectors.reshape(-1, index.d)
+
+    # IVF: read vectors straight from the inverted lists, which keep the ids
+    invlists = index.invlists
+    row_ids, vectors = [], []
+    for i in range(invlists.nlist):
+        size = invlists.list_size(i)
+        if not size:
+            continue
+        row_ids.append(faiss.rev_swig_ptr(invlists.get_ids(i), size).copy())
+        codes = faiss.rev_swig_ptr(invlists.get_codes(i), size * invlists.code_size)
+        codes = codes.copy().reshape(size, invlists.code_size)
+        if isinstance(index, faiss.IndexIVFPQ):
+            decoded = index.pq.decode(codes)
+            if index.by_residual:
+                decoded += index.quantizer.reconstruct(i)
+        else:
+            decoded = codes.view("float32")
+        vectors.append(decoded)
+    if not row_ids:
+        return np.zeros(0, dtype="int64"), np.zeros((0, index.d), dtype="float32")
+    return np.concatenate(row_ids), np.vstack(vectors)
+
+
+def rerank_exact(
+    query_vectors: np.ndarray,
+    distances: np.ndarray,
+    indices: np.ndarray,
+    candidate_vectors: np.ndarray,
+    found: np.ndarray,
+    top_k: int,
+):
+    """Re-score approximate hits with exact L2 distances and keep the top_k.
+
+    ``candidate_vectors``/``found`` hold the full-precision vector of every
+    entry of ``indices`` (row-major); hits without one keep their
+    approximate distance. Padding (-1) stays last.
+    """
+    exact = distances.astype("float32").copy()
+    k = indices.shape[1]
+    queries = np.repeat(query_vectors, k, axis=0)
+    scored = (indices.ravel() >= 0) & found
+    diff = candidate_vectors[scored] - queries[scored]
+    exact.ravel()[scored] = np.einsum("ij,ij->i", diff, diff)
+    exact[indices < 0] = np.inf
+    order = np.argsort(exact, axis=1, kind="stable")[:, :top_k]
+    reranked = np.take_along_axis(indices, order, axis=1)
+    exact = np.take_along_axis(exact, order, axis=1)
+    exact[reranked < 0] = np.finfo("float32").max  # As FAISS pads
+    return exact, reranked
+
+
+def index_bytes(index) -> int:
+    """Size of the serialized index: its codes, ids and structures in memory."""
+    return int(faiss.serialize_index(index).size)
+
+
+def storage_report(
+    row_ids: np.ndarray,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    index_types,
+    top_k: int = 5,
+    rerank_factor: int = 4,
+    index_params: Optional[dict] = None,
+) -> List[dict]:
+    """Memory and recall@top_k of each index type built from exact vectors.
+
+    Every row reports the measured index size relative to the float32 flat
+    index, recall without re-ranking, and recall when ``top_k *
+    rerank_factor`` candidates are re-scored against ``vectors``.
+    """
+    lookup = dict(zip(row_ids.tolist(), range(len(row_ids))))
+    exact_index = build_index("flat", vectors.shape[1])
+    exact_index.add_with_ids(vectors, row_ids)
+    _, truth = exact_index.search(queries, top_k)
+    flat_bytes = index_bytes(exact_index)
+
+    def recall(found):
+        return float(
+            np.mean(
+                [
+                    len(set(expected[expected >= 0]) & set(actual[actual >= 0]))
+                    / max(int((expected >= 0).sum()), 1)
+                    for expected, actual in zip(truth, found)
+                ]
+            )
+        )
+
+    report = []
+    for index_type in index_types:
+        index = build_index(index_type, vectors.shape[1], **(index_params or {}))
+        if not index.is_trained:
+            index.train(vectors)
+        index.add_with_ids(vectors, row_ids)
+        start = time.perf_counter()
+        distances, indices = index.search(queries, top_k * max(rerank_factor, 1))
+        search_ms = (time.perf_counter() - start) * 1000 / max(len(queries), 1)
+        positions = np.array([lookup.get(int(i), 0) for i in indices.ravel()])
+        _, reranked = rerank_exact(
+            queries,
+            distances,
+            indices,
+            vectors[positions],
+            indices.ravel() >= 0,
+            top_k,
+        )
+        size = index_bytes(index)
+        report.append(
+            {
+                "index_type": index_type,
+                "bytes": size,
+                "bytes_per_vector": size / max(len(vectors), 1),
+                "memory_ratio": size / flat_bytes,
+                "recall": recall(indices[:, :top_k]),
+                "recall_reranked": recall(reranked),
+                "search_ms": search_ms,
+            }
+        )
+    return report
+
+
+def recall_report(
+    index,
+    row_ids: np.ndarray,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    top_k: int = 5,
+    grid: Optional[List[dict]] = None,
+) -> List[dict]:
+    """Measure recall@top_k and per-query latency against an exact flat baseline.
+
+    ``row_ids``/``vectors`` are the exact stored vectors the baseline is built
+    from. Each entry of ``grid`` is a dict of set_search_parameters() arguments,
+    e.g. ``{"nprobe": 16}`` or ``{"ef_search": 64}``.
+    """
+    baseline = faiss.IndexFlatL2(vectors.shape[1])
+    baseline.add(vectors)
+
+    def run(target, ids=None):
+        latencies, labels = [], []
+        for query in queries:
+            start = time.perf_counter()
+            _, found = target.search(query.reshape(1, -1), top_k)
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = found[0][found[0] >= 0]
+            labels.append(found if ids is None else ids[found])
+        return np.array(latencies), labels
+
+    flat_latencies, truth = run(baseline, row_ids)
+    report = [_report_row("flat", {}, 1.0, flat_latencies)]
+
+    for params in grid or [{}]:
+        set_search_parameters(index, **params)
+        latencies, found = run(index)
+        recall = np.mean(
+            [
+                len(set(expected) & set(actual)) / max(len(expected), 1)
+                for expected, actual in zip(truth, found)
+            ]
+        )
+        report.append(_report_row(index_type_of(index), params, recall, latencies))
+    return report
+
+
+def _report_row(index_type: str, params: dict, recall: float, latencies) -> dict:
+    return {
+        "index_type": index_type,
+        "params": params,
+        "recall": float(recall),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+    }
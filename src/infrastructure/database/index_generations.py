@@ -0,0 +1,94 @@
+import os
+import glob
+import json
+import time
+import shutil
+import logging
+import faiss
+from typing import Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Flat and HNSW codes are mapped with IO_FLAG_MMAP_IFC (faiss >= 1.8), IVF
+# inverted lists with IO_FLAG_MMAP; each flag rejects the other layout
+MMAP_FLAGS = [
+    getattr(faiss, "IO_FLAG_MMAP_IFC", None),
+    faiss.IO_FLAG_MMAP,
+]
+
+
+def read_index_mmap(path: str):
+    """Open an index read-only with its vectors memory-mapped from ``path``.
+
+    Mapped pages live in the OS page cache, so every process serving the same
+    file shares one copy. Falls back to a normal read for other layouts.
+    """
+    for flag in MMAP_FLAGS:
+        if flag is None:
+            continue
+        try:
+            return faiss.read_index(path, flag | faiss.IO_FLAG_READ_ONLY)
+        except RuntimeError:
+            continue
+    logger.warning("Index %s cannot be memory-mapped; reading it into memory", path)
+    return faiss.read_index(path)
+
+
+class IndexGenerations:
+    """Immutable, numbered copies of the writer's index for read-only replicas.
+
+    ``publish`` hard-links the index file just written (no copy) as
+    ``{db_path}.gen{N}`` and then atomically replaces the manifest
+    ``{db_path}.serving.json``, so readers see either the old generation or
+    the new one, never a mix. The newest ``keep`` generations are kept; on
+    POSIX a reader still mapping an older, deleted file keeps its pages.
+    """
+
+    def __init__(self, db_path: str, keep: Optional[int] = None):
+        self.db_path = db_path
+        self.manifest_path = f"{db_path}.serving.json"
+        self.keep = keep or int(os.getenv("VECTOR_DB_KEEP_GENERATIONS", "3"))
+
+    def generation_path(self, generation: int) -> str:
+        return f"{self.db_path}.gen{generation}"
+
+    def current(self) -> Optional[dict]:
+        if not os.path.exists(self.manifest_path):
+            return None
+        with open(self.manifest_path, "r") as f:
+            return json.load(f)
+
+    def publish(self, tombstones: Iterable[int] = ()) -> int:
+        """Publish the index file at ``db_path`` as the next generation.
+
+        ``db_path`` must be replaced (written elsewhere and renamed), never
+        rewritten in place, or the hard-linked generation changes with it.
+        """
+        current = self.current()
+        generation = current["generation"] + 1 if current else 1
+        path = self.generation_path(generation)
+        if os.path.exists(path):
+            os.remove(path)  # Left over from an interrupted publish
+        try:
+            os.link(self.db_path, path)
+        except OSError:
+            shutil.copyfile(self.db_path, path)  # No hard links on this filesystem
+
+        manifest = {
+            "generation": generation,
+            "index_path": path,
+            "tombstones": sorted(int(row_id) for row_id in tombstones),
+            "published_at": time.time(),
+        }
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, self.manifest_path)
+        self._prune(generation)
+        return generation
+
+    def _prune(self, newest: int) -> None:
+        for path in glob.glob(f"{glob.escape(self.db_path)}.gen*"):
+            suffix = path[len(f"{self.db_path}.gen") :]
+            if suffix.isdigit() and int(suffix) <= newest - self.keep:
+                os.remove(path)
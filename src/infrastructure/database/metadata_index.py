@@ -0,0 +1,161 @@
+import bisect
+import numpy as np
+from typing import Iterable, Optional
+
+RANGE_OPERATORS = ("$gt", "$gte", "$lt", "$lte")
+OPERATORS = ("$eq", "$in") + RANGE_OPERATORS
+
+
+def _family(value) -> Optional[str]:
+    # Range filters compare numbers with numbers and strings with strings
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return "number"
+    if isinstance(value, str):
+        return "string"
+    return None
+
+
+def _key(value) -> tuple:
+    # True == 1 and False == 0 hash alike, so postings are keyed by type too;
+    # ints and floats share "number" so that 1 still matches 1.0
+    return (_family(value) or type(value).__name__, value)
+
+
+def _is_scalar(value) -> bool:
+    return value is None or isinstance(value, (str, int, float, bool))
+
+
+class MetadataIndex:
+    """Inverted index from ``Document.metadata`` values to FAISS row ids.
+
+    Filters map field names to a value (equality) or to an operator dict:
+    ``{"category": "animals", "year": {"$gte": 2000, "$lt": 2020},
+    "author": {"$in": ["Ann", "Bob"]}}``. List values are indexed per
+    element, so equality on a list field means "contains". Range lookups
+    bisect a sorted list of the field's distinct values.
+    """
+
+    def __init__(self):
+        self._postings = {}  # field -> _key(value) -> set of row ids
+        self._sorted = {}  # (field, family) -> sorted distinct values
+
+    @staticmethod
+    def _values(value) -> list:
+        values = value if isinstance(value, list) else [value]
+        hashable = []
+        for item in values:
+            try:
+                hash(item)
+            except TypeError:
+                continue  # Nested dicts/lists are not filterable
+            hashable.append(item)
+        return hashable
+
+    def add(self, row_ids: Iterable[int], records: Iterable[dict]) -> None:
+        for row_id, record in zip(row_ids, records):
+            for field, value in record["metadata"].items():
+                postings = self._postings.setdefault(field, {})
+                for item in self._values(value):
+                    key = _key(item)
+                    if key not in postings:
+                        self._invalidate(field, key)
+                    postings.setdefault(key, set()).add(int(row_id))
+
+    def remove(self, row_ids: Iterable[int], records: Iterable[dict]) -> None:
+        for row_id, record in zip(row_ids, records):
+            if record is None:
+                continue
+            for field, value in record["metadata"].items():
+                postings = self._postings.get(field, {})
+                for item in self._values(value):
+                    key = _key(item)
+                    rows = postings.get(key)
+                    if rows is None:
+                        continue
+                    rows.discard(int(row_id))
+                    if not rows:
+                        del postings[key]
+                        self._invalidate(field, key)
+
+    def _invalidate(self, field: str, key: tuple) -> None:
+        self._sorted.pop((field, key[0]), None)
+
+    def _sorted_values(self, field: str, family: str) -> list:
+        key = (field, family)
+        if key not in self._sorted:
+            self._sorted[key] = sorted(
+                value for tag, value in self._postings.get(field, {}) if tag == family
+            )
+        return self._sorted[key]
+
+    def matching(self, filters: dict) -> np.ndarray:
+        """Sorted row ids satisfying every filter."""
+        result = None
+        for field, condition in filters.items():
+            rows = self._match_field(field, condition)
+            result = rows if result is None else result & rows
+            if not result:
+                break
+        return np.array(sorted(result or ()), dtype="int64")
+
+    def _match_field(self, field: str, condition) -> set:
+        postings = self._postings.get(field, {})
+        if not isinstance(condition, dict):
+            condition = {"$eq": condition}
+        unknown = set(condition) - set(OPERATORS)
+        if unknown:
+            raise ValueError(
+                f"Unknown filter operator(s) {sorted(unknown)} for field "
+                f"'{field}'. Expected one of {OPERATORS}."
+            )
+        if "$eq" in condition and not _is_scalar(condition["$eq"]):
+            raise ValueError(
+                f"Filter value for '{field}' must be a string, number, boolean "
+                f"or null, got {condition['$eq']!r}"
+            )
+        if "$in" in condition and not (
+            isinstance(condition["$in"], list)
+            and all(_is_scalar(value) for value in condition["$in"])
+        ):
+            raise ValueError(
+                f"$in for '{field}' takes a list of strings, numbers, booleans "
+                f"or nulls, got {condition['$in']!r}"
+            )
+
+        rows = None
+        if "$eq" in condition:
+            rows = set(postings.get(_key(condition["$eq"]), ()))
+        if "$in" in condition:
+            matched = set()
+            for value in condition["$in"]:
+                matched |= postings.get(_key(value), set())
+            rows = matched if rows is None else rows & matched
+        bounds = {op: condition[op] for op in RANGE_OPERATORS if op in condition}
+        if bounds:
+            matched = self._match_range(field, bounds, postings)
+            rows = matched if rows is None else rows & matched
+        return rows or set()
+
+    def _match_range(self, field: str, bounds: dict, postings: dict) -> set:
+        families = {_family(bound) for bound in bounds.values()}
+        if len(families) != 1 or None in families:
+            raise ValueError(
+                f"Range bounds for '{field}' must all be numbers or all be strings"
+            )
+        family = families.pop()
+        values = self._sorted_values(field, family)
+        start, end = 0, len(values)
+        if "$gt" in bounds:
+            start = max(start, bisect.bisect_right(values, bounds["$gt"]))
+        if "$gte" in bounds:
+            start = max(start, bisect.bisect_left(values, bounds["$gte"]))
+        if "$lt" in bounds:
+            end = min(end, bisect.bisect_left(values, bounds["$lt"]))
+        if "$lte" in bounds:
+            end = min(end, bisect.bisect_right(values, bounds["$lte"]))
+        matched = set()
+        for value in values[start:end]:
+            matched |= postings[(family, value)]
+        return matched
@@ -0,0 +1,224 @@
+import os
+import json
+import logging
+import sqlite3
+from abc import ABC, abstractmethod
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Ids bound per "IN (?, ...)" statement; old SQLite builds allow only 999
+SQLITE_MAX_VARIABLES = 900
+
+
+def in_batches(items: list, size: int = SQLITE_MAX_VARIABLES) -> Iterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start : start + size]
+
+
+class MetadataStore(ABC):
+    """Document records (id, content, metadata) keyed by FAISS row id."""
+
+    @abstractmethod
+    def add(self, row_ids: List[int], records: List[dict]) -> None:
+        pass
+
+    @abstractmethod
+    def get(self, row_ids: Iterable[int]) -> List[Optional[dict]]:
+        pass
+
+    @abstractmethod
+    def row_ids_for(self, document_ids: Iterable[str]) -> List[int]:
+        """Rows of these documents, including chunks whose parent_id matches."""
+        pass
+
+    @abstractmethod
+    def delete(self, row_ids: Iterable[int]) -> None:
+        pass
+
+    @abstractmethod
+    def items(self) -> Iterator[Tuple[int, dict]]:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+    @abstractmethod
+    def save(self) -> None:
+        pass
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    def __iter__(self) -> Iterator[dict]:
+        for _, record in self.items():
+            yield record
+
+    def close(self) -> None:
+        pass
+
+
+class JsonMetadataStore(MetadataStore):
+    """Keeps every record in memory and rewrites one JSON file on save."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rows = {}
+
+        # Load metadata if it exists
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r") as f:
+                    records = json.load(f)
+                for position, record in enumerate(records):
+                    # Files written before row ids were stored are positional
+                    self._rows[record.pop("row_id", position)] = record
+            except (json.JSONDecodeError, FileNotFoundError) as e:
+                logger.warning(
+                    "Failed to load metadata from %s. Initializing empty metadata. Error: %s",
+                    self.path,
+                    e,
+                )
+                self._rows = {}
+
+    def add(self, row_ids, records):
+        for row_id, record in zip(row_ids, records):
+            self._rows[int(row_id)] = record
+
+    def get(self, row_ids):
+        return [self._rows.get(int(row_id)) for row_id in row_ids]
+
+    def row_ids_for(self, document_ids):
+        ids = set(document_ids)
+        return [
+            row_id
+            for row_id, record in self._rows.items()
+            if record["id"] in ids or record["metadata"].get("parent_id") in ids
+        ]
+
+    def delete(self, row_ids):
+        for row_id in row_ids:
+            self._rows.pop(int(row_id), None)
+
+    def items(self):
+        # Row ids are assigned in increasing order, so insertion order is row order
+        return iter(list(self._rows.items()))
+
+    def clear(self):
+        self._rows = {}
+
+    def save(self):
+        # Write to a temporary file and rename so a crash never leaves a torn file
+        tmp_path = f"{self.path}.tmp"
+        records = [{"row_id": row_id, **record} for row_id, record in self.items()]
+        with open(tmp_path, "w") as f:
+            json.dump(records, f)
+        os.replace(tmp_path, self.path)
+
+    def __len__(self):
+        return len(self._rows)
+
+
+class SQLiteMetadataStore(MetadataStore):
+    """Keeps records on disk; opening is cheap and reads fetch only the requested rows."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # WAL journaling lets read-only replicas query while the writer commits
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS documents ("
+            "row_id INTEGER PRIMARY KEY, doc_id TEXT NOT NULL, "
+            "content TEXT NOT NULL, metadata TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_doc_id ON documents (doc_id)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_documents_parent_id "
+            "ON documents (json_extract(metadata, '$.parent_id'))"
+        )
+        self._conn.commit()
+        self._count = None  # Computed on first len()
+
+    @staticmethod
+    def _to_record(row) -> dict:
+        return {"id": row[1], "content": row[2], "metadata": json.loads(row[3])}
+
+    def add(self, row_ids, records):
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO documents VALUES (?, ?, ?, ?)",
+            [
+                (int(row_id), r["id"], r["content"], json.dumps(r["metadata"]))
+                for row_id, r in zip(row_ids, records)
+            ],
+        )
+        self._count = None
+
+    def get(self, row_ids):
+        row_ids = [int(row_id) for row_id in row_ids]
+        if not row_ids:
+            return []
+        found = {}
+        for batch in in_batches(row_ids):
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT * FROM documents WHERE row_id IN ({placeholders})", batch
+            ).fetchall()
+            found.update((row[0], self._to_record(row)) for row in rows)
+        return [found.get(row_id) for row_id in row_ids]
+
+    def row_ids_for(self, document_ids):
+        document_ids = list(document_ids)
+        if not document_ids:
+            return []
+        row_ids = {}  # Ordered set: a row can match in two batches
+        # Each id is bound twice per statement
+        for batch in in_batches(document_ids, SQLITE_MAX_VARIABLES // 2):
+            placeholders = ",".join("?" * len(batch))
+            rows = self._conn.execute(
+                f"SELECT row_id FROM documents WHERE doc_id IN ({placeholders}) "
+                f"OR json_extract(metadata, '$.parent_id') IN ({placeholders})",
+                batch + batch,
+            ).fetchall()
+            row_ids.update((row[0], None) for row in rows)
+        return list(row_ids)
+
+    def delete(self, row_ids):
+        self._conn.executemany(
+            "DELETE FROM documents WHERE row_id = ?",
+            [(int(row_id),) for row_id in row_ids],
+        )
+        self._count = None
+
+    def items(self):
+        for row in self._conn.execute("SELECT * FROM documents ORDER BY row_id"):
+            yield row[0], self._to_record(row)
+
+    def clear(self):
+        self._conn.execute("DELETE FROM documents")
+        self._count = 0
+
+    def save(self):
+        self._conn.commit()
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self._conn.execute(
+                "SELECT COUNT(*) FROM documents"
+            ).fetchone()[0]
+        return self._count
+
+    def close(self):
+        self._conn.close()
+
+
+def create_metadata_store(backend: str, path: str) -> MetadataStore:
+    if backend == "json":
+        return JsonMetadataStore(path)
+    if backend == "sqlite":
+        return SQLiteMetadataStore(path)
+    raise ValueError(f"Unknown metadata backend: {backend}")
@@ -0,0 +1,132 @@
+import os
+import time
+import logging
+import queue
+import asyncio
+import threading
+from collections import Counter
+from concurrent.futures import Future
+from typing import List
+from src.domain.entities.document import Document
+from src.infrastructure.services.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class QueryBatcher:
+    """Coalesces concurrent single-query searches into one batched call.
+
+    Queries arriving within ``max_wait_ms`` of the first one in a batch (up to
+    ``max_batch_size``) are encoded together and searched with one
+    ``index.search`` over the stacked matrix via ``get_documents_batch``.
+    """
+
+    def __init__(self, vector_db, max_batch_size=None, max_wait_ms=None):
+        self.vector_db = vector_db
+        self.max_batch_size = max_batch_size or int(
+            os.getenv("QUERY_BATCH_MAX_SIZE", "32")
+        )
+        self.max_wait = (
+            max_wait_ms
+            if max_wait_ms is not None
+            else float(os.getenv("QUERY_BATCH_MAX_WAIT_MS", "2"))
+        ) / 1000
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self.batch_sizes = Counter()  # Batch size -> number of batches
+        self.queries = 0
+        self.total_queue_delay = 0.0
+        self.max_queue_delay = 0.0
+        self._worker = threading.Thread(
+            target=self._run, name="query-batcher", daemon=True
+        )
+        self._worker.start()
+
+    def submit(self, query: str, top_k: int = 5) -> Future:
+        future = Future()
+        self._queue.put((query, top_k, future, time.perf_counter()))
+        return future
+
+    def get_documents(self, query: str, top_k: int = 5) -> List[Document]:
+        return self.submit(query, top_k).result()
+
+    async def get_documents_async(self, query: str, top_k: int = 5) -> List[Document]:
+        return await asyncio.wrap_future(self.submit(query, top_k))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.perf_counter() + self.max_wait
+            stopping = False
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            try:
+                self._process(batch)
+            except Exception as e:
+                # This thread serves every caller: never let one batch end it
+                logger.exception("Query batch failed: %s", e)
+                for _, _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            if stopping:
+                return
+
+    def _process(self, batch):
+        # Callers cancelled while queued (client gone, timeout) need no search
+        batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+        if not batch:
+            return
+        started = time.perf_counter()
+        delays = [started - enqueued for _, _, _, enqueued in batch]
+        with self._lock:
+            self.batch_sizes[len(batch)] += 1
+            self.queries += len(batch)
+            self.total_queue_delay += sum(delays)
+            self.max_queue_delay = max(self.max_queue_delay, max(delays))
+        for delay in delays:
+            STAGE_SECONDS.observe(delay, stage="batch_wait")
+
+        # One search at the largest requested k; each caller gets its own slice
+        top_k = max(top_k for _, top_k, _, _ in batch)
+        try:
+            results = self.vector_db.get_documents_batch(
+                [query for query, _, _, _ in batch], top_k
+            )
+        except Exception as e:
+            for _, _, future, _ in batch:
+                future.set_exception(e)
+            return
+        for (_, k, future, _), documents in zip(batch, results):
+            future.set_result(documents[:k])
+
+    def stats(self) -> dict:
+        with self._lock:
+            batches = sum(self.batch_sizes.values())
+            queries = self.queries
+            return {
+                "batches": batches,
+                "queries": queries,
+                "mean_batch_size": queries / batches if batches else 0.0,
+                "batch_sizes": dict(self.batch_sizes),
+                "mean_queue_delay_ms": (
+                    self.total_queue_delay / queries * 1000 if queries else 0.0
+                ),
+                "max_queue_delay_ms": self.max_queue_delay * 1000,
+            }
+
+    def close(self):
+        self._queue.put(None)
+        self._worker.join(timeout=5)
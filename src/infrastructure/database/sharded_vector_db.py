@@ -0,0 +1,456 @@
+import os
+import glob
+import json
+import heapq
+import logging
+import zlib
+import time
+import threading
+import multiprocessing
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Tuple
+from src.domain.repositories.vector_db_repository import VectorDBRepository
+from src.domain.entities.document import Document
+from src.infrastructure.database.embedding_cache import (
+    EmbeddingCache,
+    encode_with_cache,
+)
+from src.infrastructure.database.hybrid_search import HybridRetrieval
+from src.infrastructure.services.metrics import span
+from src.infrastructure.services.embedders import create_embedder, embedder_name
+
+logger = logging.getLogger(__name__)
+
+# Only these VectorDB methods may be invoked on a shard
+SHARD_METHODS = (
+    "add_vectors",
+    "search_vectors",
+    "lexical_search",
+    "remove_documents",
+    "export_vectors",
+    "flush",
+    "index_stats",
+)
+
+
+class _PrecomputedEmbeddings:
+    """Stand-in model for shards, which are only ever handed vectors."""
+
+    def encode(self, texts, **kwargs):
+        raise RuntimeError("Shards index precomputed vectors; encode in the parent")
+
+
+def _check_method(method: str) -> None:
+    if method not in SHARD_METHODS:
+        raise ValueError(f"Unsupported shard method: {method}")
+
+
+def _open_shard(db_path: str, embedding_dim: int, embedding_model_name: str):
+    from src.infrastructure.database.vector_db import VectorDB
+
+    return VectorDB(
+        db_path=db_path,
+        embedding_model=_PrecomputedEmbeddings(),
+        embedding_model_name=embedding_model_name,
+        embedding_cache=EmbeddingCache(embedding_model_name, max_entries=0),
+        embedding_dim=embedding_dim,
+    )
+
+
+def _shard_main(conn, db_path: str, embedding_dim: int, embedding_model_name: str):
+    """Worker process loop: serve VectorDB calls for one shard over a pipe."""
+    db = _open_shard(db_path, embedding_dim, embedding_model_name)
+    while True:
+        method, args = conn.recv()
+        if method == "close":
+            db.flush()
+            conn.send((True, None))
+            return
+        try:
+            _check_method(method)
+            conn.send((True, getattr(db, method)(*args)))
+        except Exception as e:
+            conn.send((False, e))
+
+
+class _ProcessShard:
+    """Parent-side handle of a shard living in its own worker process."""
+
+    def __init__(self, db_path, embedding_dim, embedding_model_name):
+        context = multiprocessing.get_context("spawn")
+        self._conn, child_conn = context.Pipe()
+        self._process = context.Process(
+            target=_shard_main,
+            args=(child_conn, db_path, embedding_dim, embedding_model_name),
+            daemon=True,
+        )
+        self._process.start()
+        self._lock = threading.Lock()  # One request in flight per pipe
+
+    def call(self, method: str, *args):
+        with self._lock:
+            self._conn.send((method, args))
+            ok, result = self._conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def close(self):
+        with self._lock:
+            self._conn.send(("close", ()))
+            self._conn.recv()
+        self._process.join(timeout=10)
+
+
+class _LocalShard:
+    """In-process shard with the same interface, for tests and small setups."""
+
+    def __init__(self, db_path, embedding_dim, embedding_model_name):
+        self._db = _open_shard(db_path, embedding_dim, embedding_model_name)
+
+    def call(self, method: str, *args):
+        _check_method(method)
+        return getattr(self._db, method)(*args)
+
+    def close(self):
+        self._db.flush()
+
+
+class ShardedVectorDB(VectorDBRepository):
+    """Documents partitioned over N VectorDB shards by a hash of their id.
+
+    Queries are embedded once here, searched on every shard in parallel and
+    the per-shard top-k lists merged by distance. Shards run in worker
+    processes (``processes=True``) so flat scans use one core per shard.
+    Changing ``num_shards`` redistributes all vectors without re-embedding.
+    """
+
+    def __init__(
+        self,
+        db_path: str,
+        num_shards: Optional[int] = None,
+        embedding_model=None,
+        embedding_model_name=None,
+        embedding_cache=None,
+        batch_size=None,
+        processes: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+    ):
+        self.db_path = db_path
+        self.shard_dir = f"{db_path}_shards"
+        self.manifest_path = os.path.join(self.shard_dir, "manifest.json")
+        self.embedding_model_name = embedding_model_name or os.getenv(
+            "EMBEDDING_MODEL", "all-MiniLM-L6-v2"
+        )
+        self.embedding_model = embedding_model or create_embedder(
+            model_name=self.embedding_model_name
+        )
+        self.embedding_cache = embedding_cache or EmbeddingCache(
+            embedder_name(self.embedding_model, self.embedding_model_name),
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+            path=os.getenv("EMBEDDING_CACHE_PATH"),
+        )
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        self.processes = (
+            processes
+            if processes is not None
+            else os.getenv("VECTOR_DB_SHARD_PROCESSES", "true").lower() == "true"
+        )
+        self.embedding_dim = None
+        self._change_listeners = []
+        self._resize_lock = threading.Lock()
+        self.hybrid = HybridRetrieval()
+        self._configured_shards = num_shards or int(
+            os.getenv("VECTOR_DB_SHARDS", "4")
+        )
+
+        # Shard processes are started by load(): right away, or on first use
+        # / from a warm-up thread when lazy (see VectorDB)
+        self._shards = None
+        self._loaded = False
+        self._loading = False
+        self._load_lock = threading.RLock()
+        self.load_seconds = None
+        if lazy is None:
+            lazy = os.getenv("VECTOR_DB_LAZY_LOAD", "false").lower() == "true"
+        if not lazy:
+            self.load()
+
+    @property
+    def shards(self):
+        if not self._loaded:
+            self.load()
+        return self._shards
+
+    @shards.setter
+    def shards(self, shards):
+        self._shards = shards
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> None:
+        """Start the shards of the current generation; safe to call twice."""
+        if self._loaded:
+            return
+        with self._load_lock:
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+            start = time.perf_counter()
+            try:
+                self._load()
+            finally:
+                self._loading = False
+            self._loaded = True
+            self.load_seconds = time.perf_counter() - start
+            logger.info(
+                "Opened %d shards of %s in %.2fs",
+                len(self._shards),
+                self.db_path,
+                self.load_seconds,
+            )
+
+    def _load(self) -> None:
+        os.makedirs(self.shard_dir, exist_ok=True)
+        manifest = {"num_shards": 0, "generation": 0}
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, "r") as f:
+                manifest = json.load(f)
+        self.generation = manifest["generation"]
+        # The dimension is kept in the manifest so restarts skip the model probe
+        if manifest.get("embedding_model") == self.embedding_model_name:
+            self.embedding_dim = manifest["embedding_dim"]
+        else:
+            self.embedding_dim = len(self.embedding_model.encode("test"))
+        num_shards = self._configured_shards
+
+        self.shards = self._open_shards(
+            manifest["num_shards"] or num_shards, self.generation
+        )
+        self._pool = self._new_pool()
+        if manifest["num_shards"] in (0, num_shards):
+            self._write_manifest(num_shards)
+        else:
+            # Configured shard count changed since the last run
+            self.resize(num_shards)
+
+    @property
+    def num_shards(self) -> int:
+        return len(self.shards)
+
+    def _shard_path(self, generation: int, shard: int) -> str:
+        return os.path.join(self.shard_dir, f"g{generation}-shard{shard}")
+
+    def _open_shards(self, num_shards: int, generation: int):
+        shard_class = _ProcessShard if self.processes else _LocalShard
+        return [
+            shard_class(
+                self._shard_path(generation, i),
+                self.embedding_dim,
+                self.embedding_model_name,
+            )
+            for i in range(num_shards)
+        ]
+
+    def _new_pool(self) -> ThreadPoolExecutor:
+        # One thread per shard waits on its reply, so shards work in parallel
+        return ThreadPoolExecutor(
+            max_workers=len(self.shards), thread_name_prefix="shard-fanout"
+        )
+
+    def _write_manifest(self, num_shards: int) -> None:
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    "num_shards": num_shards,
+                    "generation": self.generation,
+                    "embedding_model": self.embedding_model_name,
+                    "embedding_dim": self.embedding_dim,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.manifest_path)
+
+    def shard_for(self, document_id: str) -> int:
+        # crc32 is stable across processes, unlike hash()
+        return zlib.crc32(document_id.encode("utf-8")) % self.num_shards
+
+    def _fan_out(self, method: str, args_per_shard: dict) -> dict:
+        """Call ``method`` on the given shards in parallel; {shard: result}."""
+        self.load()
+        futures = {
+            shard: self._pool.submit(self.shards[shard].call, method, *args)
+            for shard, args in args_per_shard.items()
+        }
+        return {shard: future.result() for shard, future in futures.items()}
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        with span("embed"):
+            return encode_with_cache(
+                self.embedding_model, self.embedding_cache, texts, self.batch_size
+            )
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized embeddings of texts, served from the embedding cache."""
+        return self._encode(texts)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        return self._encode([query])[0]
+
+    def add_change_listener(self, callback) -> None:
+        """Call ``callback(document_ids)`` after documents are added or deleted."""
+        self._change_listeners.append(callback)
+
+    def _notify(self, document_ids: List[str]) -> None:
+        for callback in self._change_listeners:
+            callback(document_ids)
+
+    def add_document(self, document: Document) -> None:
+        self.add_documents([document])
+
+    def add_documents(self, documents: List[Document]) -> None:
+        """Embed once in this process, then hand each shard its vectors."""
+        if not documents:
+            return
+        vectors = self._encode([doc.content for doc in documents])
+        self.load()  # Loading may resize, which takes the resize lock
+        with self._resize_lock:
+            self._add_vectors(documents, vectors)
+        self._notify([doc.id for doc in documents])
+
+    def _add_vectors(self, documents: List[Document], vectors: np.ndarray) -> None:
+        assignments = {}
+        for i, document in enumerate(documents):
+            assignments.setdefault(self.shard_for(document.id), []).append(i)
+        self._fan_out(
+            "add_vectors",
+            {
+                shard: ([documents[i] for i in rows], vectors[rows])
+                for shard, rows in assignments.items()
+            },
+        )
+
+    def get_documents(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[dict] = None,
+        mode: Optional[str] = None,
+    ) -> List[Document]:
+        return self.get_documents_batch([query], top_k, filters, mode)[0]
+
+    def get_documents_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filters: Optional[dict] = None,
+        mode: Optional[str] = None,
+    ) -> List[List[Document]]:
+        """Search every shard in parallel and merge the hits by distance.
+
+        Lexical and hybrid ``mode`` work as in VectorDB.get_documents_batch.
+        """
+        return self.hybrid.retrieve(
+            top_k,
+            mode,
+            lambda k: self._search_shards(
+                "search_vectors", self._encode(queries), k, filters, heapq.nsmallest
+            ),
+            lambda k: self.lexical_search(queries, k, filters),
+        )
+
+    def lexical_search(
+        self, queries: List[str], top_k: int = 5, filters: Optional[dict] = None
+    ) -> List[List[Tuple[float, Document]]]:
+        """BM25 hits merged over shards by score.
+
+        Each shard weighs terms by its own document frequencies; with
+        documents spread by id hash these are close to the global ones.
+        """
+        return self._search_shards(
+            "lexical_search", queries, top_k, filters, heapq.nlargest
+        )
+
+    def _search_shards(self, method, queries, top_k, filters, select) -> list:
+        with span("shard_fan_out"):
+            per_shard = self._fan_out(
+                method,
+                {shard: (queries, top_k, filters) for shard in range(self.num_shards)},
+            )
+        results = []
+        for q in range(len(queries)):
+            hits = [hit for shard_hits in per_shard.values() for hit in shard_hits[q]]
+            results.append(select(top_k, hits, key=lambda hit: hit[0]))
+        return results
+
+    def delete_document(self, document_id: str) -> List[str]:
+        return self.delete_documents([document_id])
+
+    def delete_documents(self, document_ids: List[str]) -> List[str]:
+        # Chunks are placed by their own id, so a parent id may match rows on
+        # any shard: ask them all
+        self.load()
+        with self._resize_lock:
+            per_shard = self._fan_out(
+                "remove_documents",
+                {shard: (document_ids,) for shard in range(self.num_shards)},
+            )
+        found = {doc_id for matched, _ in per_shard.values() for doc_id in matched}
+        removed = [doc_id for _, ids in per_shard.values() for doc_id in ids]
+        if removed:
+            self._notify(removed)
+        return [doc_id for doc_id in dict.fromkeys(document_ids) if doc_id in found]
+
+    def index_stats(self) -> dict:
+        """Sizes summed over all shards, plus the shard count."""
+        per_shard = self._fan_out(
+            "index_stats", {shard: () for shard in range(self.num_shards)}
+        )
+        totals = {"shards": self.num_shards}
+        for stats in per_shard.values():
+            for name, value in stats.items():
+                totals[name] = totals.get(name, 0) + value
+        return totals
+
+    def flush(self) -> None:
+        if not self._loaded:
+            return
+        self._fan_out("flush", {shard: () for shard in range(self.num_shards)})
+
+    def resize(self, num_shards: int) -> None:
+        """Redistribute every stored vector over ``num_shards`` new shards."""
+        with self._resize_lock:
+            if num_shards == self.num_shards:
+                return
+            old_shards, old_generation = self.shards, self.generation
+            old_pool = self._pool
+            exported = [shard.call("export_vectors") for shard in old_shards]
+
+            # Build the new generation next to the old one, then switch over
+            self.generation = old_generation + 1
+            self.shards = self._open_shards(num_shards, self.generation)
+            self._pool = self._new_pool()
+            old_pool.shutdown(wait=True)
+            for documents, vectors in exported:
+                if documents:
+                    self._add_vectors(documents, vectors)
+            self.flush()
+            self._write_manifest(num_shards)
+
+            for shard in old_shards:
+                shard.close()
+            pattern = os.path.join(self.shard_dir, f"g{old_generation}-shard*")
+            for path in glob.glob(pattern):
+                os.remove(path)
+            logger.info("Rebalanced %d shards into %d", len(exported), num_shards)
+
+    def close(self) -> None:
+        if not self._loaded:
+            return
+        for shard in self.shards:
+            shard.close()
+        self._pool.shutdown(wait=False)
@@ -1,32 +1,264 @@
 import os
 import json
+import time
+import logging
+import threading
 import faiss
 import numpy as np
-from typing import List
+from typing import List, Optional, Tuple
 from src.domain.repositories.vector_db_repository import VectorDBRepository
 from src.domain.entities.document import Document  # Adjust the import path as needed
-from sentence_transformers import SentenceTransformer
+from src.infrastructure.database.write_ahead_log import (
+    WriteAheadLog,
+    encode_vectors,
+    decode_vectors,
+)
+from src.infrastructure.database.metadata_store import create_metadata_store
+from src.infrastructure.database.embedding_cache import (
+    EmbeddingCache,
+    encode_with_cache,
+    normalize_vectors,
+)
+from src.infrastructure.database.rw_lock import ReadWriteLock
+from src.infrastructure.database.metadata_index import MetadataIndex
+from src.infrastructure.database.bm25_index import BM25Index
+from src.infrastructure.database.hybrid_search import HybridRetrieval
+from src.infrastructure.database.index_generations import (
+    IndexGenerations,
+    read_index_mmap,
+)
+from src.infrastructure.services.metrics import span
+from src.infrastructure.services.embedders import create_embedder, embedder_name
+from src.infrastructure.database.vector_file import VectorFile
+from src.infrastructure.database.index_factory import (
+    LOSSY_INDEX_TYPES,
+    build_index,
+    index_type_of,
+    min_training_vectors,
+    reconstruct_all,
+    recall_report,
+    rerank_exact,
+    search_parameters,
+    storage_report,
+    set_search_parameters,
+    stored_ids,
+)
 from dotenv import load_dotenv
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 
 class VectorDB(VectorDBRepository):
-    def __init__(self, db_path: str, metadata_path=None, embedding_model=None):
+    def __init__(
+        self,
+        db_path: str,
+        metadata_path=None,
+        embedding_model=None,
+        batch_size=None,
+        persistence_mode=None,
+        checkpoint_interval=None,
+        metadata_backend=None,
+        embedding_model_name=None,
+        embedding_cache=None,
+        index_type=None,
+        index_params=None,
+        nprobe=None,
+        ef_search=None,
+        auto_train_threshold=None,
+        rerank_factor=None,
+        embedding_dim=None,
+        lazy=None,
+        role=None,
+    ):
         self.db_path = db_path  # Path for FAISS index
+        # "json" keeps all metadata in memory, "sqlite" reads rows on demand
+        self.metadata_backend = metadata_backend or os.getenv(
+            "METADATA_BACKEND", "json"
+        )
         self.metadata_path = (
-            metadata_path or f"{db_path}_metadata.json"
+            metadata_path or f"{db_path}_metadata.{self.metadata_backend}"
         )  # Path for metadata
-        self.embedding_model = embedding_model or SentenceTransformer(
-            "all-MiniLM-L6-v2"
-        )  # Pre-trained model
+        self.embedding_model_name = embedding_model_name or os.getenv(
+            "EMBEDDING_MODEL", "all-MiniLM-L6-v2"
+        )
+        # Pre-trained model, loaded on first use unless one is passed in; the
+        # backend (PyTorch or ONNX Runtime, fp32 or int8) comes from the env
+        self.embedding_model = embedding_model or create_embedder(
+            model_name=self.embedding_model_name
+        )
+        # Cache vectors by content hash so repeated text is never re-encoded
+        self.embedding_cache = embedding_cache or EmbeddingCache(
+            embedder_name(self.embedding_model, self.embedding_model_name),
+            max_entries=int(os.getenv("EMBEDDING_CACHE_SIZE", "10000")),
+            path=os.getenv("EMBEDDING_CACHE_PATH"),
+        )
+        # Number of texts sent to the embedding model per forward pass
+        self.batch_size = batch_size or int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+        # "snapshot" rewrites the index files on every change, "wal" appends to a
+        # log and only rewrites them on flush()/checkpoint
+        self.persistence_mode = persistence_mode or os.getenv(
+            "VECTOR_DB_PERSISTENCE", "snapshot"
+        )
+        if self.persistence_mode not in ("snapshot", "wal"):
+            raise ValueError(f"Unknown persistence mode: {self.persistence_mode}")
+        self.checkpoint_interval = checkpoint_interval or int(
+            os.getenv("VECTOR_DB_CHECKPOINT_INTERVAL", "1000")
+        )
+        self.wal = WriteAheadLog(f"{db_path}.wal")
+        # Searches run concurrently; adds, deletes and checkpoints are exclusive
+        self._rw_lock = ReadWriteLock()
+
+        # Index layout: flat (exact), sq_fp16, sq_int8 or pq (compressed),
+        # ivf_flat, ivf_pq or hnsw (approximate)
+        self.index_type = index_type or os.getenv("VECTOR_INDEX_TYPE", "flat")
+        self.index_params = index_params or {
+            "nlist": int(os.getenv("VECTOR_INDEX_NLIST", "1024")),
+            "pq_m": int(os.getenv("VECTOR_INDEX_PQ_M", "16")),
+            "pq_bits": int(os.getenv("VECTOR_INDEX_PQ_BITS", "8")),
+            "hnsw_m": int(os.getenv("VECTOR_INDEX_HNSW_M", "32")),
+        }
+        self.nprobe = nprobe or int(os.getenv("VECTOR_INDEX_NPROBE", "16"))
+        self.ef_search = ef_search or int(os.getenv("VECTOR_INDEX_EF_SEARCH", "64"))
+        # Train the configured IVF index automatically once this many vectors exist
+        self.auto_train_threshold = auto_train_threshold or int(
+            os.getenv("VECTOR_INDEX_AUTO_TRAIN", "0")
+        )
+        # Compressed index types keep float32 copies of the vectors on disk;
+        # searches fetch top_k * rerank_factor candidates from the codes and
+        # re-score them exactly with those copies (1 turns this off)
+        self.rerank_factor = (
+            rerank_factor
+            if rerank_factor is not None
+            else int(os.getenv("VECTOR_INDEX_RERANK_FACTOR", "4"))
+        )
+        self.vectors_path = f"{db_path}.vectors"
+        self.full_vectors = None  # VectorFile, opened once the dim is known
+        # Row ids deleted from indexes that cannot remove vectors (HNSW)
+        self.tombstones_path = f"{db_path}_tombstones.json"
+        self._tombstones = set()
+        # Callbacks told which document ids were added or deleted
+        self._change_listeners = []
+        # Inverted index over metadata for filtered search, built on first use
+        self._metadata_index = None
+        self._metadata_index_lock = threading.Lock()
+        # BM25 index over document contents for lexical and hybrid retrieval,
+        # built on first use and then kept in step with adds and deletes
+        self._lexical_index = None
+        self._lexical_index_lock = threading.Lock()
+        self.hybrid = HybridRetrieval()
+        # Filters matching at most this many rows are searched exactly
+        self.filter_exact_limit = int(os.getenv("FILTER_EXACT_SEARCH_LIMIT", "2048"))
+
+        # "standalone" owns its files; a "writer" also publishes each saved
+        # index as a numbered generation that "reader" replicas memory-map
+        # read-only and switch to as it appears (see IndexGenerations)
+        self.role = role or os.getenv("VECTOR_DB_ROLE", "standalone")
+        if self.role not in ("standalone", "writer", "reader"):
+            raise ValueError(f"Unknown vector DB role: {self.role}")
+        self.generations = (
+            IndexGenerations(db_path) if self.role != "standalone" else None
+        )
+        self.generation = None  # Generation a reader is serving
+        self.reload_interval = float(os.getenv("VECTOR_DB_RELOAD_INTERVAL", "1"))
+        self._reload_listeners = []
+        self._stop_watching = threading.Event()
+
+        # Model name and embedding dimensionality stored next to the index, so
+        # a restart does not need the model to size the index
+        self.info_path = f"{db_path}_info.json"
+        self.embedding_dim = embedding_dim
 
-        # Get the dimensionality of the embedding model
-        test_vector = self.embedding_model.encode("test")  # Generate a test embedding
-        embedding_dim = len(test_vector)
+        # The index and metadata are read by load(): right away by default, or
+        # on first use / from a warm-up thread when lazy
+        self._index = None
+        self._documents = None
+        self._loaded = False
+        self._loading = False
+        self._load_lock = threading.RLock()
+        self.load_seconds = None
+        if lazy is None:
+            lazy = os.getenv("VECTOR_DB_LAZY_LOAD", "false").lower() == "true"
+        if not lazy:
+            self.load()
 
-        # Initialize FAISS index with the correct dimensionality
-        self.index = faiss.IndexFlatL2(embedding_dim)
+    @property
+    def model_load_seconds(self) -> Optional[float]:
+        return getattr(self.embedding_model, "load_seconds", None)
+
+    @property
+    def index(self):
+        if not self._loaded:
+            self.load()
+        return self._index
+
+    @index.setter
+    def index(self, index):
+        self._index = index
+
+    @property
+    def _lock(self) -> ReadWriteLock:
+        # Every read and write takes this lock, so getting it loads the index
+        # first; during load() it is returned as is (WAL replay flushes)
+        if not self._loaded:
+            self.load()
+        return self._rw_lock
+
+    @property
+    def documents(self):
+        if not self._loaded:
+            self.load()
+        return self._documents
+
+    @property
+    def is_loaded(self) -> bool:
+        return self._loaded
+
+    def load(self) -> None:
+        """Read the index and metadata and replay the WAL; safe to call twice.
+
+        Concurrent callers wait for the first one to finish.
+        """
+        if self._loaded:
+            return
+        with self._load_lock:
+            # _loading: index/documents accessed while loading must not recurse
+            if self._loaded or self._loading:
+                return
+            self._loading = True
+            start = time.perf_counter()
+            try:
+                self._load()
+            finally:
+                self._loading = False
+            self._loaded = True
+            self.load_seconds = time.perf_counter() - start
+            logger.info(
+                "Loaded %s (%d vectors) in %.2fs",
+                self.db_path,
+                self._index.ntotal,
+                self.load_seconds,
+            )
+
+    def _load(self) -> None:
+        embedding_dim = self._resolve_embedding_dim()
+        self.full_vectors = VectorFile(self.vectors_path, embedding_dim)
+
+        # Initialize FAISS index with the correct dimensionality; vectors are
+        # added with their metadata row id so ids survive deletes
+        self.index = self._new_index(embedding_dim)
+
+        if self.role == "reader":
+            self._documents = create_metadata_store(
+                self.metadata_backend, self.metadata_path
+            )
+            self.reload()
+            # The writer owns the WAL; readers only follow published generations
+            threading.Thread(
+                target=self._watch_generations, name="index-reload", daemon=True
+            ).start()
+            return
 
         # Load FAISS index if it exists
         if os.path.exists(self.db_path):
@@ -36,85 +268,686 @@ class VectorDB(VectorDBRepository):
                     raise ValueError(
                         f"FAISS index dimensionality ({self.index.d}) does not match embedding model dimensionality ({embedding_dim})."
                     )
+                if isinstance(self.index, faiss.IndexFlat):
+                    self.index = self._migrate_positional_index(self.index)
+                if os.path.exists(self.tombstones_path):
+                    with open(self.tombstones_path, "r") as f:
+                        self._tombstones = set(json.load(f))
             except RuntimeError as e:
-                print(
-                    f"Warning: Failed to load FAISS index from {self.db_path}. Initializing a new index. Error: {e}"
+                logger.warning(
+                    "Failed to load FAISS index from %s. Initializing a new index. Error: %s",
+                    self.db_path,
+                    e,
                 )
-                self.index = faiss.IndexFlatL2(embedding_dim)
+                self.index = self._new_index(embedding_dim)
+        set_search_parameters(
+            self.index, nprobe=self.nprobe, ef_search=self.ef_search
+        )
+        self._next_row_id = self._max_row_id() + 1
+
+        # Open the metadata store, keyed by FAISS row id
+        self._documents = create_metadata_store(
+            self.metadata_backend, self.metadata_path
+        )
+
+        # Recover changes logged after the last checkpoint
+        self._replay_wal()
+        if self.role == "writer" and os.path.exists(self.db_path):
+            # Readers may be waiting for the index this writer starts from
+            self.generation = self.generations.publish(self._tombstones)
 
-        # Load metadata if it exists
-        if os.path.exists(self.metadata_path):
+    def reload(self) -> bool:
+        """Reader: switch to the newest published generation if there is one.
+
+        The new index is opened (memory-mapped) before taking the write lock,
+        so searches only wait for the pointer swap. Returns True on a switch.
+        """
+        manifest = self.generations.current()
+        if manifest is None or manifest["generation"] == self.generation:
+            return False
+        index = read_index_mmap(manifest["index_path"])
+        set_search_parameters(index, nprobe=self.nprobe, ef_search=self.ef_search)
+        documents = self._documents
+        if self.metadata_backend == "json":
+            # JSON metadata is a snapshot file; SQLite is read live
+            documents = create_metadata_store("json", self.metadata_path)
+        with self._lock.write():
+            self._index = index
+            self._documents = documents
+            self._tombstones = set(manifest["tombstones"])
+            self._metadata_index = None
+            self._lexical_index = None
+            self.generation = manifest["generation"]
+        logger.info(
+            "Serving index generation %d (%d vectors)", self.generation, index.ntotal
+        )
+        for callback in self._reload_listeners:
+            callback()
+        return True
+
+    def _watch_generations(self) -> None:
+        while not self._stop_watching.wait(self.reload_interval):
             try:
-                with open(self.metadata_path, "r") as f:
-                    self.documents = json.load(f)
-            except (json.JSONDecodeError, FileNotFoundError) as e:
-                print(
-                    f"Warning: Failed to load metadata from {self.metadata_path}. Initializing empty metadata. Error: {e}"
-                )
-                self.documents = []
-        else:
-            self.documents = []
+                self.reload()
+            except Exception as e:
+                # E.g. a generation pruned between reading the manifest and opening it
+                logger.warning("Index reload failed, retrying: %s", e)
+
+    def add_reload_listener(self, callback) -> None:
+        """Call ``callback()`` after a reader switched to a new generation."""
+        self._reload_listeners.append(callback)
+
+    def _check_writable(self) -> None:
+        if self.role == "reader":
+            raise RuntimeError(
+                "This vector DB is a read-only replica; send writes to the writer"
+            )
+
+    def close(self) -> None:
+        self._stop_watching.set()
+        if self.full_vectors is not None:
+            self.full_vectors.close()
+
+    def _resolve_embedding_dim(self) -> int:
+        if self.embedding_dim is None:
+            info = self._read_info()
+            if info.get("embedding_model") == self.embedding_model_name:
+                self.embedding_dim = info["embedding_dim"]
+            else:
+                # Unknown or changed model: generate a test embedding
+                self.embedding_dim = len(self.embedding_model.encode("test"))
+        info = {
+            "embedding_model": self.embedding_model_name,
+            "embedding_dim": self.embedding_dim,
+        }
+        if self._read_info() != info:
+            tmp_path = f"{self.info_path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(info, f)
+            os.replace(tmp_path, self.info_path)
+        return self.embedding_dim
+
+    def _read_info(self) -> dict:
+        if not os.path.exists(self.info_path):
+            return {}
+        with open(self.info_path, "r") as f:
+            return json.load(f)
+
+    def _new_index(self, embedding_dim: int):
+        index = build_index(self.index_type, embedding_dim, **self.index_params)
+        if not index.is_trained:
+            # IVF indexes need training data; stage vectors in a flat index
+            # until train_index() runs
+            index = build_index("flat", embedding_dim)
+        return index
+
+    def _migrate_positional_index(self, index):
+        """Wrap an index saved before row ids existed; row id = old position."""
+        vectors = self._normalize(index.reconstruct_n(0, index.ntotal))
+        migrated = build_index("flat", index.d)
+        migrated.add_with_ids(vectors, np.arange(index.ntotal, dtype="int64"))
+        return migrated
+
+    def _row_ids(self) -> np.ndarray:
+        return stored_ids(self.index)
+
+    def _max_row_id(self) -> int:
+        row_ids = self._row_ids()
+        return int(row_ids.max()) if len(row_ids) else -1
+
+    _normalize = staticmethod(normalize_vectors)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        """Embed texts in batches and return L2-normalized float32 vectors."""
+        with span("embed"):
+            return encode_with_cache(
+                self.embedding_model, self.embedding_cache, texts, self.batch_size
+            )
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """L2-normalized embeddings of texts, served from the embedding cache."""
+        return self._encode(texts)
+
+    def encode_query(self, query: str) -> np.ndarray:
+        """L2-normalized embedding of one query, served from the embedding cache."""
+        return self._encode([query])[0]
+
+    def add_change_listener(self, callback) -> None:
+        """Call ``callback(document_ids)`` after documents are added or deleted."""
+        self._change_listeners.append(callback)
+
+    def _notify(self, document_ids: List[str]) -> None:
+        for callback in self._change_listeners:
+            callback(document_ids)
 
     def add_document(self, document: Document):
-        # Convert document content to vector
-        vector = self.embedding_model.encode(document.content)
-        vector = vector / np.linalg.norm(vector)  # Normalize the vector
-        vector = np.array([vector]).astype("float32")
+        self.add_documents([document])
+
+    def add_documents(self, documents: List[Document]) -> None:
+        """Embed and index documents, one forward pass and index.add per batch."""
+        if not documents:
+            return
+
+        for start in range(0, len(documents), self.batch_size):
+            batch = documents[start : start + self.batch_size]
+
+            # Convert document contents to vectors and add them to FAISS
+            self._add_batch(batch, self._encode([doc.content for doc in batch]))
+
+        self._after_add(documents)
 
-        # Add vector to FAISS index
-        self.index.add(vector)
+    def add_vectors(self, documents: List[Document], vectors: np.ndarray) -> None:
+        """Index documents whose L2-normalized embeddings were computed elsewhere."""
+        if not documents:
+            return
+        self._add_batch(documents, np.asarray(vectors, dtype="float32"))
+        self._after_add(documents)
 
-        # Save metadata
-        self.documents.append(
+    def _add_batch(self, batch: List[Document], vectors: np.ndarray) -> None:
+        self._check_writable()
+        records = [
             {
                 "id": document.id,
                 "content": document.content,
                 "metadata": document.metadata,
             }
+            for document in batch
+        ]
+        with self._lock.write():
+            row_ids = np.arange(
+                self._next_row_id, self._next_row_id + len(batch), dtype="int64"
+            )
+            self._apply_add(row_ids, records, vectors)
+
+            if self.persistence_mode == "wal":
+                self._log(
+                    {
+                        "op": "add",
+                        "row_ids": row_ids.tolist(),
+                        "documents": records,
+                        "dim": vectors.shape[1],
+                        "vectors": encode_vectors(vectors),
+                    }
+                )
+
+    def _after_add(self, documents: List[Document]) -> None:
+        self._notify([doc.id for doc in documents])
+
+        with self._lock.write():
+            if (
+                self.auto_train_threshold
+                and index_type_of(self.index) != self.index_type
+                and self.index.ntotal >= self.auto_train_threshold
+            ):
+                self.train_index()  # Also persists the new index
+                return
+
+            # Save metadata and FAISS index once for the whole call
+            if self.persistence_mode == "snapshot":
+                self._save()
+
+    def _apply_add(
+        self, row_ids: np.ndarray, records: List[dict], vectors: np.ndarray
+    ) -> None:
+        self.index.add_with_ids(vectors, row_ids)
+        if self.index_type in LOSSY_INDEX_TYPES:
+            self.full_vectors.write(row_ids, vectors)
+        self.documents.add(row_ids, records)
+        if self._metadata_index is not None:
+            self._metadata_index.add(row_ids, records)
+        if self._lexical_index is not None:
+            self._lexical_index.add(row_ids, records)
+        self._next_row_id = max(self._next_row_id, int(row_ids.max()) + 1)
+
+    def get_documents(
+        self,
+        query: str,
+        top_k: int = 5,
+        filters: Optional[dict] = None,
+        mode: Optional[str] = None,
+    ) -> List[Document]:
+        return self.get_documents_batch([query], top_k, filters, mode)[0]
+
+    def get_documents_batch(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        filters: Optional[dict] = None,
+        mode: Optional[str] = None,
+    ) -> List[List[Document]]:
+        """Search many queries with one encode call and one index.search.
+
+        ``mode`` is "dense", "lexical" (BM25) or "hybrid" (both, fused);
+        the default comes from RETRIEVAL_MODE (see HybridRetrieval).
+        """
+        return self.hybrid.retrieve(
+            top_k,
+            mode,
+            # Convert queries to vectors
+            lambda k: self.search_vectors(self._encode(queries), k, filters),
+            lambda k: self.lexical_search(queries, k, filters),
         )
-        with open(self.metadata_path, "w") as f:
-            json.dump(self.documents, f)
-
-        # Save FAISS index
-        faiss.write_index(self.index, self.db_path)
-
-    def get_documents(self, query: str, top_k: int = 5) -> List[Document]:
-        # Convert query to vector
-        query_vector = self.embedding_model.encode(query)
-        query_vector = query_vector / np.linalg.norm(
-            query_vector
-        )  # Normalize the vector
-        query_vector = np.array([query_vector]).astype("float32")
-
-        # Perform similarity search
-        distances, indices = self.index.search(query_vector, top_k)
-        print("Distances:", distances)
-        print("Indices:", indices)
-
-        # Retrieve documents, ensuring indices are within bounds
-        valid_documents = []
-        for i in indices[0]:
-            if 0 <= i < len(self.documents):  # Check if index is valid
-                valid_documents.append(Document(**self.documents[i]))
+
+    def lexical_search(
+        self, queries: List[str], top_k: int = 5, filters: Optional[dict] = None
+    ) -> List[List[Tuple[float, Document]]]:
+        """(BM25 score, Document) hits per query, best first."""
+        with self._lock.read():
+            with span("lexical_search"):
+                allowed = None
+                if filters:
+                    allowed = set(self._filter_index().matching(filters).tolist())
+                    if not allowed:
+                        return [[] for _ in queries]
+                index = self._bm25_index()
+                hits = [index.search(query, top_k, allowed) for query in queries]
+            with span("metadata_fetch"):
+                row_ids = list({row_id for found in hits for _, row_id in found})
+                records = dict(zip(row_ids, self.documents.get(row_ids)))
+                vectors = self._row_vectors(row_ids)
+        return [
+            [
+                (score, Document(**records[row_id], embedding=vectors.get(row_id)))
+                for score, row_id in query_hits
+                if records.get(row_id) is not None
+            ]
+            for query_hits in hits
+        ]
+
+    def _bm25_index(self) -> BM25Index:
+        # Built under the read lock, so no add or delete can run concurrently
+        if self._lexical_index is None:
+            with self._lexical_index_lock:
+                if self._lexical_index is None:
+                    index = BM25Index(
+                        k1=float(os.getenv("BM25_K1", "1.2")),
+                        b=float(os.getenv("BM25_B", "0.75")),
+                    )
+                    for row_id, record in self.documents.items():
+                        index.add([row_id], [record])
+                    self._lexical_index = index
+        return self._lexical_index
+
+    def search_vectors(
+        self,
+        query_vectors: np.ndarray,
+        top_k: int = 5,
+        filters: Optional[dict] = None,
+    ) -> List[List[Tuple[float, Document]]]:
+        """(distance, Document) hits per query vector, nearest first.
+
+        ``filters`` restricts the search to documents whose metadata matches
+        (see MetadataIndex); matching rows are passed to FAISS as an id
+        selector, or searched exactly when there are few of them.
+        """
+        with self._lock.read():
+            rerank = (
+                self.rerank_factor > 1
+                and index_type_of(self.index) in LOSSY_INDEX_TYPES
+            )
+            fetch_k = top_k * self.rerank_factor if rerank else top_k
+            with span("search"):
+                if filters:
+                    candidates = self._filter_index().matching(filters)
+                    if not len(candidates):
+                        return [[] for _ in range(len(query_vectors))]
+                    distances, indices = self._search_candidates(
+                        query_vectors, candidates, fetch_k
+                    )
+                else:
+                    # Similarity search, skipping deleted-but-not-removed vectors
+                    params = None
+                    if self._tombstones:
+                        tombstones = np.array(sorted(self._tombstones), dtype="int64")
+                        selector = faiss.IDSelectorNot(
+                            faiss.IDSelectorBatch(tombstones)
+                        )
+                        params = search_parameters(self.index, selector)
+                    distances, indices = self.index.search(
+                        query_vectors, fetch_k, params=params
+                    )
+            if rerank:
+                with span("rerank_exact"):
+                    vectors, found = self.full_vectors.read(indices.ravel())
+                    distances, indices = rerank_exact(
+                        query_vectors, distances, indices, vectors, found, top_k
+                    )
+            logger.debug("Distances: %s Indices: %s", distances, indices)
+
+            # Fetch metadata for the hits only; FAISS pads missing results with -1
+            with span("metadata_fetch"):
+                row_ids = list({int(i) for i in indices.ravel() if i >= 0})
+                records = dict(zip(row_ids, self.documents.get(row_ids)))
+                vectors = self._row_vectors(row_ids)
+
+        results = []
+        for hit_distances, hits in zip(distances, indices):
+            valid_documents = []
+            for distance, row_id in zip(hit_distances, hits):
+                if row_id < 0:
+                    continue
+                record = records.get(int(row_id))
+                if record is not None:
+                    document = Document(**record, embedding=vectors.get(int(row_id)))
+                    valid_documents.append((float(distance), document))
+                else:
+                    logger.warning("Index %s has no metadata record.", row_id)
+            results.append(valid_documents)
+
+        return results
+
+    def _row_vectors(self, row_ids: List[int]) -> dict:
+        """Stored vectors of rows, read back without re-embedding. IVF lists
+        cannot be read by id, so their rows are left out."""
+        if not row_ids:
+            return {}
+        if index_type_of(self.index) in LOSSY_INDEX_TYPES:
+            vectors, found = self.full_vectors.read(row_ids)
+            return {
+                row_id: vector
+                for row_id, vector, ok in zip(row_ids, vectors, found)
+                if ok
+            }
+        if not isinstance(self.index, faiss.IndexIDMap2):
+            return {}
+        vectors = {}
+        for row_id in row_ids:
+            try:
+                vectors[row_id] = self.index.reconstruct(int(row_id))
+            except RuntimeError:
+                continue  # Not in the index (yet)
+        return vectors
+
+    def _filter_index(self) -> MetadataIndex:
+        # Built under the read lock, so no add or delete can run concurrently
+        if self._metadata_index is None:
+            with self._metadata_index_lock:
+                if self._metadata_index is None:
+                    index = MetadataIndex()
+                    for row_id, record in self.documents.items():
+                        index.add([row_id], [record])
+                    self._metadata_index = index
+        return self._metadata_index
+
+    def _search_candidates(
+        self, query_vectors: np.ndarray, candidates: np.ndarray, top_k: int
+    ):
+        """Search only the given row ids (deleted rows are never candidates)."""
+        selective = len(candidates) <= self.filter_exact_limit
+        if selective and isinstance(self.index, faiss.IndexIDMap2):
+            # Few matches: score them directly instead of walking the index
+            vectors = np.vstack([self.index.reconstruct(int(i)) for i in candidates])
+            subset = faiss.IndexFlatL2(self.index.d)
+            subset.add(vectors)
+            distances, positions = subset.search(
+                query_vectors, min(top_k, len(candidates))
+            )
+            indices = np.where(positions >= 0, candidates[positions], -1)
+            return distances, indices
+
+        # A selective filter may leave the usual nprobe lists without matches
+        nprobe = None
+        if selective and isinstance(self.index, faiss.IndexIVF):
+            nprobe = self.index.nlist
+        params = search_parameters(
+            self.index, faiss.IDSelectorBatch(candidates), nprobe=nprobe
+        )
+        return self.index.search(query_vectors, top_k, params=params)
+
+    def delete_document(self, document_id: str) -> List[str]:
+        return self.delete_documents([document_id])
+
+    def delete_documents(self, document_ids: List[str]) -> List[str]:
+        """Remove documents (and their chunks) by id without re-embedding.
+
+        Returns the ids asked for that matched a document or a chunk's parent.
+        """
+        matched, removed = self.remove_documents(document_ids)
+        if removed:
+            self._notify(removed)
+        return matched
+
+    def remove_documents(self, document_ids: List[str]) -> Tuple[List[str], List[str]]:
+        """delete_documents without notifying the change listeners.
+
+        Returns the ids asked for that matched, and the ids of the records
+        removed (the documents themselves and their chunks).
+        """
+        self._check_writable()
+        with self._lock.write():
+            row_ids = self.documents.row_ids_for(document_ids)
+            if not row_ids:
+                return [], []
+            records = [r for r in self.documents.get(row_ids) if r is not None]
+            removed = [record["id"] for record in records]
+            found = set(removed)
+            found.update(record["metadata"].get("parent_id") for record in records)
+            self._apply_delete(row_ids)
+            if len(self._tombstones) > 0.2 * self.index.ntotal:
+                self.compact_index()  # Also persists the compacted index
+            elif self.persistence_mode == "wal":
+                self._log({"op": "delete", "row_ids": row_ids})
             else:
-                print(f"Warning: Index {i} is out of range for documents list.")
+                self._save()
+        matched = [doc_id for doc_id in dict.fromkeys(document_ids) if doc_id in found]
+        return matched, removed
+
+    def _apply_delete(self, row_ids: List[int]) -> None:
+        if not row_ids:
+            return
+        if self._metadata_index is not None or self._lexical_index is not None:
+            records = self.documents.get(row_ids)
+            for index in (self._metadata_index, self._lexical_index):
+                if index is not None:
+                    index.remove(row_ids, records)
+        try:
+            self.index.remove_ids(np.array(row_ids, dtype="int64"))
+        except RuntimeError:
+            # HNSW graphs cannot drop nodes; hide them until the next compaction
+            self._tombstones.update(row_ids)
+        self.documents.delete(row_ids)
 
-        return valid_documents
+    def export_vectors(self) -> Tuple[List[Document], np.ndarray]:
+        """Every live document with its stored vector, e.g. to move it elsewhere."""
+        with self._lock.read():
+            row_ids, vectors = self._stored_vectors()
+            records = self.documents.get(row_ids.tolist())
+        documents = [Document(**record) for record in records if record is not None]
+        vectors = vectors[[record is not None for record in records]]
+        return documents, vectors
 
-    def delete_document(self, document_id: str) -> None:
-        # Remove the document with the given ID
-        self.documents = [doc for doc in self.documents if doc["id"] != document_id]
-        with open(self.metadata_path, "w") as f:
-            json.dump(self.documents, f)
+    def compact_index(self) -> None:
+        """Rebuild the index without tombstoned vectors (no re-embedding)."""
+        self.train_index()
+
+    def _stored_vectors(self):
+        """Return (row_ids, vectors) for every live document."""
+        if index_type_of(self.index) not in LOSSY_INDEX_TYPES:
+            row_ids, vectors = reconstruct_all(self.index)
+            if vectors is None:
+                return row_ids, np.zeros((0, self.index.d), dtype="float32")
+            live = ~np.isin(row_ids, list(self._tombstones))
+            return row_ids[live], vectors[live]
+
+        # Codes only approximate the originals: read the full-precision copies
+        # and re-embed (mostly cache hits) rows that have none
+        row_ids = self._row_ids()
+        row_ids = row_ids[~np.isin(row_ids, list(self._tombstones))]
+        vectors, found = self.full_vectors.read(row_ids)
+        missing = np.flatnonzero(~found)
+        if len(missing):
+            records = self.documents.get(row_ids[missing].tolist())
+            present = [i for i, r in zip(missing, records) if r is not None]
+            if present:
+                contents = [r["content"] for r in records if r is not None]
+                vectors[present] = self._encode(contents)
+            keep = found.copy()
+            keep[present] = True
+            row_ids, vectors = row_ids[keep], vectors[keep]
+        return row_ids, vectors
+
+    def train_index(self, sample_size: Optional[int] = None) -> None:
+        """Build the configured index type from the stored vectors.
+
+        IVF quantizers are trained on ``sample_size`` randomly chosen vectors
+        (all of them by default). Also used to change index type or compact.
+        """
+        self._check_writable()
+        with self._lock.write():
+            row_ids, vectors = self._stored_vectors()
+            if self.index_type in LOSSY_INDEX_TYPES and len(vectors):
+                # Switching to a compressed type: keep the exact vectors
+                self.full_vectors.write(row_ids, vectors)
+            index = build_index(self.index_type, self.index.d, **self.index_params)
+            if not index.is_trained:
+                needed = min_training_vectors(self.index_type, self.index_params)
+                if len(vectors) < needed:
+                    raise ValueError(
+                        f"Training {self.index_type} needs at least {needed} vectors, found {len(vectors)}."
+                    )
+                sample = vectors
+                if sample_size and sample_size < len(vectors):
+                    rng = np.random.default_rng(0)
+                    picked = rng.choice(len(vectors), sample_size, replace=False)
+                    sample = vectors[picked]
+                index.train(sample)
+            if len(vectors):
+                index.add_with_ids(vectors, row_ids)
+            set_search_parameters(
+                index, nprobe=self.nprobe, ef_search=self.ef_search
+            )
 
-        # Rebuild the FAISS index to ensure synchronization
-        self._rebuild_index()
+            self.index = index
+            self._tombstones = set()
+            self.flush()
+
+    def recall_report(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        grid: Optional[List[dict]] = None,
+    ) -> List[dict]:
+        """Recall and latency of the current index vs. an exact flat search."""
+        with self._lock.write():
+            row_ids, vectors = self._stored_vectors()
+            report = recall_report(
+                self.index, row_ids, vectors, self._encode(queries), top_k, grid
+            )
+            # Leave the configured runtime parameters in place afterwards
+            set_search_parameters(
+                self.index, nprobe=self.nprobe, ef_search=self.ef_search
+            )
+            return report
+
+    def storage_report(
+        self,
+        queries: List[str],
+        top_k: int = 5,
+        index_types=("flat", "sq_fp16", "sq_int8", "pq"),
+    ) -> List[dict]:
+        """Memory and recall of each storage layout on the stored vectors.
+
+        Recall is measured against exact search, with and without re-scoring
+        ``top_k * rerank_factor`` candidates (see index_factory.storage_report).
+        """
+        with self._lock.read():
+            row_ids, vectors = self._stored_vectors()
+        needed = max(min_training_vectors(t, self.index_params) for t in index_types)
+        if len(vectors) < needed:
+            raise ValueError(
+                f"The storage report needs at least {needed} stored vectors, found {len(vectors)}."
+            )
+        return storage_report(
+            row_ids,
+            vectors,
+            self._encode(queries),
+            index_types,
+            top_k=top_k,
+            rerank_factor=self.rerank_factor,
+            index_params=self.index_params,
+        )
 
     def _rebuild_index(self):
         """Rebuild the FAISS index from the current documents."""
-        self.index.reset()  # Clear the FAISS index
-        for doc in self.documents:
-            vector = self.embedding_model.encode(doc["content"])
-            vector = np.array([vector]).astype("float32")
-            self.index.add(vector)
-        faiss.write_index(self.index, self.db_path)
+        self._check_writable()
+        with self._lock.write():
+            self.index.reset()  # Clear the FAISS index
+            self._tombstones = set()
+            # Rebuilt from the documents on demand
+            self._metadata_index = None
+            self._lexical_index = None
+            rows = list(self.documents.items())
+            for start in range(0, len(rows), self.batch_size):
+                batch = rows[start : start + self.batch_size]
+                vectors = self._encode([record["content"] for _, record in batch])
+                row_ids = np.array([row_id for row_id, _ in batch], dtype="int64")
+                self.index.add_with_ids(vectors, row_ids)
+                if self.index_type in LOSSY_INDEX_TYPES:
+                    self.full_vectors.write(row_ids, vectors)
+            if self.persistence_mode == "snapshot":
+                self._write_index()
+
+    def index_stats(self) -> dict:
+        """Index and store sizes, exported as gauges on /metrics."""
+        with self._lock.read():
+            return {
+                "vectors": int(self.index.ntotal),
+                "documents": len(self.documents),
+                "tombstones": len(self._tombstones),
+                "wal_pending": self.wal.pending,
+            }
+
+    def flush(self) -> None:
+        """Checkpoint: write the index and metadata files, then drop the log."""
+        if not (self._loaded or self._loading) or self.role == "reader":
+            return  # Nothing was read, so nothing can have changed
+        with self._lock.write():
+            self._save()
+            self.wal.truncate()
+
+    def _log(self, record: dict) -> None:
+        self.wal.append(record)
+        if self.wal.pending >= self.checkpoint_interval:
+            self.flush()
+
+    def _replay_wal(self) -> None:
+        records = self.wal.replay()
+        # Rows may already be in the index if a checkpoint was interrupted
+        indexed = set(self._row_ids().tolist())
+        for record in records:
+            if record["op"] == "add":
+                vectors = decode_vectors(record["vectors"], record["dim"])
+                row_ids = np.array(record["row_ids"], dtype="int64")
+                pending = np.array([r not in indexed for r in record["row_ids"]])
+                if pending.any():
+                    self._apply_add(
+                        row_ids[pending],
+                        [r for r, p in zip(record["documents"], pending) if p],
+                        vectors[pending],
+                    )
+                    indexed.update(row_ids[pending].tolist())
+            elif record["op"] == "delete":
+                self._apply_delete(record["row_ids"])
+                indexed.difference_update(record["row_ids"])
+        if records:
+            # Fold the recovered changes into a checkpoint right away
+            self.flush()
+
+    def _save(self) -> None:
+        # Rows the saved index refers to must be on disk before it is
+        self.full_vectors.sync()
+        self.documents.save()
+        self._write_index()
+        if self._tombstones:
+            with open(self.tombstones_path, "w") as f:
+                json.dump(sorted(self._tombstones), f)
+        elif os.path.exists(self.tombstones_path):
+            os.remove(self.tombstones_path)
+
+    def _write_index(self) -> None:
+        # Write to a temporary file and rename so a crash never leaves a torn file
+        tmp_path = f"{self.db_path}.tmp"
+        faiss.write_index(self.index, tmp_path)
+        os.replace(tmp_path, self.db_path)
+        if self.role == "writer":
+            self.generation = self.generations.publish(self._tombstones)
@@ -0,0 +1,79 @@
+import os
+import threading
+import numpy as np
+from typing import Tuple
+
+
+class VectorFile:
+    """Full-precision float32 vectors on disk, addressed by FAISS row id.
+
+    Row ``r`` lives at byte ``r * dim * 4``, so writes are positional and a
+    WAL replay can rewrite rows safely. Reads go through a read-only memory
+    map: only the pages of the rows asked for are touched, and they sit in
+    the shared page cache rather than in process memory. Rows never written
+    (or past the end of the file) read back as zeros and are reported as
+    missing; stored vectors are L2-normalized, so a real row is never zero.
+    """
+
+    def __init__(self, path: str, dim: int):
+        self.path = path
+        self.dim = dim
+        self.row_bytes = dim * 4
+        self._file = None
+        self._map = None
+        self._lock = threading.Lock()
+
+    def write(self, row_ids: np.ndarray, vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype="float32")
+        row_ids = np.asarray(row_ids, dtype="int64")
+        with self._lock:
+            if self._file is None:
+                mode = "r+b" if os.path.exists(self.path) else "w+b"
+                self._file = open(self.path, mode)
+            # Batches are usually consecutive row ids: one write per run
+            breaks = np.flatnonzero(np.diff(row_ids) != 1) + 1
+            for run in np.split(np.arange(len(row_ids)), breaks):
+                if not len(run):
+                    continue
+                self._file.seek(int(row_ids[run[0]]) * self.row_bytes)
+                self._file.write(vectors[run].tobytes())
+            self._file.flush()
+
+    def read(self, row_ids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (vectors, found) for ``row_ids``; missing rows are zeros."""
+        row_ids = np.asarray(row_ids, dtype="int64")
+        vectors = np.zeros((len(row_ids), self.dim), dtype="float32")
+        if not len(row_ids):
+            return vectors, np.zeros(0, dtype=bool)
+        mapped = self._mapped(int(row_ids.max()))
+        inside = (row_ids >= 0) & (row_ids < len(mapped))
+        vectors[inside] = mapped[row_ids[inside]]
+        found = inside & vectors.any(axis=1)
+        return vectors, found
+
+    def _mapped(self, row_id: int) -> np.ndarray:
+        # Re-map when the file has grown past the rows mapped so far
+        with self._lock:
+            if self._map is None or row_id >= len(self._map):
+                if not os.path.exists(self.path):
+                    return np.zeros((0, self.dim), dtype="float32")
+                rows = os.path.getsize(self.path) // self.row_bytes
+                if not rows:
+                    return np.zeros((0, self.dim), dtype="float32")
+                self._map = np.memmap(
+                    self.path, dtype="float32", mode="r", shape=(rows, self.dim)
+                )
+            return self._map
+
+    def sync(self) -> None:
+        """fsync written rows, e.g. before a checkpoint drops the WAL."""
+        with self._lock:
+            if self._file is not None:
+                os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self._map = None
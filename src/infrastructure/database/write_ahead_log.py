@@ -0,0 +1,72 @@
+import os
+import json
+import base64
+import logging
+import numpy as np
+from typing import List
+
+logger = logging.getLogger(__name__)
+
+
+def encode_vectors(vectors: np.ndarray) -> str:
+    """Serialize a float32 matrix to a base64 string for a log record."""
+    data = np.ascontiguousarray(vectors, dtype="float32").tobytes()
+    return base64.b64encode(data).decode("ascii")
+
+
+def decode_vectors(data: str, dim: int) -> np.ndarray:
+    """Inverse of encode_vectors."""
+    return np.frombuffer(base64.b64decode(data), dtype="float32").reshape(-1, dim)
+
+
+class WriteAheadLog:
+    """Append-only JSON-lines log of changes not yet checkpointed into the index files."""
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self.pending = 0  # Records appended since the last truncate
+        self._file = None
+
+    def append(self, record: dict) -> None:
+        if self._file is None:
+            self._file = open(self.path, "a", encoding="utf-8")
+        self._file.write(json.dumps(record) + "\n")
+        self._file.flush()
+        if self.fsync:
+            os.fsync(self._file.fileno())
+        self.pending += 1
+
+    def replay(self) -> List[dict]:
+        """Read back all complete records, ignoring a torn trailing write."""
+        if not os.path.exists(self.path):
+            return []
+
+        records = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.endswith("\n"):
+                    break  # Partial record from a crash mid-append
+                try:
+                    records.append(json.loads(line))
+                except json.JSONDecodeError as e:
+                    logger.warning(
+                        "Stopping replay of %s at a corrupt record. Error: %s",
+                        self.path,
+                        e,
+                    )
+                    break
+        self.pending = len(records)
+        return records
+
+    def truncate(self) -> None:
+        """Drop all records once they are safely part of a checkpoint."""
+        self.close()
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.pending = 0
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
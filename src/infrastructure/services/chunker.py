@@ -0,0 +1,172 @@
+import os
+import re
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+from src.domain.entities.document import Document
+
+# Tokens are whitespace-separated words: cheap to count and model-independent
+TOKEN_PATTERN = re.compile(r"\S+")
+# Embedding models split words into ~1.3 wordpieces on English prose and
+# truncate at max_seq_length (256 for all-MiniLM-L6-v2 and OnnxEmbedder), so
+# 150 words stays under it; keep CHUNK_SIZE below max_seq_length / 1.7
+DEFAULT_CHUNK_SIZE = 150
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+")
+
+
+def count_tokens(text: str) -> int:
+    return len(TOKEN_PATTERN.findall(text))
+
+
+class Chunker(ABC):
+    """Splits text into pieces of at most ``chunk_size`` tokens.
+
+    Consecutive chunks share about ``overlap`` tokens so that a sentence cut
+    at a chunk boundary is still retrievable from one of them.
+    """
+
+    def __init__(self, chunk_size: int = DEFAULT_CHUNK_SIZE, overlap: int = 20):
+        if overlap >= chunk_size:
+            raise ValueError("Chunk overlap must be smaller than the chunk size")
+        self.chunk_size = chunk_size
+        self.overlap = overlap
+
+    @abstractmethod
+    def split(self, text: str) -> List[str]:
+        pass
+
+
+class FixedTokenChunker(Chunker):
+    """Windows of ``chunk_size`` tokens, advancing ``chunk_size - overlap``."""
+
+    def split(self, text):
+        spans = [match.span() for match in TOKEN_PATTERN.finditer(text)]
+        if not spans:
+            return []
+        step = self.chunk_size - self.overlap
+        chunks = []
+        for start in range(0, len(spans), step):
+            window = spans[start : start + self.chunk_size]
+            # Slice the original text so inner whitespace is preserved
+            chunks.append(text[window[0][0] : window[-1][1]])
+            if start + self.chunk_size >= len(spans):
+                break
+        return chunks
+
+
+class _MergingChunker(Chunker):
+    """Greedily packs pieces into chunks, carrying trailing pieces as overlap."""
+
+    def _merge(self, pieces: Sequence[str], separator: str) -> List[str]:
+        chunks, current, current_tokens = [], [], 0
+        for piece in pieces:
+            tokens = count_tokens(piece)
+            if not tokens:
+                continue
+            if current and current_tokens + tokens > self.chunk_size:
+                chunks.append(separator.join(current))
+                # Keep the tail of the finished chunk, up to `overlap` tokens
+                while current and (
+                    current_tokens > self.overlap
+                    or current_tokens + tokens > self.chunk_size
+                ):
+                    current_tokens -= count_tokens(current.pop(0))
+            current.append(piece)
+            current_tokens += tokens
+        if current:
+            chunks.append(separator.join(current))
+        return chunks
+
+    def _fit(self, pieces: Sequence[str]) -> List[str]:
+        # Pieces that are too long on their own fall back to fixed windows
+        fixed = FixedTokenChunker(self.chunk_size, self.overlap)
+        fitted = []
+        for piece in pieces:
+            if count_tokens(piece) > self.chunk_size:
+                fitted.extend(fixed.split(piece))
+            else:
+                fitted.append(piece)
+        return fitted
+
+
+class SentenceChunker(_MergingChunker):
+    """Packs whole sentences; overlap is made of whole trailing sentences."""
+
+    def split(self, text):
+        sentences = [s.strip() for s in SENTENCE_BOUNDARY.split(text) if s.strip()]
+        return self._merge(self._fit(sentences), " ")
+
+
+class RecursiveChunker(_MergingChunker):
+    """Splits on the coarsest separator (paragraphs, lines, sentences, words)
+    that yields pieces small enough, recursing into pieces that are not."""
+
+    def __init__(
+        self,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        overlap: int = 20,
+        separators: Optional[Sequence[str]] = None,
+    ):
+        super().__init__(chunk_size, overlap)
+        self.separators = list(separators or ["\n\n", "\n", ". ", " "])
+
+    def split(self, text):
+        return self._split(text.strip(), self.separators)
+
+    def _split(self, text: str, separators: List[str]) -> List[str]:
+        if count_tokens(text) <= self.chunk_size:
+            return [text] if text else []
+        for i, separator in enumerate(separators):
+            if separator in text:
+                pieces = []
+                for piece in text.split(separator):
+                    if count_tokens(piece) > self.chunk_size:
+                        pieces.extend(self._split(piece, separators[i + 1 :]))
+                    else:
+                        pieces.append(piece)
+                return self._merge(pieces, separator)
+        return FixedTokenChunker(self.chunk_size, self.overlap).split(text)
+
+
+CHUNKERS = {
+    "fixed": FixedTokenChunker,
+    "sentence": SentenceChunker,
+    "recursive": RecursiveChunker,
+}
+
+
+def create_chunker(
+    strategy: Optional[str] = None,
+    chunk_size: Optional[int] = None,
+    overlap: Optional[int] = None,
+) -> Chunker:
+    strategy = strategy or os.getenv("CHUNK_STRATEGY", "recursive")
+    if strategy not in CHUNKERS:
+        raise ValueError(
+            f"Unknown chunking strategy: {strategy}. Expected one of {list(CHUNKERS)}."
+        )
+    return CHUNKERS[strategy](
+        chunk_size or int(os.getenv("CHUNK_SIZE", str(DEFAULT_CHUNK_SIZE))),
+        overlap if overlap is not None else int(os.getenv("CHUNK_OVERLAP", "20")),
+    )
+
+
+def chunk_document(document: Document, chunker: Chunker) -> List[Document]:
+    """Split a document into chunk documents that point back to their parent.
+
+    A document that fits in one chunk is returned unchanged.
+    """
+    chunks = chunker.split(document.content)
+    if len(chunks) <= 1:
+        return [document]
+    return [
+        Document(
+            id=f"{document.id}:{index}",
+            content=chunk,
+            metadata={
+                **document.metadata,
+                "parent_id": document.id,
+                "chunk_index": index,
+            },
+        )
+        for index, chunk in enumerate(chunks)
+    ]
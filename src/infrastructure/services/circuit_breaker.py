@@ -0,0 +1,62 @@
+import time
+import threading
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a backend that recently kept failing."""
+
+
+class CircuitBreaker:
+    """Fails fast after ``failure_threshold`` consecutive failures.
+
+    Once open, calls are refused for ``reset_timeout`` seconds; then one trial
+    call is let through (half-open) and its outcome closes or re-opens it. A
+    trial that never reports back (cancelled, or failed with an unexpected
+    error) is replaced by another after ``reset_timeout``.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._trial_started = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            now = time.monotonic()
+            if self.state == self.OPEN:
+                if now - self._opened_at < self.reset_timeout:
+                    return False
+                self.state = self.HALF_OPEN
+                self._trial_started = now
+                return True
+            # Half-open: a trial call is already in flight, unless it was lost
+            if now - self._trial_started < self.reset_timeout:
+                return False
+            self._trial_started = now
+            return True
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(
+                f"Circuit open after {self.failures} consecutive failures"
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self._opened_at = time.monotonic()
@@ -0,0 +1,126 @@
+import os
+import numpy as np
+from typing import Callable, List, Optional, Tuple
+from src.infrastructure.services.chunker import (
+    SENTENCE_BOUNDARY,
+    TOKEN_PATTERN,
+    count_tokens,
+)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Longest prefix of ``text`` within ``max_tokens``, cut after a sentence
+    when at least one whole sentence fits, otherwise after a word."""
+    sentences = [s for s in SENTENCE_BOUNDARY.split(text.strip()) if s]
+    kept, used = [], 0
+    for sentence in sentences:
+        tokens = count_tokens(sentence)
+        if used + tokens > max_tokens:
+            break
+        kept.append(sentence)
+        used += tokens
+    if kept:
+        return " ".join(kept)
+    spans = [match.span() for match in TOKEN_PATTERN.finditer(text)]
+    if not spans or max_tokens <= 0:
+        return ""
+    return text[spans[0][0] : spans[min(max_tokens, len(spans)) - 1][1]]
+
+
+class ContextBuilder:
+    """Packs retrieved documents into a prompt context of at most
+    ``token_budget`` tokens (counted as in the chunker).
+
+    Documents are taken in retrieval (relevance) order. One whose embedding
+    has a cosine similarity of at least ``dedup_threshold`` with a document
+    already taken is dropped as a near-duplicate. The vectors are the
+    stored ones the search attached to the documents; ``encode`` embeds
+    any document that came without one. Without either, only exact
+    duplicates are dropped. A document that does not fit is
+    truncated (see truncate_to_tokens) when at least ``min_tokens`` of it
+    fit, which fills the context; otherwise it is skipped in favour of
+    shorter ones further down.
+    """
+
+    def __init__(
+        self,
+        encode: Optional[Callable[[List[str]], np.ndarray]] = None,
+        token_budget: Optional[int] = None,
+        dedup_threshold: Optional[float] = None,
+        min_tokens: Optional[int] = None,
+    ):
+        self.encode = encode
+        self.token_budget = token_budget or int(
+            os.getenv("CONTEXT_TOKEN_BUDGET", "1500")
+        )
+        self.dedup_threshold = dedup_threshold or float(
+            os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.95")
+        )
+        self.min_tokens = min_tokens or int(
+            os.getenv("CONTEXT_MIN_TRUNCATED_TOKENS", "32")
+        )
+
+    def build(
+        self, documents: List[dict], vectors: Optional[list] = None
+    ) -> Tuple[str, dict]:
+        """Return the context text and a report of what went into it.
+
+        ``vectors`` holds each document's stored embedding, or None.
+        """
+        if len(documents) > 1:
+            vectors = self._vectors(documents, vectors)
+        else:
+            vectors = None
+
+        pieces, kept = [], []
+        report = {
+            "documents": [],
+            "duplicates": [],
+            "truncated": None,
+            "omitted": [],
+            "context_tokens": 0,
+        }
+        seen = set()
+        for i, doc in enumerate(documents):
+            if report["truncated"] is not None or (
+                report["context_tokens"] >= self.token_budget
+            ):
+                report["omitted"].append(doc["id"])
+                continue
+            if doc["content"] in seen or (
+                vectors is not None
+                and kept
+                and float(np.max(vectors[kept] @ vectors[i])) >= self.dedup_threshold
+            ):
+                report["duplicates"].append(doc["id"])
+                continue
+
+            content = doc["content"]
+            tokens = count_tokens(content)
+            remaining = self.token_budget - report["context_tokens"]
+            if tokens > remaining:
+                if remaining < min(self.min_tokens, tokens):
+                    report["omitted"].append(doc["id"])
+                    continue
+                content = truncate_to_tokens(content, remaining)
+                tokens = count_tokens(content)
+                report["truncated"] = doc["id"]
+            seen.add(doc["content"])
+            kept.append(i)
+            pieces.append(content)
+            report["documents"].append(doc["id"])
+            report["context_tokens"] += tokens
+        return " ".join(pieces), report
+
+    def _vectors(
+        self, documents: List[dict], stored: Optional[list]
+    ) -> Optional[np.ndarray]:
+        vectors = list(stored) if stored is not None else [None] * len(documents)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            if self.encode is None:
+                return None
+            encoded = self.encode([documents[i]["content"] for i in missing])
+            for i, vector in zip(missing, encoded):
+                vectors[i] = vector
+        return np.vstack(vectors).astype("float32", copy=False)
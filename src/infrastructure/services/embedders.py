@@ -0,0 +1,313 @@
+import os
+import re
+import time
+import logging
+import threading
+import numpy as np
+from abc import ABC, abstractmethod
+from typing import List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+
+class Embedder(ABC):
+    """Turns texts into embedding vectors; a drop-in for ``SentenceTransformer``.
+
+    Pass one as ``embedding_model`` to VectorDB. The model loads on first
+    use, texts are sorted by length before batching so batches carry little
+    padding, and ``name`` identifies backend and precision (embedding caches
+    are keyed on it, so vectors from different backends never mix).
+    """
+
+    def __init__(self, model_name: str, threads: Optional[int] = None):
+        self.model_name = model_name
+        self.threads = threads
+        self.load_seconds = None
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        pass
+
+    @abstractmethod
+    def _load(self):
+        pass
+
+    @abstractmethod
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        pass
+
+    @abstractmethod
+    def _dimension(self) -> int:
+        pass
+
+    def _ensure_loaded(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    start = time.perf_counter()
+                    self._model = self._load()
+                    self.load_seconds = time.perf_counter() - start
+                    logger.info("Loaded %s in %.2fs", self.name, self.load_seconds)
+        return self._model
+
+    def encode(self, sentences, batch_size: int = 64, **kwargs) -> np.ndarray:
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        self._ensure_loaded()
+        vectors = np.zeros((len(texts), self._dimension()), dtype="float32")
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        for start in range(0, len(order), batch_size):
+            rows = order[start : start + batch_size]
+            vectors[rows] = self._encode_batch([texts[i] for i in rows])
+        return vectors[0] if single else vectors
+
+    def get_sentence_embedding_dimension(self) -> int:
+        self._ensure_loaded()
+        return self._dimension()
+
+
+class SentenceTransformerEmbedder(Embedder):
+    """PyTorch SentenceTransformer on CPU, optionally with dynamic int8 weights."""
+
+    def __init__(self, model_name, threads=None, quantize: bool = False):
+        super().__init__(model_name, threads)
+        self.quantize = quantize
+
+    @property
+    def name(self):
+        # The fp32 name is the bare model name, as used by earlier caches
+        return f"{self.model_name}+int8" if self.quantize else self.model_name
+
+    def _load(self):
+        from sentence_transformers import SentenceTransformer
+
+        if self.threads:
+            import torch
+
+            torch.set_num_threads(self.threads)
+        model = SentenceTransformer(self.model_name, device="cpu")
+        if self.quantize:
+            import torch
+
+            # Linear layers hold nearly all the weights and FLOPs of a
+            # transformer encoder; activations are quantized per batch
+            model = torch.ao.quantization.quantize_dynamic(
+                model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+        return model
+
+    def _encode_batch(self, texts):
+        return self._model.encode(
+            texts, batch_size=len(texts), show_progress_bar=False
+        )
+
+    def _dimension(self):
+        # Renamed to get_embedding_dimension in newer sentence-transformers
+        get_dimension = getattr(self._model, "get_embedding_dimension", None)
+        if get_dimension is None:
+            get_dimension = self._model.get_sentence_embedding_dimension
+        return get_dimension()
+
+
+class OnnxEmbedder(Embedder):
+    """ONNX Runtime inference with mean pooling, as sentence-transformers does.
+
+    The Hugging Face model is exported to ``onnx_dir`` once (and quantized to
+    int8 there when asked); later loads only read the .onnx file and the
+    tokenizer from that directory, without importing PyTorch.
+    """
+
+    def __init__(
+        self,
+        model_name,
+        threads=None,
+        quantize: bool = False,
+        onnx_dir: Optional[str] = None,
+        max_length: Optional[int] = None,
+    ):
+        super().__init__(model_name, threads)
+        self.quantize = quantize
+        safe_name = re.sub(r"[^\w.-]", "_", model_name)
+        self.onnx_dir = onnx_dir or os.path.join(
+            os.getenv("EMBEDDING_ONNX_DIR", "./data/onnx"), safe_name
+        )
+        self.max_length = max_length or int(os.getenv("EMBEDDING_MAX_LENGTH", "256"))
+
+    @property
+    def name(self):
+        return f"{self.model_name}+onnx" + ("-int8" if self.quantize else "")
+
+    @property
+    def hub_id(self) -> str:
+        # sentence-transformers resolves bare names under its organisation
+        if "/" in self.model_name or os.path.isdir(self.model_name):
+            return self.model_name
+        return f"sentence-transformers/{self.model_name}"
+
+    def _load(self):
+        import onnxruntime
+        from transformers import AutoTokenizer
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if self.threads:
+            options.intra_op_num_threads = self.threads
+        options.inter_op_num_threads = 1
+        session = onnxruntime.InferenceSession(
+            self.export(), options, providers=["CPUExecutionProvider"]
+        )
+        tokenizer = AutoTokenizer.from_pretrained(self.onnx_dir)
+        return session, tokenizer
+
+    def export(self) -> str:
+        """Path of the .onnx file to run, exporting/quantizing it if missing."""
+        fp32_path = os.path.join(self.onnx_dir, "model.onnx")
+        if not os.path.exists(fp32_path):
+            self._export_fp32(fp32_path)
+        if not self.quantize:
+            return fp32_path
+
+        int8_path = os.path.join(self.onnx_dir, "model.int8.onnx")
+        if not os.path.exists(int8_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+
+            tmp_path = f"{int8_path}.tmp"
+            quantize_dynamic(fp32_path, tmp_path, weight_type=QuantType.QInt8)
+            os.replace(tmp_path, int8_path)
+        return int8_path
+
+    def _export_fp32(self, path: str) -> None:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+
+        logger.info("Exporting %s to %s", self.hub_id, path)
+        os.makedirs(self.onnx_dir, exist_ok=True)
+        tokenizer = AutoTokenizer.from_pretrained(self.hub_id)
+        model = AutoModel.from_pretrained(self.hub_id).eval()
+        sample = tokenizer(["An example sentence"], return_tensors="pt")
+        input_names = [
+            name
+            for name in ("input_ids", "attention_mask", "token_type_ids")
+            if name in sample
+        ]
+        dynamic_axes = {
+            name: {0: "batch", 1: "sequence"}
+            for name in input_names + ["last_hidden_state"]
+        }
+
+        class LastHiddenState(torch.nn.Module):
+            # Named inputs in, one tensor out: keeps the traced graph free of
+            # the model's optional arguments and output dataclass
+            def __init__(self):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs)))[0]
+
+        tmp_path = f"{path}.tmp"
+        with torch.no_grad():
+            torch.onnx.export(
+                LastHiddenState(),
+                tuple(sample[name] for name in input_names),
+                tmp_path,
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=17,
+                dynamo=False,
+            )
+        tokenizer.save_pretrained(self.onnx_dir)
+        os.replace(tmp_path, path)
+
+    def _encode_batch(self, texts):
+        session, tokenizer = self._model
+        encoded = tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_length,
+            return_tensors="np",
+        )
+        feeds = {
+            node.name: encoded[node.name].astype("int64")
+            for node in session.get_inputs()
+        }
+        hidden = session.run(None, feeds)[0]
+        # Mean over real tokens only
+        mask = encoded["attention_mask"][..., None].astype("float32")
+        return (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def _dimension(self):
+        session, _ = self._model
+        return int(session.get_outputs()[0].shape[-1])
+
+
+EMBEDDERS = {
+    "sentence-transformers": SentenceTransformerEmbedder,
+    "onnx": OnnxEmbedder,
+}
+
+
+def create_embedder(
+    backend: Optional[str] = None,
+    model_name: Optional[str] = None,
+    quantize: Optional[bool] = None,
+    threads: Optional[int] = None,
+) -> Embedder:
+    backend = backend or os.getenv("EMBEDDING_BACKEND", "sentence-transformers")
+    if backend not in EMBEDDERS:
+        raise ValueError(
+            f"Unknown embedding backend: {backend}. Expected one of {list(EMBEDDERS)}."
+        )
+    if quantize is None:
+        quantize = os.getenv("EMBEDDING_QUANTIZE", "false").lower() == "true"
+    if threads is None and os.getenv("EMBEDDING_THREADS"):
+        threads = int(os.getenv("EMBEDDING_THREADS"))
+    return EMBEDDERS[backend](
+        model_name or os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2"),
+        threads=threads,
+        quantize=quantize,
+    )
+
+
+def embedder_name(model, default: str) -> str:
+    """Embedding cache namespace of ``model`` (any object with ``encode``)."""
+    name = getattr(model, "name", None)
+    return name if isinstance(name, str) and name else default
+
+
+def embedding_parity(
+    candidate, reference, texts: Sequence[str], batch_size: int = 64
+) -> dict:
+    """Cosine similarity of ``candidate`` embeddings to ``reference`` ones.
+
+    Reports mean/min/p1 cosine over ``texts`` (drift = 1 - cosine) and the
+    throughput of both models on the same texts.
+    """
+    texts = list(texts)
+    timings = {}
+    vectors = {}
+    for label, model in (("candidate", candidate), ("reference", reference)):
+        model.encode(texts[:1], batch_size=batch_size)  # Load before timing
+        start = time.perf_counter()
+        encoded = np.asarray(model.encode(texts, batch_size=batch_size), "float32")
+        timings[label] = time.perf_counter() - start
+        norms = np.linalg.norm(encoded, axis=1, keepdims=True)
+        vectors[label] = encoded / np.clip(norms, 1e-12, None)
+    cosines = (vectors["candidate"] * vectors["reference"]).sum(axis=1)
+    return {
+        "texts": len(texts),
+        "mean_cosine": float(cosines.mean()),
+        "min_cosine": float(cosines.min()),
+        "p1_cosine": float(np.percentile(cosines, 1)),
+        "max_drift": float(1 - cosines.min()),
+        "candidate_texts_per_sec": len(texts) / timings["candidate"],
+        "reference_texts_per_sec": len(texts) / timings["reference"],
+        "speedup": timings["reference"] / timings["candidate"],
+    }
@@ -0,0 +1,29 @@
+import os
+import asyncio
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BoundedExecutor:
+    """Fixed-size thread pool for CPU-bound work (embedding, FAISS search) awaited
+    from async handlers, so it never blocks the event loop."""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or int(
+            os.getenv("CPU_EXECUTOR_WORKERS", str(os.cpu_count() or 4))
+        )
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_workers, thread_name_prefix="cpu-bound"
+        )
+
+    async def run(self, fn, *args, **kwargs):
+        loop = asyncio.get_running_loop()
+        # Carry context variables (the request's trace id) into the worker
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(
+            self._pool, functools.partial(context.run, fn, *args, **kwargs)
+        )
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False)
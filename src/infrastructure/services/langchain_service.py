@@ -1,16 +1,70 @@
+import time
+import logging
+import asyncio
+import threading
 import requests
-import openai
+import httpx
 import os
-from openai import OpenAI
+from contextlib import contextmanager, asynccontextmanager
+from requests.adapters import HTTPAdapter
+from src.infrastructure.services.circuit_breaker import (
+    CircuitBreaker,
+    CircuitOpenError,
+)
+from src.infrastructure.services.metrics import REGISTRY
+from src.infrastructure.services.llm_backends import create_llm_backend
+
+logger = logging.getLogger(__name__)
+
+# Model server responses worth retrying; anything else is the caller's fault
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+LLM_RETRIES = REGISTRY.counter(
+    "rag_llm_retries", "LLM requests retried after a transient error"
+)
+LLM_ERRORS = REGISTRY.counter(
+    "rag_llm_errors", "LLM calls that returned an error message", ("reason",)
+)
+
+
+class LLMErrorMessage(str):
+    """Text yielded or returned in place of model output when the LLM fails,
+    so callers can tell a failed (possibly partial) stream from an answer."""
 
 
 class LangChainService:
-    def __init__(self, vector_db_repository):
+    # Responses starting with these are error messages, not model output
+    ERROR_PREFIXES = (
+        "An error occurred while generating the response",
+        "The language model is unavailable",
+    )
+
+    def __init__(self, vector_db_repository, backend=None):
         self.vector_db_repository = vector_db_repository
-        # self.api_key = os.getenv("OPENAI_API_KEY")
-        # openai.api_key = self.api_key
-        self.ollama_url = "http://localhost:11434"  # Ollama's default API endpoint
-        self.api_key = os.getenv("OLLAMA_API_KEY")
+        # Which model server answers, and its wire format (LLM_BACKEND)
+        self.backend = backend or create_llm_backend()
+
+        # Connection handling towards the model server
+        self.connect_timeout = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+        self.read_timeout = float(os.getenv("LLM_READ_TIMEOUT", "120"))
+        self.max_concurrency = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.max_retries = int(os.getenv("LLM_MAX_RETRIES", "3"))
+        self.retry_backoff = float(os.getenv("LLM_RETRY_BACKOFF", "0.5"))
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv("LLM_CIRCUIT_FAILURES", "5")),
+            reset_timeout=float(os.getenv("LLM_CIRCUIT_RESET", "30")),
+        )
+
+        # One keep-alive pool shared by every sync request
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.max_concurrency)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._semaphore = threading.BoundedSemaphore(self.max_concurrency)
+
+        self._async_client = None
+        self._async_client_loop = None
+        self._async_semaphore = None
 
     def process_data(self, data):
         # Logic to process data using LangChain
@@ -22,13 +76,25 @@ class LangChainService:
         response = self._langchain_generate(query)
         return response
 
+    async def generate_response_async(self, query):
+        # Non-blocking variant of generate_response for async endpoints
+        return await self._langchain_generate_async(query)
+
+    def generate_response_stream(self, query):
+        # Yields response tokens as the LLM produces them
+        return self._langchain_generate_stream(query)
+
+    def generate_response_stream_async(self, query):
+        # Async generator variant of generate_response_stream
+        return self._langchain_generate_stream_async(query)
+
     def _langchain_process(self, data):
         # Placeholder for LangChain processing logic
         return data  # Replace with actual processing logic
 
     def _langchain_generate(self, query):
         """
-        Generate a response using Ollama's API.
+        Generate a response with the configured LLM backend.
 
         Args:
             query (str): The user's query.
@@ -37,26 +103,223 @@ class LangChainService:
             str: The generated response.
         """
         try:
-            headers = {"Authorization": f"Bearer {self.api_key}"}
-            payload = {"model": "llama3.2", "prompt": query, "stream": False}
-            print("Payload: ", payload)  # Debugging line
-            print("Headers: ", headers)  # Debugging line
-            print("Ollama URL: ", self.ollama_url)  # Debugging line
-            response = requests.post(
-                f"{self.ollama_url}/api/generate", json=payload, headers=headers
+            return self.backend.generate(self, query)
+        except CircuitOpenError as e:
+            LLM_ERRORS.inc(reason="circuit_open")
+            logger.warning("Error generating response: %s", e)
+            return LLMErrorMessage(f"The language model is unavailable: {e}")
+        except requests.exceptions.RequestException as e:
+            LLM_ERRORS.inc(reason="http")
+            logger.error("Error generating response: %s", e)
+            return LLMErrorMessage(
+                f"An error occurred while generating the response: {e}"
             )
-            response.raise_for_status()
-            return response.json().get("response", "No response generated.")
+        except Exception as e:
+            LLM_ERRORS.inc(reason="unexpected")
+            logger.exception("Error generating response: %s", e)
+            return LLMErrorMessage(
+                "An error occurred while generating the response."
+            )
+
+    def _langchain_generate_stream(self, query):
+        """
+        Stream a response from the configured LLM backend token by token.
+
+        Args:
+            query (str): The user's query.
+
+        Yields:
+            str: The next piece of the generated response.
+        """
+        try:
+            yield from self.backend.generate_stream(self, query)
+        except CircuitOpenError as e:
+            LLM_ERRORS.inc(reason="circuit_open")
+            logger.warning("Error generating response: %s", e)
+            yield LLMErrorMessage(f"The language model is unavailable: {e}")
         except requests.exceptions.RequestException as e:
-            print(f"Error generating response: {e}")
-            return f"An error occurred while generating the response: {e}"
+            LLM_ERRORS.inc(reason="http")
+            logger.error("Error generating response: %s", e)
+            yield LLMErrorMessage(
+                f"An error occurred while generating the response: {e}"
+            )
+        except Exception as e:
+            LLM_ERRORS.inc(reason="unexpected")
+            logger.exception("Error generating response: %s", e)
+            yield LLMErrorMessage(
+                "An error occurred while generating the response."
+            )
+
+    @contextmanager
+    def request(self, url, payload, headers):
+        """POST to the model server through the pooled session, holding a
+        concurrency slot until the (possibly streamed) response has been
+        consumed."""
+        self.circuit_breaker.check()
+        # Never log the headers: they carry the API key
+        logger.debug("Sending %s request to %s", self.backend.name, url)
+        with self._semaphore:
+            response = self._with_retries(
+                lambda: self.session.post(
+                    url,
+                    json=payload,
+                    headers=headers,
+                    timeout=(self.connect_timeout, self.read_timeout),
+                    stream=payload["stream"],
+                )
+            )
+            try:
+                yield response
+            except requests.exceptions.RequestException:
+                # The stream broke after the request succeeded: the server
+                # failed mid-response, which counts against it too
+                self.circuit_breaker.record_failure()
+                raise
+            finally:
+                response.close()
+
+    def _with_retries(self, send):
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = send()
+                response.raise_for_status()
+            except requests.exceptions.RequestException as e:
+                # Give a failed (possibly streamed) response's connection back
+                if response is not None:
+                    response.close()
+                if not self._is_transient(e):
+                    # The server answered, so it is up; the request was bad
+                    self.circuit_breaker.record_success()
+                    raise
+                if attempt == self.max_retries:
+                    self.circuit_breaker.record_failure()
+                    raise
+                LLM_RETRIES.inc()
+                logger.warning("Transient LLM error, retrying: %s", e)
+                time.sleep(self._backoff(attempt))
+            else:
+                self.circuit_breaker.record_success()
+                return response
+
+    @staticmethod
+    def _is_transient(error) -> bool:
+        if isinstance(error, (requests.exceptions.HTTPError, httpx.HTTPStatusError)):
+            return error.response.status_code in RETRYABLE_STATUS_CODES
+        return isinstance(
+            error,
+            (
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                httpx.TransportError,
+            ),
+        )
+
+    def _backoff(self, attempt: int) -> float:
+        # Exponential backoff: retry_backoff, 2x, 4x, ...
+        return self.retry_backoff * (2**attempt)
+
+    async def _langchain_generate_stream_async(self, query):
+        """
+        Stream a response from the LLM backend without blocking the event loop.
+
+        Args:
+            query (str): The user's query.
+
+        Yields:
+            str: The next piece of the generated response.
+        """
+        try:
+            async for token in self.backend.generate_stream_async(self, query):
+                yield token
+        except CircuitOpenError as e:
+            LLM_ERRORS.inc(reason="circuit_open")
+            logger.warning("Error generating response: %s", e)
+            yield LLMErrorMessage(f"The language model is unavailable: {e}")
+        except httpx.HTTPError as e:
+            LLM_ERRORS.inc(reason="http")
+            logger.error("Error generating response: %s", e)
+            yield LLMErrorMessage(
+                f"An error occurred while generating the response: {e}"
+            )
         except Exception as e:
-            print(f"Error generating response: {e}")
-            return "An error occurred while generating the response."
+            LLM_ERRORS.inc(reason="unexpected")
+            logger.exception("Error generating response: %s", e)
+            yield LLMErrorMessage(
+                "An error occurred while generating the response."
+            )
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        # Connections belong to an event loop, so reuse the client only within one
+        loop = asyncio.get_running_loop()
+        if self._async_client is None or self._async_client_loop is not loop:
+            self._async_client = httpx.AsyncClient(
+                timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+                limits=httpx.Limits(
+                    max_connections=self.max_concurrency,
+                    max_keepalive_connections=self.max_concurrency,
+                ),
+            )
+            self._async_client_loop = loop
+            self._async_semaphore = asyncio.Semaphore(self.max_concurrency)
+        return self._async_client
+
+    @asynccontextmanager
+    async def request_async(self, url, payload, headers):
+        # Async counterpart of request
+        self.circuit_breaker.check()
+        logger.debug("Sending %s request to %s", self.backend.name, url)
+        client = self._get_async_client()
+        if payload["stream"]:
+
+            def send():
+                request = client.build_request(
+                    "POST", url, json=payload, headers=headers
+                )
+                return client.send(request, stream=True)
+
+        else:
 
-    def _langchain_generate2(self, query):
+            def send():
+                return client.post(url, json=payload, headers=headers)
+
+        async with self._async_semaphore:
+            response = await self._with_retries_async(send)
+            try:
+                yield response
+            except httpx.HTTPError:
+                self.circuit_breaker.record_failure()
+                raise
+            finally:
+                if payload["stream"]:
+                    await response.aclose()
+
+    async def _with_retries_async(self, send):
+        for attempt in range(self.max_retries + 1):
+            response = None
+            try:
+                response = await send()
+                response.raise_for_status()
+            except httpx.HTTPError as e:
+                # A streamed response holds a pooled connection until closed
+                if response is not None:
+                    await response.aclose()
+                if not self._is_transient(e):
+                    self.circuit_breaker.record_success()
+                    raise
+                if attempt == self.max_retries:
+                    self.circuit_breaker.record_failure()
+                    raise
+                LLM_RETRIES.inc()
+                logger.warning("Transient LLM error, retrying: %s", e)
+                await asyncio.sleep(self._backoff(attempt))
+            else:
+                self.circuit_breaker.record_success()
+                return response
+
+    async def _langchain_generate_async(self, query):
         """
-        Generate a response using OpenAI's ChatGPT model.
+        Generate a response with the LLM backend without blocking the event loop.
 
         Args:
             query (str): The user's query.
@@ -65,18 +328,29 @@ class LangChainService:
             str: The generated response.
         """
         try:
-            client = OpenAI()
-
-            response = client.chat.completions.create(
-                model="gpt-3.5-turbo",  # You can use "gpt-4" if available
-                messages=[
-                    {"role": "system", "content": "You are a helpful assistant."},
-                    {"role": "user", "content": query},
-                ],
-                max_tokens=150,
-                temperature=0.7,
+            return await self.backend.generate_async(self, query)
+        except CircuitOpenError as e:
+            LLM_ERRORS.inc(reason="circuit_open")
+            logger.warning("Error generating response: %s", e)
+            return LLMErrorMessage(f"The language model is unavailable: {e}")
+        except httpx.HTTPError as e:
+            LLM_ERRORS.inc(reason="http")
+            logger.error("Error generating response: %s", e)
+            return LLMErrorMessage(
+                f"An error occurred while generating the response: {e}"
             )
-            return response["choices"][0]["message"]["content"].strip()
         except Exception as e:
-            print(f"Error generating response: {e}")
-            return "An error occurred while generating the response."
+            LLM_ERRORS.inc(reason="unexpected")
+            logger.exception("Error generating response: %s", e)
+            return LLMErrorMessage(
+                "An error occurred while generating the response."
+            )
+
+    def close(self):
+        self.session.close()
+
+    async def aclose(self):
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+        self.close()
@@ -0,0 +1,272 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+from abc import ABC, abstractmethod
+from typing import AsyncIterator, Iterator, Optional, Tuple
+
+
+class LLMBackend(ABC):
+    """A kind of model server: how to ask it for a (streamed) completion.
+
+    ``client`` is the LangChainService sending the request: remote backends
+    go through its pooled, retried and circuit-broken connections, so no
+    backend opens a client of its own per call.
+    """
+
+    name = ""
+
+    @abstractmethod
+    def generate(self, client, prompt: str) -> str:
+        pass
+
+    @abstractmethod
+    def generate_stream(self, client, prompt: str) -> Iterator[str]:
+        pass
+
+    @abstractmethod
+    async def generate_async(self, client, prompt: str) -> str:
+        pass
+
+    @abstractmethod
+    def generate_stream_async(self, client, prompt: str) -> AsyncIterator[str]:
+        pass
+
+
+class HTTPBackend(LLMBackend):
+    """A model server behind an HTTP API; subclasses define the wire format."""
+
+    path = ""
+    default_base_url = ""
+    default_model = ""
+    api_key_env = ""
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+    ):
+        self.base_url = (base_url or self.default_base_url).rstrip("/")
+        self.model = model or self.default_model
+        self.api_key = api_key or os.getenv(self.api_key_env)
+
+    @property
+    def url(self) -> str:
+        return f"{self.base_url}{self.path}"
+
+    def headers(self) -> dict:
+        return {"Authorization": f"Bearer {self.api_key}"}
+
+    @abstractmethod
+    def payload(self, prompt: str, stream: bool) -> dict:
+        pass
+
+    @abstractmethod
+    def parse_response(self, body: dict) -> str:
+        pass
+
+    @abstractmethod
+    def parse_stream_line(self, line) -> Tuple[str, bool]:
+        """(token, done) for one line of a streamed response."""
+
+    def generate(self, client, prompt):
+        payload = self.payload(prompt, stream=False)
+        with client.request(self.url, payload, self.headers()) as response:
+            return self.parse_response(response.json())
+
+    def generate_stream(self, client, prompt):
+        payload = self.payload(prompt, stream=True)
+        with client.request(self.url, payload, self.headers()) as response:
+            for line in response.iter_lines():
+                token, done = self.parse_stream_line(line)
+                if token:
+                    yield token
+                if done:
+                    break
+
+    async def generate_async(self, client, prompt):
+        payload = self.payload(prompt, stream=False)
+        async with client.request_async(self.url, payload, self.headers()) as response:
+            return self.parse_response(response.json())
+
+    async def generate_stream_async(self, client, prompt):
+        payload = self.payload(prompt, stream=True)
+        async with client.request_async(self.url, payload, self.headers()) as response:
+            async for line in response.aiter_lines():
+                token, done = self.parse_stream_line(line)
+                if token:
+                    yield token
+                if done:
+                    break
+
+
+class OllamaBackend(HTTPBackend):
+    """Ollama's /api/generate; a stream is one JSON object per line, each
+    carrying the next piece of the response until one has ``"done": true``."""
+
+    name = "ollama"
+    path = "/api/generate"
+    default_base_url = "http://localhost:11434"  # Ollama's default API endpoint
+    default_model = "llama3.2"
+    api_key_env = "OLLAMA_API_KEY"
+
+    def payload(self, prompt, stream):
+        return {"model": self.model, "prompt": prompt, "stream": stream}
+
+    def parse_response(self, body):
+        return body.get("response", "No response generated.")
+
+    def parse_stream_line(self, line):
+        if not line:
+            return "", False
+        chunk = json.loads(line)
+        return chunk.get("response", ""), chunk.get("done", False)
+
+
+class OpenAICompatibleBackend(HTTPBackend):
+    """/v1/chat/completions of OpenAI or any server implementing it (vLLM,
+    llama.cpp, LM Studio, ...); a stream is server-sent events of deltas."""
+
+    name = "openai"
+    path = "/v1/chat/completions"
+    default_base_url = "https://api.openai.com"
+    default_model = "gpt-3.5-turbo"
+    api_key_env = "OPENAI_API_KEY"
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        model: Optional[str] = None,
+        api_key: Optional[str] = None,
+        max_tokens: Optional[int] = None,
+        temperature: Optional[float] = None,
+    ):
+        super().__init__(base_url, model, api_key)
+        self.max_tokens = max_tokens or int(os.getenv("LLM_MAX_TOKENS", "150"))
+        self.temperature = (
+            temperature
+            if temperature is not None
+            else float(os.getenv("LLM_TEMPERATURE", "0.7"))
+        )
+
+    def payload(self, prompt, stream):
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": "You are a helpful assistant."},
+                {"role": "user", "content": prompt},
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": stream,
+        }
+
+    def parse_response(self, body):
+        choices = body.get("choices") or [{}]
+        content = choices[0].get("message", {}).get("content")
+        return content.strip() if content else "No response generated."
+
+    def parse_stream_line(self, line):
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.startswith("data:"):
+            return "", False  # Blank separators and SSE comments
+        data = line[len("data:") :].strip()
+        if data == "[DONE]":
+            return "", True
+        choices = json.loads(data).get("choices") or [{}]
+        return choices[0].get("delta", {}).get("content") or "", False
+
+
+class StubBackend(LLMBackend):
+    """An in-process stand-in for a model server, for offline load tests.
+
+    The answer depends only on the prompt. It starts after ``latency_ms`` and
+    then arrives at ``tokens_per_second`` (0: all at once), so the time spent
+    outside the model is the measured time minus a known model time.
+    """
+
+    name = "stub"
+
+    def __init__(
+        self,
+        latency_ms: Optional[float] = None,
+        tokens_per_second: Optional[float] = None,
+        response_tokens: Optional[int] = None,
+    ):
+        self.latency = (
+            latency_ms
+            if latency_ms is not None
+            else float(os.getenv("LLM_STUB_LATENCY_MS", "200"))
+        ) / 1000
+        self.tokens_per_second = (
+            tokens_per_second
+            if tokens_per_second is not None
+            else float(os.getenv("LLM_STUB_TOKENS_PER_SEC", "50"))
+        )
+        self.response_tokens = response_tokens or int(
+            os.getenv("LLM_STUB_TOKENS", "32")
+        )
+
+    def tokens(self, prompt: str) -> list:
+        digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+        return [f"stub-{digest}"] + [f" t{i}" for i in range(1, self.response_tokens)]
+
+    @property
+    def token_interval(self) -> float:
+        return 1 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+
+    def model_seconds(self) -> float:
+        """How long the stub takes to answer any prompt."""
+        return self.latency + self.token_interval * self.response_tokens
+
+    def generate(self, client, prompt):
+        time.sleep(self.model_seconds())
+        return "".join(self.tokens(prompt))
+
+    def generate_stream(self, client, prompt):
+        time.sleep(self.latency)
+        for token in self.tokens(prompt):
+            time.sleep(self.token_interval)
+            yield token
+
+    async def generate_async(self, client, prompt):
+        await asyncio.sleep(self.model_seconds())
+        return "".join(self.tokens(prompt))
+
+    async def generate_stream_async(self, client, prompt):
+        await asyncio.sleep(self.latency)
+        for token in self.tokens(prompt):
+            await asyncio.sleep(self.token_interval)
+            yield token
+
+
+LLM_BACKENDS = {
+    "ollama": OllamaBackend,
+    "openai": OpenAICompatibleBackend,
+    "stub": StubBackend,
+}
+
+
+def create_llm_backend(
+    name: Optional[str] = None,
+    base_url: Optional[str] = None,
+    model: Optional[str] = None,
+) -> LLMBackend:
+    """The backend named by LLM_BACKEND (default ``ollama``), pointed at
+    LLM_BASE_URL and LLM_MODEL when set."""
+    name = name or os.getenv("LLM_BACKEND", "ollama")
+    if name not in LLM_BACKENDS:
+        raise ValueError(
+            f"Unknown LLM backend: {name}. Expected one of {list(LLM_BACKENDS)}."
+        )
+    backend = LLM_BACKENDS[name]
+    if not issubclass(backend, HTTPBackend):
+        return backend()
+    return backend(
+        base_url or os.getenv("LLM_BASE_URL"),
+        model or os.getenv("LLM_MODEL"),
+        os.getenv("LLM_API_KEY"),
+    )
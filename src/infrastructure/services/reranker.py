@@ -0,0 +1,162 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from src.domain.entities.document import Document
+from src.infrastructure.services.metrics import REGISTRY, span
+
+logger = logging.getLogger(__name__)
+
+RERANK_SKIPPED = REGISTRY.counter(
+    "rag_rerank_skipped",
+    "Re-rank calls skipped or cut short to stay within budget",
+    ("reason",),
+)
+RERANK_CACHE = REGISTRY.counter(
+    "rag_rerank_cache", "Cross-encoder score cache lookups", ("result",)
+)
+
+
+class CrossEncoderReranker:
+    """Re-scores retrieved candidates with a cross-encoder and keeps the best.
+
+    Every (query, document) pair not in the LRU score cache is scored in one
+    batched ``predict`` call. Cost is bounded two ways: when
+    ``max_concurrency`` re-ranks are already running, the candidates are
+    returned in retrieval order (skipped), and only as many uncached pairs
+    as the measured time per pair allows within ``budget_ms`` are scored,
+    the best-retrieved first (truncated); the rest follow them unscored.
+    """
+
+    def __init__(
+        self,
+        model=None,
+        model_name: Optional[str] = None,
+        candidates: Optional[int] = None,
+        top_k: Optional[int] = None,
+        budget_ms: Optional[float] = None,
+        max_concurrency: Optional[int] = None,
+        cache_size: Optional[int] = None,
+    ):
+        self.model_name = model_name or os.getenv(
+            "RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2"
+        )
+        self._model = model
+        self._model_lock = threading.Lock()
+        # Documents fetched from the vector DB, and kept after re-ranking
+        self.candidates = candidates or int(os.getenv("RERANK_CANDIDATES", "20"))
+        self.top_k = top_k or int(os.getenv("RERANK_TOP_K", "5"))
+        self.budget_ms = budget_ms or float(os.getenv("RERANK_BUDGET_MS", "200"))
+        self._slots = threading.BoundedSemaphore(
+            max_concurrency or int(os.getenv("RERANK_MAX_CONCURRENCY", "2"))
+        )
+        self.cache_size = cache_size or int(os.getenv("RERANK_CACHE_SIZE", "10000"))
+        self._scores = OrderedDict()  # hash of (query, content) -> score
+        self._scores_lock = threading.Lock()
+        # Moving average of predict() seconds per pair; None until measured
+        self.seconds_per_pair = None
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    # Imported here: sentence_transformers pulls in torch
+                    from sentence_transformers import CrossEncoder
+
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def warm_up(self) -> None:
+        """Load the model and measure its cost per pair before real traffic."""
+        pairs = [("warm-up", "warm-up document")] * 4
+        model = self.model  # Loading is not part of the cost per pair
+        start = time.perf_counter()
+        model.predict(pairs, batch_size=len(pairs))
+        self._record_cost(time.perf_counter() - start, len(pairs))
+
+    @staticmethod
+    def _key(query: str, content: str) -> str:
+        return hashlib.sha256(f"{query}\0{content}".encode("utf-8")).hexdigest()
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        """The ``top_k`` best of ``documents`` (given best-retrieved first)."""
+        if len(documents) <= 1:
+            return documents[: self.top_k]
+        if not self._slots.acquire(blocking=False):
+            RERANK_SKIPPED.inc(reason="busy")
+            return documents[: self.top_k]
+        try:
+            with span("rerank"):
+                scored, unscored = self._score(query, documents)
+        finally:
+            self._slots.release()
+        scored.sort(key=lambda item: -item[0])
+        ranked = [document for _, document in scored] + unscored
+        return ranked[: self.top_k]
+
+    def _score(
+        self, query: str, documents: List[Document]
+    ) -> Tuple[List[Tuple[float, Document]], List[Document]]:
+        keys = [self._key(query, document.content) for document in documents]
+        with self._scores_lock:
+            cached = {}
+            for key in keys:
+                if key in self._scores:
+                    self._scores.move_to_end(key)
+                    cached[key] = self._scores[key]
+        RERANK_CACHE.inc(len(cached), result="hit")
+
+        missing = [i for i, key in enumerate(keys) if key not in cached]
+        affordable = self._affordable_pairs()
+        if len(missing) > affordable:
+            RERANK_SKIPPED.inc(reason="budget")
+            logger.debug("Re-ranking %d of %d new pairs", affordable, len(missing))
+            missing = missing[:affordable]
+        RERANK_CACHE.inc(len(missing), result="miss")
+
+        if missing:
+            pairs = [(query, documents[i].content) for i in missing]
+            model = self.model
+            start = time.perf_counter()
+            new_scores = model.predict(pairs, batch_size=len(pairs))
+            self._record_cost(time.perf_counter() - start, len(pairs))
+            with self._scores_lock:
+                for i, score in zip(missing, new_scores):
+                    cached[keys[i]] = float(score)
+                    self._scores[keys[i]] = float(score)
+                while len(self._scores) > self.cache_size:
+                    self._scores.popitem(last=False)
+
+        scored = [
+            (cached[key], document)
+            for key, document in zip(keys, documents)
+            if key in cached
+        ]
+        unscored = [
+            document for key, document in zip(keys, documents) if key not in cached
+        ]
+        return scored, unscored
+
+    def _affordable_pairs(self) -> int:
+        if self.seconds_per_pair is None:
+            return self.candidates  # Nothing measured yet
+        # Always score at least one pair so a bad estimate keeps being re-measured
+        return max(1, int(self.budget_ms / 1000 / self.seconds_per_pair))
+
+    def _record_cost(self, seconds: float, pairs: int) -> None:
+        per_pair = seconds / pairs
+        if self.seconds_per_pair is None:
+            self.seconds_per_pair = per_pair
+        else:
+            self.seconds_per_pair = 0.8 * self.seconds_per_pair + 0.2 * per_pair
+
+
+def create_reranker() -> Optional[CrossEncoderReranker]:
+    """A reranker when RERANK=true, else None (the stage is skipped)."""
+    if os.getenv("RERANK", "false").lower() != "true":
+        return None
+    return CrossEncoderReranker()
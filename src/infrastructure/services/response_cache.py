@@ -0,0 +1,115 @@
+import os
+import time
+import itertools
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Callable, Iterable, Optional
+
+
+class ResponseCache:
+    """Semantic cache of generated responses keyed on query embeddings.
+
+    A cached response is reused for a new query when both retrieved the same
+    set of documents and their (L2-normalized) query vectors have a cosine
+    similarity of at least ``threshold``. Entries expire after ``ttl`` seconds,
+    the least recently used ones are evicted beyond ``max_entries``, and any
+    entry built from a document is dropped when that document changes.
+    """
+
+    def __init__(
+        self,
+        encode: Callable[[str], np.ndarray],
+        threshold: Optional[float] = None,
+        ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+    ):
+        self.encode = encode
+        self.threshold = threshold or float(
+            os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95")
+        )
+        self.ttl = ttl or float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+        self.max_entries = max_entries or int(
+            os.getenv("RESPONSE_CACHE_SIZE", "1000")
+        )
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # key -> (query vector, doc id set, response, created at)
+        self._entries = OrderedDict()
+        self._by_doc_set = {}  # frozenset of doc ids -> keys
+        self._by_doc_id = {}  # doc id -> keys
+        self._keys = itertools.count()
+        self._lock = threading.Lock()
+
+    def get(self, query: str, doc_ids: Iterable[str]) -> Optional[str]:
+        doc_set = frozenset(doc_ids)
+        vector = self.encode(query)
+        now = time.monotonic()
+        with self._lock:
+            best_key, best_score = None, self.threshold
+            for key in list(self._by_doc_set.get(doc_set, ())):
+                cached_vector, _, _, created = self._entries[key]
+                if now - created > self.ttl:
+                    self._remove(key)
+                    continue
+                score = float(np.dot(vector, cached_vector))
+                if score >= best_score:
+                    best_key, best_score = key, score
+            if best_key is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(best_key)
+            return self._entries[best_key][2]
+
+    def put(self, query: str, doc_ids: Iterable[str], response: str) -> None:
+        doc_set = frozenset(doc_ids)
+        vector = self.encode(query)
+        with self._lock:
+            key = next(self._keys)
+            self._entries[key] = (vector, doc_set, response, time.monotonic())
+            self._by_doc_set.setdefault(doc_set, set()).add(key)
+            for doc_id in doc_set:
+                self._by_doc_id.setdefault(doc_id, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, doc_ids: Iterable[str]) -> None:
+        """Drop every entry whose retrieved documents include one of doc_ids."""
+        with self._lock:
+            for doc_id in doc_ids:
+                for key in list(self._by_doc_id.get(doc_id, ())):
+                    self._remove(key)
+                    self.invalidations += 1
+
+    def _remove(self, key) -> None:
+        _, doc_set, _, _ = self._entries.pop(key)
+        self._discard(self._by_doc_set, doc_set, key)
+        for doc_id in doc_set:
+            self._discard(self._by_doc_id, doc_id, key)
+
+    @staticmethod
+    def _discard(mapping: dict, name, key) -> None:
+        keys = mapping.get(name)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del mapping[name]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._by_doc_set.clear()
+            self._by_doc_id.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+            }
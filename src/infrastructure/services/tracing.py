@@ -0,0 +1,55 @@
+import os
+import uuid
+import logging
+import contextvars
+from typing import Optional
+
+# Trace id of the request being handled; copied into executor threads
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+
+LOG_FORMAT = "%(asctime)s %(levelname)s [%(trace_id)s] %(name)s: %(message)s"
+
+
+def new_trace_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+def get_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+def set_trace_id(trace_id: Optional[str]) -> contextvars.Token:
+    """Bind ``trace_id`` to the current context; pass the token to reset_trace_id."""
+    return _trace_id.set(trace_id)
+
+
+def reset_trace_id(token: contextvars.Token) -> None:
+    _trace_id.reset(token)
+
+
+class TraceIdFilter(logging.Filter):
+    """Adds ``record.trace_id`` ("-" outside a traced request) for LOG_FORMAT."""
+
+    def filter(self, record):
+        record.trace_id = _trace_id.get() or "-"
+        return True
+
+
+def configure_logging(level: Optional[str] = None) -> None:
+    """Log to stderr at LOG_LEVEL (default INFO), tagging lines with trace ids.
+
+    Hot-path diagnostics (search distances, payloads, stage timings) are
+    logged at DEBUG, so they cost one level check unless enabled.
+    """
+    level = (level or os.getenv("LOG_LEVEL", "INFO")).upper()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter(LOG_FORMAT))
+    handler.addFilter(TraceIdFilter())
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        if isinstance(existing, logging.StreamHandler) and any(
+            isinstance(f, TraceIdFilter) for f in existing.filters
+        ):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
@@ -0,0 +1,59 @@
+import time
+import logging
+import threading
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """Runs slow start-up steps (index load, model load) on a background thread.
+
+    ``state`` goes from "pending" to "warming" to "ready", or to "failed" with
+    ``error`` set; ``timings`` holds the seconds each finished step took.
+    """
+
+    PENDING, WARMING, READY, FAILED = "pending", "warming", "ready", "failed"
+
+    def __init__(self, steps: List[Tuple[str, Callable[[], object]]]):
+        self.steps = steps
+        self.state = self.PENDING
+        self.error: Optional[str] = None
+        self.timings = {}
+        self._thread = None
+
+    @property
+    def ready(self) -> bool:
+        return self.state == self.READY
+
+    def start(self) -> None:
+        if self._thread is None:
+            self.state = self.WARMING
+            self._thread = threading.Thread(
+                target=self.run, name="warm-up", daemon=True
+            )
+            self._thread.start()
+
+    def run(self) -> None:
+        self.state = self.WARMING
+        for name, step in self.steps:
+            start = time.perf_counter()
+            try:
+                step()
+            except Exception as e:
+                self.error = f"{name}: {e}"
+                self.state = self.FAILED
+                logger.exception("Warm-up step %s failed", name)
+                return
+            self.timings[name] = time.perf_counter() - start
+        self.state = self.READY
+        steps = ", ".join(f"{name} {took:.2f}s" for name, took in self.timings.items())
+        logger.info("Warm-up finished: %s", steps)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def status(self) -> dict:
+        return {"status": self.state, "error": self.error, "timings": self.timings}
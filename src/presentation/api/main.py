@@ -1,8 +1,31 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import (
+    JSONResponse,
+    PlainTextResponse,
+    Response,
+    StreamingResponse,
+)
 from pydantic import BaseModel
+from typing import List, Literal, Optional
 from src.infrastructure.database.vector_db import VectorDB
+from src.infrastructure.database.sharded_vector_db import ShardedVectorDB
+from src.infrastructure.database.query_batcher import QueryBatcher
+from src.infrastructure.services.response_cache import ResponseCache
+from src.infrastructure.services.metrics import REGISTRY
+from src.infrastructure.services.warmup import WarmUp
+from src.infrastructure.services.reranker import create_reranker
+from src.infrastructure.services.tracing import (
+    configure_logging,
+    new_trace_id,
+    reset_trace_id,
+    set_trace_id,
+)
 from src.application.mediator import AppMediator
+from src.application.queries.retrieve_batch import read_jsonl_queries
 import os
+import json
+import time
+import httpx
 from dotenv import load_dotenv
 
 
@@ -11,35 +34,305 @@ class IngestRequest(BaseModel):
     metadata: dict
 
 
+class IngestBatchRequest(BaseModel):
+    documents: List[IngestRequest]
+
+
+class DeleteBatchRequest(BaseModel):
+    ids: List[str]
+
+
 # Define request model
 class RetrieveRequest(BaseModel):
     query: str
+    # Metadata conditions, e.g. {"category": "animals", "year": {"$gte": 2000}}
+    filters: Optional[dict] = None
+    # Dense (embeddings), lexical (BM25) or hybrid (both, fused); None uses
+    # RETRIEVAL_MODE
+    mode: Optional[Literal["dense", "lexical", "hybrid"]] = None
 
 
-# Initialize dependencies
+# Leveled logging; set LOG_LEVEL=DEBUG for per-stage timings and search hits
+configure_logging()
+
+# Initialize dependencies. Nothing heavy happens at import: the index,
+# metadata and embedding model load in the startup warm-up (or on first use)
 VECTOR_DB_PATH = os.getenv("VECTOR_DB_PATH", "default-secret")
-vector_db = VectorDB(db_path=VECTOR_DB_PATH)
-mediator = AppMediator(vector_db)
+# Multi-worker serving: one process runs with VECTOR_DB_ROLE=writer, the
+# workers with VECTOR_DB_ROLE=reader memory-map the writer's published index
+# and forward /ingest and /delete requests to VECTOR_DB_WRITER_URL
+VECTOR_DB_ROLE = os.getenv("VECTOR_DB_ROLE", "standalone")
+VECTOR_DB_WRITER_URL = os.getenv("VECTOR_DB_WRITER_URL")
+# VECTOR_DB_SHARDS > 1 partitions documents over that many worker processes
+if int(os.getenv("VECTOR_DB_SHARDS", "1")) > 1:
+    vector_db = ShardedVectorDB(db_path=VECTOR_DB_PATH, lazy=True)
+else:
+    vector_db = VectorDB(db_path=VECTOR_DB_PATH, lazy=True)
+# Coalesce concurrent /retrieve searches into batched encode + search calls
+query_batcher = (
+    QueryBatcher(vector_db)
+    if os.getenv("QUERY_BATCHING", "true").lower() == "true"
+    else None
+)
+# Reuse generated answers for paraphrased questions over unchanged documents
+response_cache = None
+if os.getenv("RESPONSE_CACHE", "true").lower() == "true":
+    response_cache = ResponseCache(vector_db.encode_query)
+    vector_db.add_change_listener(response_cache.invalidate)
+    if VECTOR_DB_ROLE == "reader":
+        # Readers see whole new generations, not the documents that changed
+        vector_db.add_reload_listener(response_cache.clear)
+# RERANK=true re-scores RERANK_CANDIDATES retrieved documents with a
+# cross-encoder, within RERANK_BUDGET_MS, and keeps the RERANK_TOP_K best
+reranker = create_reranker()
+mediator = AppMediator(
+    vector_db,
+    query_batcher=query_batcher,
+    response_cache=response_cache,
+    reranker=reranker,
+)
+
+# Load the index, then run one query through the model so the first request
+# does not pay for either; WARM_UP=false leaves both to the first request
+warm_up_steps = [
+    ("index", vector_db.load),
+    ("embedding_model", lambda: vector_db.encode_query("warm-up")),
+]
+if vector_db.hybrid.mode != "dense":
+    # The BM25 index is built from the documents on first use
+    warm_up_steps.append(
+        ("lexical_index", lambda: vector_db.lexical_search(["warm-up"], 1))
+    )
+if reranker is not None:
+    warm_up_steps.append(("reranker", reranker.warm_up))
+warm_up = WarmUp(warm_up_steps)
 
 app = FastAPI()
 
+# Tag each request (and its log lines) with a trace id, echoed back in the
+# X-Request-ID response header; a client-supplied X-Request-ID is kept
+TRACE_IDS = os.getenv("TRACE_IDS", "true").lower() == "true"
+
+REQUEST_SECONDS = REGISTRY.histogram(
+    "rag_http_request_duration_seconds",
+    "HTTP request latency",
+    ("method", "route", "status"),
+)
+INDEX_SIZE = REGISTRY.gauge(
+    "rag_index_size",
+    "Vectors, documents, tombstones and pending WAL records",
+    ("kind",),
+)
+CACHE_EVENTS = REGISTRY.gauge(
+    "rag_cache_events", "Cumulative cache hits and misses", ("cache", "event")
+)
+READY = REGISTRY.gauge("rag_ready", "1 once the start-up warm-up has finished")
+CIRCUIT_OPEN = REGISTRY.gauge(
+    "rag_llm_circuit_open", "1 while the LLM circuit breaker rejects calls"
+)
+
+
+def collect_metrics():
+    # Sizes and cache counters are read from their owners at scrape time
+    READY.set(warm_up.ready)
+    if vector_db.is_loaded:
+        for kind, value in vector_db.index_stats().items():
+            INDEX_SIZE.set(value, kind=kind)
+    embedding_stats = vector_db.embedding_cache.stats()
+    for event in ("memory_hits", "disk_hits", "misses"):
+        CACHE_EVENTS.set(embedding_stats[event], cache="embedding", event=event)
+    if response_cache is not None:
+        response_stats = response_cache.stats()
+        for event in ("hits", "misses", "invalidations"):
+            CACHE_EVENTS.set(response_stats[event], cache="response", event=event)
+    breaker = mediator.langchain_service.circuit_breaker
+    CIRCUIT_OPEN.set(breaker.state == breaker.OPEN)
+
+
+REGISTRY.add_collector(collect_metrics)
+
+
+WRITE_PATHS = ("/ingest", "/delete")
+_writer_client = None
+
+
+async def forward_to_writer(request: Request):
+    """Replay a write request against the writer process."""
+    global _writer_client
+    if VECTOR_DB_WRITER_URL is None:
+        return JSONResponse(
+            {"detail": "Read-only replica and VECTOR_DB_WRITER_URL is not set"},
+            status_code=503,
+        )
+    if _writer_client is None:
+        _writer_client = httpx.AsyncClient(base_url=VECTOR_DB_WRITER_URL, timeout=60)
+    headers = {"Content-Type": request.headers.get("Content-Type", "application/json")}
+    if "X-Request-ID" in request.headers:
+        headers["X-Request-ID"] = request.headers["X-Request-ID"]
+    try:
+        response = await _writer_client.request(
+            request.method,
+            request.url.path,
+            content=await request.body(),
+            headers=headers,
+        )
+    except httpx.HTTPError as e:
+        return JSONResponse({"detail": f"Writer unavailable: {e}"}, status_code=502)
+    return Response(
+        response.content,
+        status_code=response.status_code,
+        media_type=response.headers.get("Content-Type"),
+    )
+
+
+@app.middleware("http")
+async def route_writes(request: Request, call_next):
+    # Readers hold a read-only index; the single writer applies all changes
+    if VECTOR_DB_ROLE == "reader" and request.url.path.startswith(WRITE_PATHS):
+        return await forward_to_writer(request)
+    return await call_next(request)
+
+
+@app.middleware("http")
+async def trace_and_time(request: Request, call_next):
+    trace_id = request.headers.get("X-Request-ID")
+    if trace_id is None and TRACE_IDS:
+        trace_id = new_trace_id()
+    token = set_trace_id(trace_id)
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        reset_trace_id(token)
+        # Label by route template so /delete/{document_id} is one series
+        route = request.scope.get("route")
+        REQUEST_SECONDS.observe(
+            time.perf_counter() - start,
+            method=request.method,
+            route=route.path if route is not None else "unmatched",
+            status=status,
+        )
+    if trace_id is not None:
+        response.headers["X-Request-ID"] = trace_id
+    return response
+
+
+@app.get("/metrics")
+async def metrics():
+    # Prometheus text exposition format; collectors take the index read lock
+    body = await mediator.executor.run(REGISTRY.render)
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    if os.getenv("WARM_UP", "true").lower() == "true":
+        warm_up.start()
+    else:
+        warm_up.state = WarmUp.READY
+
+
+@app.get("/healthz")
+async def healthz():
+    # Liveness: the process serves requests, whether or not warm-up finished
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    # Readiness: 503 until the index and model are loaded
+    return JSONResponse(warm_up.status(), status_code=200 if warm_up.ready else 503)
+
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Checkpoint any write-ahead-logged changes into the index files
+    vector_db.flush()
+    vector_db.close()
+    if _writer_client is not None:
+        await _writer_client.aclose()
+    await mediator.langchain_service.aclose()
+    mediator.executor.shutdown()
+    if query_batcher is not None:
+        query_batcher.close()
+
 
 @app.post("/ingest")
-def ingest_data(data: IngestRequest):
-    mediator.send("ingest_data", data.__dict__)
+async def ingest_data(data: IngestRequest):
+    await mediator.send_async("ingest_data", data.__dict__)
     return {"message": "Data ingested successfully"}
 
 
+@app.post("/ingest/batch")
+async def ingest_batch(data: IngestBatchRequest):
+    count = await mediator.send_async(
+        "ingest_batch", {"documents": [doc.__dict__ for doc in data.documents]}
+    )
+    return {"message": f"{count} documents ingested successfully"}
+
+
 @app.post("/retrieve")
-def retrieve_data(criteria: RetrieveRequest):
-    results = mediator.send("retrieve_data", criteria.__dict__)
+async def retrieve_data(criteria: RetrieveRequest):
+    try:
+        results = await mediator.send_async("retrieve_data", criteria.__dict__)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return {"results": results}
 
 
+@app.post("/retrieve/stream")
+async def retrieve_data_stream(criteria: RetrieveRequest):
+    # Server-sent events: the retrieved documents, then tokens as Ollama emits them
+    events = mediator.stream_async("retrieve_data", criteria.__dict__)
+    try:
+        # Retrieval validates the query, filters and mode: fail before the
+        # 200 response starts
+        first = await events.__anext__()
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    async def event_stream():
+        yield f"event: {first['event']}\ndata: {json.dumps(first['data'])}\n\n"
+        async for event in events:
+            yield f"event: {event['event']}\ndata: {json.dumps(event['data'])}\n\n"
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
+@app.post("/retrieve/batch")
+async def retrieve_batch(request: Request):
+    # JSONL body, one /retrieve request per line with an optional "id";
+    # JSONL response, one result per line as it completes (see RetrieveBatchQuery)
+    body = (await request.body()).decode("utf-8")
+    try:
+        queries = list(read_jsonl_queries(body.splitlines()))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    results = mediator.stream_async("retrieve_batch", {"queries": queries})
+
+    async def result_lines():
+        async for result in results:
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(result_lines(), media_type="application/x-ndjson")
+
+
 @app.delete("/delete/{document_id}")
-def delete_document(document_id: str):
+async def delete_document(document_id: str):
     try:
-        vector_db.delete_document(document_id)
+        await mediator.executor.run(vector_db.delete_document, document_id)
         return {"message": f"Document with ID {document_id} deleted successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.post("/delete/batch")
+async def delete_documents(data: DeleteBatchRequest):
+    try:
+        # The ids asked for that matched a document or a chunk's parent
+        deleted = await mediator.executor.run(vector_db.delete_documents, data.ids)
+        return {"message": f"{len(deleted)} documents deleted successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
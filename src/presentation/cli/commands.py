@@ -1,31 +1,189 @@
+import os
+import sys
+import json
+import time
+import asyncio
+
+# Taken before the imports below so --timings can report what they cost
+_STARTED = time.perf_counter()
+
 from src.application.commands.ingest_data import IngestDataCommand
+from src.application.commands.ingest_file import IngestFileCommand
+from src.infrastructure.services.chunker import create_chunker
+from src.infrastructure.services.context_builder import ContextBuilder
+from src.infrastructure.services.reranker import create_reranker
+from src.infrastructure.services.embedders import (
+    SentenceTransformerEmbedder,
+    create_embedder,
+    embedding_parity,
+)
 from src.application.queries.retrieve_data import RetrieveDataQuery
+from src.application.queries.retrieve_batch import (
+    RetrieveBatchQuery,
+    read_jsonl_queries,
+)
 from src.infrastructure.services.langchain_service import LangChainService
 from src.infrastructure.database.vector_db import VectorDB
 
 
+_IMPORTED = time.perf_counter()
+
+
 class CLICommands:
     def __init__(self):
-        vector_db = VectorDB(db_path="./data/faiss_index")
+        # Lazy: the index and model load on first use, so commands that fail
+        # argument validation or never search return immediately
+        vector_db = VectorDB(db_path="./data/faiss_index", lazy=True)
+        self.vector_db = vector_db
         langchain_service = LangChainService(vector_db)
         self.ingest_command = IngestDataCommand(vector_db)
         self.retrieve_query = RetrieveDataQuery(
-            vector_db, langchain_service
+            vector_db,
+            langchain_service,
+            context_builder=ContextBuilder(encode=vector_db.encode),
+            reranker=create_reranker(),
         )  # Pass langchain_service
 
     def ingest_data(self, data):
         result = self.ingest_command.execute(data)
         print(f"Data ingestion result: {result}")
 
+    def ingest_file(self, path, strategy=None, chunk_size=None, overlap=None):
+        chunker = create_chunker(strategy, chunk_size, overlap)
+        count = IngestFileCommand(self.vector_db, chunker=chunker).execute(
+            {"path": path}
+        )
+        print(f"Ingested {count} chunks from {path}")
+
     def retrieve_data(self, criteria):
         result = self.retrieve_query.execute(criteria)
         print(f"Retrieved data: {result}")
 
+    def retrieve_data_stream(self, criteria):
+        # Print tokens live instead of waiting for the full response
+        for event in self.retrieve_query.execute_stream(criteria):
+            if event["event"] == "documents":
+                print(f"Retrieved documents: {event['data']}")
+            elif event["event"] == "token":
+                print(event["data"], end="", flush=True)
+        print()
+
+    def retrieve_batch(
+        self, path, output=None, query_field="query", id_field="id", concurrency=None
+    ):
+        """Answer every query in a JSONL file, writing results as JSONL lines."""
+        batch_query = RetrieveBatchQuery(
+            self.retrieve_query, max_concurrency=concurrency
+        )
+
+        async def run(lines, out):
+            count, errors = 0, 0
+            queries = read_jsonl_queries(lines, query_field, id_field)
+            async for result in batch_query.execute_stream_async({"queries": queries}):
+                out.write(json.dumps(result) + "\n")
+                out.flush()
+                count += 1
+                errors += "error" in result
+            return count, errors
+
+        started = time.perf_counter()
+        with open(path, "r") as lines:
+            if output is None:
+                count, errors = asyncio.run(run(lines, sys.stdout))
+            else:
+                with open(output, "w") as out:
+                    count, errors = asyncio.run(run(lines, out))
+        took = time.perf_counter() - started
+        print(
+            f"Answered {count} queries ({errors} errors) in {took:.1f}s "
+            f"({count / took if took else 0.0:.1f} queries/s)",
+            file=sys.stderr,
+        )
+
+    def train_index(self, sample_size=None):
+        self.vector_db.train_index(sample_size=sample_size)
+        index_type, count = self.vector_db.index_type, self.vector_db.index.ntotal
+        print(f"Trained {index_type} index with {count} vectors")
+
+    def startup_report(self, command_seconds: float) -> dict:
+        """Seconds spent on imports, index load, model load and the command.
+
+        Loading happens lazily inside the command, so it is subtracted from
+        ``command_seconds``.
+        """
+        index_load = self.vector_db.load_seconds or 0.0
+        model_load = self.vector_db.model_load_seconds or 0.0
+        return {
+            "imports": _IMPORTED - _STARTED,
+            "index_load": index_load,
+            "model_load": model_load,
+            "command": max(command_seconds - index_load - model_load, 0.0),
+        }
+
+    def check_startup_budget(self, report: dict) -> bool:
+        # Cold start = everything before the command's own work could begin
+        budget = float(os.getenv("CLI_STARTUP_BUDGET_MS", "3000")) / 1000
+        cold_start = report["imports"] + report["index_load"] + report["model_load"]
+        if cold_start > budget:
+            print(
+                f"Warning: cold start took {cold_start * 1000:.0f}ms, over the "
+                f"{budget * 1000:.0f}ms CLI_STARTUP_BUDGET_MS budget",
+                file=sys.stderr,
+            )
+            return False
+        return True
+
+    def index_report(self, queries_file, top_k=5):
+        with open(queries_file, "r") as f:
+            queries = [line.strip() for line in f if line.strip()]
+        grid = [{"nprobe": n} for n in (1, 4, 16, 64)] + [
+            {"ef_search": ef} for ef in (16, 64, 256)
+        ]
+        for row in self.vector_db.recall_report(queries, top_k=top_k, grid=grid):
+            print(
+                f"{row['index_type']:<8} {str(row['params']):<20} "
+                f"recall={row['recall']:.3f} "
+                f"p50={row['p50_ms']:.2f}ms p99={row['p99_ms']:.2f}ms"
+            )
+
+    def storage_report(self, queries_file, top_k=5):
+        with open(queries_file, "r") as f:
+            queries = [line.strip() for line in f if line.strip()]
+        for row in self.vector_db.storage_report(queries, top_k=top_k):
+            print(
+                f"{row['index_type']:<8} {row['bytes_per_vector']:8.1f} B/vector "
+                f"({row['memory_ratio']:.0%} of float32) "
+                f"recall={row['recall']:.3f} "
+                f"reranked={row['recall_reranked']:.3f}"
+            )
+
+    def embedding_parity(self, texts_file, backend, quantize=False, threads=None):
+        with open(texts_file, "r") as f:
+            texts = [line.strip() for line in f if line.strip()]
+        model_name = self.vector_db.embedding_model_name
+        candidate = create_embedder(backend, model_name, quantize, threads)
+        # The reference is the unquantized PyTorch model the index was built with
+        reference = SentenceTransformerEmbedder(model_name, threads=threads)
+        report = embedding_parity(candidate, reference, texts)
+        print(
+            f"{candidate.name} vs {reference.name} on {report['texts']} texts: "
+            f"cosine mean={report['mean_cosine']:.5f} "
+            f"min={report['min_cosine']:.5f} p1={report['p1_cosine']:.5f} "
+            f"throughput={report['candidate_texts_per_sec']:.1f}/s "
+            f"vs {report['reference_texts_per_sec']:.1f}/s "
+            f"({report['speedup']:.2f}x)"
+        )
+
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="CLI for RAG System")
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print import, index load, model load and command times",
+    )
     subparsers = parser.add_subparsers(dest="command")
 
     ingest_parser = subparsers.add_parser(
@@ -33,18 +191,126 @@ if __name__ == "__main__":
     )
     ingest_parser.add_argument("data", type=str, help="Data to ingest")
 
+    file_parser = subparsers.add_parser(
+        "ingest-file", help="Stream a .jsonl or text file into the vector database"
+    )
+    file_parser.add_argument("path", type=str, help="File to ingest")
+    file_parser.add_argument(
+        "--strategy", choices=["fixed", "sentence", "recursive"], default=None
+    )
+    file_parser.add_argument("--chunk-size", type=int, default=None)
+    file_parser.add_argument("--overlap", type=int, default=None)
+
     retrieve_parser = subparsers.add_parser(
         "retrieve", help="Retrieve data from the vector database"
     )
     retrieve_parser.add_argument(
         "criteria", type=str, help="Criteria for data retrieval"
     )
+    retrieve_parser.add_argument(
+        "--stream", action="store_true", help="Print response tokens as they arrive"
+    )
+    retrieve_parser.add_argument(
+        "--filters",
+        type=json.loads,
+        default=None,
+        help='Metadata filters as JSON, e.g. \'{"category": "animals"}\'',
+    )
+    retrieve_parser.add_argument(
+        "--mode",
+        choices=["dense", "lexical", "hybrid"],
+        default=None,
+        help="Retrieval mode (default: RETRIEVAL_MODE or dense)",
+    )
+
+    batch_parser = subparsers.add_parser(
+        "retrieve-batch", help="Answer the queries in a JSONL file as JSONL results"
+    )
+    batch_parser.add_argument("path", type=str, help="JSONL file, one query per line")
+    batch_parser.add_argument(
+        "--output", type=str, default=None, help="Result file (default: stdout)"
+    )
+    batch_parser.add_argument(
+        "--query-field", default="query", help="Field holding the query text"
+    )
+    batch_parser.add_argument(
+        "--id-field", default="id", help="Field echoed as the result's id"
+    )
+    batch_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=None,
+        help="Parallel LLM generations (default: RETRIEVE_BATCH_CONCURRENCY or 4)",
+    )
+
+    train_parser = subparsers.add_parser(
+        "train-index", help="Build the configured VECTOR_INDEX_TYPE from stored vectors"
+    )
+    train_parser.add_argument(
+        "--sample-size", type=int, default=None, help="Vectors used for training"
+    )
+
+    report_parser = subparsers.add_parser(
+        "index-report", help="Report recall and latency against exact search"
+    )
+    report_parser.add_argument("queries", type=str, help="File with one query per line")
+    report_parser.add_argument("--top-k", type=int, default=5)
+
+    storage_parser = subparsers.add_parser(
+        "storage-report",
+        help="Report memory and recall of compressed vector storage layouts",
+    )
+    storage_parser.add_argument(
+        "queries", type=str, help="File with one query per line"
+    )
+    storage_parser.add_argument("--top-k", type=int, default=5)
+
+    parity_parser = subparsers.add_parser(
+        "embedding-parity",
+        help="Compare an embedding backend with the fp32 PyTorch model",
+    )
+    parity_parser.add_argument("texts", type=str, help="File with one text per line")
+    parity_parser.add_argument(
+        "--backend", choices=["sentence-transformers", "onnx"], default="onnx"
+    )
+    parity_parser.add_argument(
+        "--quantize", action="store_true", help="Use dynamic int8 weights"
+    )
+    parity_parser.add_argument("--threads", type=int, default=None)
 
     args = parser.parse_args()
 
     cli = CLICommands()
+    command_started = time.perf_counter()
 
     if args.command == "ingest":
         cli.ingest_data(args.data)
+    elif args.command == "ingest-file":
+        cli.ingest_file(args.path, args.strategy, args.chunk_size, args.overlap)
     elif args.command == "retrieve":
-        cli.retrieve_data(args.criteria)
+        criteria = {
+            "query": args.criteria,
+            "filters": args.filters,
+            "mode": args.mode,
+        }
+        if args.stream:
+            cli.retrieve_data_stream(criteria)
+        else:
+            cli.retrieve_data(criteria)
+    elif args.command == "retrieve-batch":
+        cli.retrieve_batch(
+            args.path, args.output, args.query_field, args.id_field, args.concurrency
+        )
+    elif args.command == "train-index":
+        cli.train_index(args.sample_size)
+    elif args.command == "index-report":
+        cli.index_report(args.queries, args.top_k)
+    elif args.command == "storage-report":
+        cli.storage_report(args.queries, args.top_k)
+    elif args.command == "embedding-parity":
+        cli.embedding_parity(args.texts, args.backend, args.quantize, args.threads)
+
+    report = cli.startup_report(time.perf_counter() - command_started)
+    cli.check_startup_budget(report)
+    if args.timings:
+        print(" ".join(f"{name}={took * 1000:.0f}ms" for name, took in report.items()))
@@ -1,4 +1,7 @@
 from src.application.commands.ingest_data import IngestDataCommand
+from src.application.commands.ingest_batch import IngestBatchCommand
+from src.application.commands.ingest_file import IngestFileCommand
+from src.infrastructure.services.chunker import FixedTokenChunker
 from src.domain.entities.document import Document
 from unittest.mock import Mock
 
@@ -7,4 +10,58 @@ def test_ingest_data_command():
     command = IngestDataCommand(mock_repository)
     data = {"id": "1", "content": "Test content", "metadata": {"author": "John Doe"}}
     command.execute(data)
-    mock_repository.add_document.assert_called_once()
\ No newline at end of file
+    mock_repository.add_document.assert_called_once()
+
+def test_ingest_batch_command():
+    mock_repository = Mock()
+    command = IngestBatchCommand(mock_repository)
+    data = {
+        "documents": [
+            {"content": "First content", "metadata": {"author": "John Doe"}},
+            {"content": "Second content", "metadata": {}},
+        ]
+    }
+    count = command.execute(data)
+    assert count == 2
+    mock_repository.add_documents.assert_called_once()
+    documents = mock_repository.add_documents.call_args[0][0]
+    assert [doc.content for doc in documents] == ["First content", "Second content"]
+
+def test_ingest_data_command_chunks_long_content():
+    mock_repository = Mock()
+    chunker = FixedTokenChunker(chunk_size=5, overlap=0)
+    command = IngestDataCommand(mock_repository, chunker=chunker)
+    command.execute({"content": "one two three four five six seven", "metadata": {}})
+    mock_repository.add_document.assert_not_called()
+    chunks = mock_repository.add_documents.call_args[0][0]
+    assert [chunk.content for chunk in chunks] == ["one two three four five", "six seven"]
+    assert chunks[0].metadata["parent_id"] == chunks[1].metadata["parent_id"]
+
+def test_ingest_file_command_streams_jsonl(tmp_path):
+    path = tmp_path / "documents.jsonl"
+    path.write_text(
+        '{"id": "a", "content": "one two three four five six seven"}\n'
+        "\n"
+        '{"content": "short", "metadata": {"tag": "x"}}\n'
+    )
+    mock_repository = Mock()
+    chunker = FixedTokenChunker(chunk_size=5, overlap=0)
+    command = IngestFileCommand(mock_repository, chunker=chunker, batch_size=2)
+    count = command.execute({"path": str(path)})
+    assert count == 3
+    batches = [call[0][0] for call in mock_repository.add_documents.call_args_list]
+    assert [len(batch) for batch in batches] == [2, 1]
+    assert [doc.id for doc in batches[0]] == ["a:0", "a:1"]
+    assert batches[1][0].metadata == {"source": str(path), "tag": "x"}
+
+def test_ingest_file_command_windows_text(tmp_path):
+    path = tmp_path / "book.txt"
+    words = [f"w{i}" for i in range(100)]
+    path.write_text("\n".join(" ".join(words[i : i + 4]) for i in range(0, 100, 4)))
+    mock_repository = Mock()
+    chunker = FixedTokenChunker(chunk_size=6, overlap=0)
+    command = IngestFileCommand(mock_repository, chunker=chunker)
+    command.execute({"path": str(path)})
+    chunks = mock_repository.add_documents.call_args[0][0]
+    assert " ".join(chunk.content for chunk in chunks).split() == words
+    assert [chunk.metadata["chunk_index"] for chunk in chunks] == list(range(len(chunks)))
@@ -1,7 +1,10 @@
+import asyncio
 import pytest
-from unittest.mock import Mock
+from unittest.mock import AsyncMock, Mock
 from src.domain.entities.document import Document
 from src.application.queries.retrieve_data import RetrieveDataQuery
+from src.infrastructure.services.langchain_service import LLMErrorMessage
+from src.infrastructure.services.context_builder import ContextBuilder
 
 
 @pytest.fixture
@@ -120,3 +123,198 @@ def test_execute_with_large_context(
     assert result["query"] == "Explain the documents."
     assert len(result["retrieved_documents"]) == 5
     assert result["generated_response"] == "Generated response for a large context."
+
+
+def test_execute_async_uses_async_llm_call(
+    retrieve_data_query, mock_vector_db_repository, mock_langchain_service
+):
+    mock_vector_db_repository.get_documents.return_value = [
+        Document(id="1", content="AI is transforming industries.", metadata={}),
+    ]
+    mock_langchain_service.generate_response_async = AsyncMock(
+        return_value="AI is widely used in various industries."
+    )
+
+    result = asyncio.run(
+        retrieve_data_query.execute_async({"query": "How is AI used in industries?"})
+    )
+
+    mock_vector_db_repository.get_documents.assert_called_once_with(
+        "How is AI used in industries?"
+    )
+    mock_langchain_service.generate_response_async.assert_awaited_once_with(
+        "Query: How is AI used in industries?\nContext: AI is transforming industries."
+    )
+    mock_langchain_service.generate_response.assert_not_called()
+    assert result["generated_response"] == "AI is widely used in various industries."
+
+
+def test_execute_stream_emits_documents_then_tokens(
+    retrieve_data_query, mock_vector_db_repository, mock_langchain_service
+):
+    mock_vector_db_repository.get_documents.return_value = [
+        Document(id="1", content="AI is transforming industries.", metadata={}),
+    ]
+    mock_langchain_service.generate_response_stream.return_value = iter(["AI ", "rocks"])
+
+    events = list(retrieve_data_query.execute_stream({"query": "What is AI?"}))
+
+    assert events[0] == {
+        "event": "documents",
+        "data": [{"id": "1", "content": "AI is transforming industries."}],
+    }
+    assert [e["data"] for e in events[1:-1]] == ["AI ", "rocks"]
+    assert events[-1] == {"event": "done", "data": None}
+
+
+def test_execute_reuses_cached_response(
+    mock_vector_db_repository, mock_langchain_service
+):
+    response_cache = Mock()
+    response_cache.get.return_value = "Cached answer."
+    query = RetrieveDataQuery(
+        mock_vector_db_repository, mock_langchain_service, response_cache=response_cache
+    )
+    mock_vector_db_repository.get_documents.return_value = [
+        Document(id="1", content="AI is transforming industries.", metadata={}),
+    ]
+
+    result = query.execute({"query": "What is AI?"})
+
+    response_cache.get.assert_called_once_with("What is AI?", ["1"])
+    mock_langchain_service.generate_response.assert_not_called()
+    assert result["generated_response"] == "Cached answer."
+
+
+def test_execute_caches_generated_response_but_not_errors(
+    mock_vector_db_repository, mock_langchain_service
+):
+    response_cache = Mock()
+    response_cache.get.return_value = None
+    query = RetrieveDataQuery(
+        mock_vector_db_repository, mock_langchain_service, response_cache=response_cache
+    )
+    mock_vector_db_repository.get_documents.return_value = [
+        Document(id="1", content="AI is transforming industries.", metadata={}),
+    ]
+
+    mock_langchain_service.generate_response.return_value = "AI is useful."
+    query.execute({"query": "What is AI?"})
+    response_cache.put.assert_called_once_with("What is AI?", ["1"], "AI is useful.")
+
+    mock_langchain_service.generate_response.return_value = (
+        "An error occurred while generating the response."
+    )
+    query.execute({"query": "What is AI?"})
+    assert response_cache.put.call_count == 1
+
+
+def test_execute_stream_does_not_cache_a_stream_that_failed_midway(
+    mock_vector_db_repository, mock_langchain_service
+):
+    response_cache = Mock()
+    response_cache.get.return_value = None
+    query = RetrieveDataQuery(
+        mock_vector_db_repository, mock_langchain_service, response_cache=response_cache
+    )
+    mock_vector_db_repository.get_documents.return_value = [
+        Document(id="1", content="AI is transforming industries.", metadata={}),
+    ]
+    failed = ["AI is ", LLMErrorMessage("An error occurred: connection reset")]
+
+    mock_langchain_service.generate_response_stream.return_value = iter(failed)
+    events = list(query.execute_stream({"query": "What is AI?"}))
+    assert events[2]["data"].startswith("An error occurred")
+
+    async def stream():
+        for token in failed:
+            yield token
+
+    mock_langchain_service.generate_response_stream_async = Mock(
+        return_value=stream()
+    )
+
+    async def consume():
+        return [e async for e in query.execute_stream_async({"query": "What is AI?"})]
+
+    asyncio.run(consume())
+    response_cache.put.assert_not_called()
+
+    mock_langchain_service.generate_response_stream.return_value = iter(["AI ", "ok"])
+    list(query.execute_stream({"query": "What is AI?"}))
+    response_cache.put.assert_called_once_with("What is AI?", ["1"], "AI ok")
+
+
+def test_execute_passes_metadata_filters(
+    retrieve_data_query, mock_vector_db_repository, mock_langchain_service
+):
+    mock_vector_db_repository.get_documents.return_value = []
+
+    retrieve_data_query.execute(
+        {"query": "What is AI?", "filters": {"category": "tech"}}
+    )
+
+    mock_vector_db_repository.get_documents.assert_called_once_with(
+        "What is AI?", filters={"category": "tech"}
+    )
+
+
+def test_execute_passes_retrieval_mode(
+    retrieve_data_query, mock_vector_db_repository, mock_langchain_service
+):
+    mock_vector_db_repository.get_documents.return_value = []
+
+    retrieve_data_query.execute({"query": "ERR-4012", "mode": "hybrid"})
+
+    mock_vector_db_repository.get_documents.assert_called_once_with(
+        "ERR-4012", mode="hybrid"
+    )
+
+
+def test_execute_reports_prompt_context(
+    mock_vector_db_repository, mock_langchain_service
+):
+    mock_vector_db_repository.get_documents.return_value = [
+        Document(id="1", content="AI is transforming industries.", metadata={}),
+        Document(id="2", content="AI is transforming industries.", metadata={}),
+        Document(id="3", content="One two three four five six.", metadata={}),
+    ]
+    mock_langchain_service.generate_response.return_value = "Answer."
+    query = RetrieveDataQuery(
+        mock_vector_db_repository,
+        mock_langchain_service,
+        context_builder=ContextBuilder(token_budget=7, min_tokens=3),
+    )
+
+    result = query.execute({"query": "What is AI?"})
+
+    mock_langchain_service.generate_response.assert_called_once_with(
+        "Query: What is AI?\nContext: AI is transforming industries. One two three"
+    )
+    assert result["context"]["documents"] == ["1", "3"]
+    assert result["context"]["duplicates"] == ["2"]
+    assert result["context"]["truncated"] == "3"
+    assert result["context"]["context_tokens"] == 7
+    assert result["context"]["prompt_tokens"] == 12
+
+
+def test_execute_reranks_candidates(mock_vector_db_repository, mock_langchain_service):
+    documents = [
+        Document(id="1", content="Cats sleep a lot.", metadata={}),
+        Document(id="2", content="AI is transforming industries.", metadata={}),
+    ]
+    mock_vector_db_repository.get_documents.return_value = documents
+    mock_langchain_service.generate_response.return_value = "Answer."
+    reranker = Mock(candidates=20)
+    reranker.rerank.return_value = documents[1:]
+    query = RetrieveDataQuery(
+        mock_vector_db_repository, mock_langchain_service, reranker=reranker
+    )
+
+    result = query.execute({"query": "What is AI?"})
+
+    mock_vector_db_repository.get_documents.assert_called_once_with(
+        "What is AI?", top_k=20
+    )
+    reranker.rerank.assert_called_once_with("What is AI?", documents)
+    assert [doc["id"] for doc in result["retrieved_documents"]] == ["2"]
@@ -0,0 +1,136 @@
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, Mock
+from src.domain.entities.document import Document
+from src.application.queries.retrieve_data import RetrieveDataQuery
+from src.application.queries.retrieve_batch import (
+    RetrieveBatchQuery,
+    read_jsonl_queries,
+)
+
+
+def collect(batch_query, queries):
+    async def run():
+        return [
+            result
+            async for result in batch_query.execute_stream_async({"queries": queries})
+        ]
+
+    return asyncio.run(run())
+
+
+@pytest.fixture
+def mock_vector_db_repository():
+    repository = Mock()
+    repository.get_documents_batch.side_effect = lambda queries, **options: [
+        [Document(id=query, content=f"About {query}", metadata={})]
+        for query in queries
+    ]
+    return repository
+
+
+@pytest.fixture
+def mock_langchain_service():
+    service = Mock()
+    service.generate_response_async = AsyncMock(return_value="Answer.")
+    return service
+
+
+def test_read_jsonl_queries_maps_fields():
+    lines = [
+        '{"request_id": "r1", "body": "What is AI?", "mode": "hybrid"}',
+        "",
+        '{"request_id": "r2", "body": "Cats?"}',
+    ]
+
+    queries = list(read_jsonl_queries(lines, query_field="body", id_field="request_id"))
+
+    assert queries == [
+        {"query": "What is AI?", "id": "r1", "mode": "hybrid"},
+        {"query": "Cats?", "id": "r2"},
+    ]
+    with pytest.raises(ValueError, match="Line 2"):
+        list(read_jsonl_queries(['{"query": "a"}', "[1]"]))
+
+
+def test_batch_searches_as_matrices_and_streams_every_result(
+    mock_vector_db_repository, mock_langchain_service
+):
+    retrieve_query = RetrieveDataQuery(
+        mock_vector_db_repository, mock_langchain_service
+    )
+    batch_query = RetrieveBatchQuery(retrieve_query, batch_size=3, max_concurrency=2)
+    queries = [{"id": f"q{i}", "query": f"query {i}"} for i in range(5)]
+    queries.append({"id": "lexical", "query": "ERR-4012", "mode": "lexical"})
+    queries.append({"id": "empty"})
+
+    results = collect(batch_query, queries)
+
+    assert sorted(result["index"] for result in results) == list(range(7))
+    by_id = {result["id"]: result for result in results}
+    assert by_id["q4"]["retrieved_documents"] == [
+        {"id": "query 4", "content": "About query 4"}
+    ]
+    assert by_id["q4"]["generated_response"] == "Answer."
+    assert set(by_id["q4"]["timings"]) == {"search", "generate", "total"}
+    assert by_id["empty"]["error"] == "Query field is required"
+    # One search per batch of 3, plus one for the lexical query's group
+    calls = mock_vector_db_repository.get_documents_batch.call_args_list
+    assert [call.args[0] for call in calls] == [
+        ["query 0", "query 1", "query 2"],
+        ["query 3", "query 4"],
+        ["ERR-4012"],
+    ]
+    assert calls[2].kwargs == {"mode": "lexical"}
+    assert mock_langchain_service.generate_response_async.await_count == 6
+
+
+def test_batch_reports_bad_criteria_per_query(
+    mock_vector_db_repository, mock_langchain_service
+):
+    search = mock_vector_db_repository.get_documents_batch.side_effect
+
+    def get_documents_batch(queries, **options):
+        if options.get("mode") == "sparse":
+            raise ValueError("Unknown retrieval mode: sparse")
+        return search(queries, **options)
+
+    mock_vector_db_repository.get_documents_batch.side_effect = get_documents_batch
+    retrieve_query = RetrieveDataQuery(
+        mock_vector_db_repository, mock_langchain_service
+    )
+    batch_query = RetrieveBatchQuery(retrieve_query, batch_size=10)
+
+    results = collect(
+        batch_query,
+        [{"query": "good"}, {"query": "bad", "mode": "sparse"}],
+    )
+
+    by_index = {result["index"]: result for result in results}
+    assert by_index[0]["generated_response"] == "Answer."
+    assert by_index[1]["error"] == "Unknown retrieval mode: sparse"
+
+
+def test_batch_limits_parallel_generations(
+    mock_vector_db_repository, mock_langchain_service
+):
+    running, peak = 0, 0
+
+    async def generate(prompt):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return "Answer."
+
+    mock_langchain_service.generate_response_async = generate
+    retrieve_query = RetrieveDataQuery(
+        mock_vector_db_repository, mock_langchain_service
+    )
+    batch_query = RetrieveBatchQuery(retrieve_query, batch_size=4, max_concurrency=2)
+
+    results = collect(batch_query, [{"query": f"q{i}"} for i in range(10)])
+
+    assert len(results) == 10
+    assert peak == 2
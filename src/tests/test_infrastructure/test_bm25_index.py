@@ -0,0 +1,78 @@
+import pytest
+from src.domain.entities.document import Document
+from src.infrastructure.database.bm25_index import BM25Index, tokenize
+from src.infrastructure.database.hybrid_search import (
+    HybridRetrieval,
+    reciprocal_rank_fusion,
+    weighted_fusion,
+)
+
+RECORDS = [
+    {"content": "Login fails with ERR-4012 after the upgrade"},
+    {"content": "The upgrade guide covers the new login page"},
+    {"content": "Cooking pasta takes ten minutes"},
+]
+
+
+def test_tokenize_keeps_identifiers_whole_and_split():
+    assert tokenize("Got ERR-4012 in v2.1!") == [
+        "got",
+        "err-4012",
+        "err",
+        "4012",
+        "in",
+        "v2.1",
+        "v2",
+        "1",
+    ]
+
+
+def test_bm25_ranks_rare_terms_and_updates_incrementally():
+    index = BM25Index()
+    index.add([10, 11, 12], RECORDS)
+
+    assert [row for _, row in index.search("err-4012", 3)] == [10]
+    assert {row for _, row in index.search("login upgrade", 3)} == {10, 11}
+    assert [row for _, row in index.search("login", 3, allowed={11})] == [11]
+
+    index.remove([10], RECORDS[:1])
+    assert index.search("err-4012", 3) == []
+    assert len(index) == 2
+
+
+def doc(doc_id):
+    return Document(id=doc_id, content=doc_id, metadata={})
+
+
+def test_fusion_combines_rankings():
+    dense = [(0.1, doc("a")), (0.2, doc("b")), (0.9, doc("c"))]
+    lexical = [(7.0, doc("b")), (3.0, doc("d"))]
+
+    rrf = [d.id for _, d in reciprocal_rank_fusion([dense, lexical], k=60)]
+    weighted = [d.id for _, d in weighted_fusion(dense, lexical, dense_weight=0.9)]
+
+    # b is found by both; a outranks d because it is first in its ranking
+    assert rrf == ["b", "a", "d", "c"]
+    # Mostly dense weight: a's distance beats b's lexical score
+    assert weighted[:2] == ["a", "b"]
+
+
+def test_hybrid_retrieval_selects_mode(monkeypatch):
+    monkeypatch.setenv("RETRIEVAL_MODE", "lexical")
+    hybrid = HybridRetrieval(candidates=10)
+    depths = []
+
+    def dense(k):
+        depths.append(("dense", k))
+        return [[(0.1, doc("a"))]]
+
+    def lexical(k):
+        depths.append(("lexical", k))
+        return [[(5.0, doc("b"))]]
+
+    assert [d.id for d in hybrid.retrieve(1, None, dense, lexical)[0]] == ["b"]
+    fused = hybrid.retrieve(2, "hybrid", dense, lexical)[0]
+    assert {d.id for d in fused} == {"a", "b"}
+    assert depths == [("lexical", 1), ("dense", 10), ("lexical", 10)]
+    with pytest.raises(ValueError, match="Unknown retrieval mode"):
+        hybrid.retrieve(1, "sparse", dense, lexical)
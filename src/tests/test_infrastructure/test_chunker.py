@@ -0,0 +1,59 @@
+import pytest
+from src.domain.entities.document import Document
+from src.infrastructure.services.chunker import (
+    FixedTokenChunker,
+    RecursiveChunker,
+    SentenceChunker,
+    chunk_document,
+    count_tokens,
+    create_chunker,
+)
+
+WORDS = " ".join(f"w{i}" for i in range(25))
+
+
+def test_fixed_token_windows_overlap():
+    chunks = FixedTokenChunker(chunk_size=10, overlap=3).split(WORDS)
+
+    assert chunks[0].split() == [f"w{i}" for i in range(10)]
+    assert chunks[1].split()[:3] == ["w7", "w8", "w9"]
+    assert chunks[-1].split()[-1] == "w24"
+    assert all(count_tokens(chunk) <= 10 for chunk in chunks)
+
+
+def test_sentence_chunker_keeps_sentences_whole():
+    text = "One two three. Four five six. Seven eight nine. Ten eleven twelve."
+    chunks = SentenceChunker(chunk_size=7, overlap=3).split(text)
+
+    assert chunks == [
+        "One two three. Four five six.",
+        "Four five six. Seven eight nine.",
+        "Seven eight nine. Ten eleven twelve.",
+    ]
+
+
+def test_recursive_chunker_prefers_paragraph_breaks():
+    text = "alpha beta gamma\n\ndelta epsilon\n\n" + WORDS
+    chunks = RecursiveChunker(chunk_size=10, overlap=0).split(text)
+
+    assert chunks[0] == "alpha beta gamma\n\ndelta epsilon"
+    assert all(count_tokens(chunk) <= 10 for chunk in chunks)
+    assert " ".join(chunks[1:]).split() == WORDS.split()
+
+
+def test_chunk_document_links_chunks_to_parent():
+    document = Document(id="doc", content=WORDS, metadata={"author": "John Doe"})
+    chunks = chunk_document(document, FixedTokenChunker(chunk_size=10, overlap=0))
+
+    assert [chunk.id for chunk in chunks] == ["doc:0", "doc:1", "doc:2"]
+    assert chunks[1].metadata == {
+        "author": "John Doe",
+        "parent_id": "doc",
+        "chunk_index": 1,
+    }
+    assert chunk_document(document, create_chunker(chunk_size=100)) == [document]
+
+
+def test_overlap_must_be_smaller_than_chunk_size():
+    with pytest.raises(ValueError):
+        FixedTokenChunker(chunk_size=10, overlap=10)
@@ -0,0 +1,76 @@
+import numpy as np
+from src.infrastructure.services.context_builder import (
+    ContextBuilder,
+    truncate_to_tokens,
+)
+
+
+def docs(*contents):
+    return [{"id": str(i), "content": c} for i, c in enumerate(contents)]
+
+
+def test_truncate_prefers_sentence_then_word_boundaries():
+    text = "One two three. Four five six seven. Eight."
+    assert truncate_to_tokens(text, 5) == "One two three."
+    assert truncate_to_tokens("One two three four", 2) == "One two"
+
+
+def test_near_duplicates_are_dropped_by_embedding():
+    vectors = {
+        "Lions hunt at night.": [1.0, 0.0],
+        "At night, lions hunt.": [0.99, 0.141],
+        "Elephants eat grass.": [0.0, 1.0],
+    }
+    builder = ContextBuilder(
+        encode=lambda texts: np.array([vectors[t] for t in texts], "float32"),
+        token_budget=100,
+        dedup_threshold=0.95,
+    )
+
+    context, report = builder.build(docs(*vectors, "Lions hunt at night."))
+
+    assert context == "Lions hunt at night. Elephants eat grass."
+    assert report["documents"] == ["0", "2"]
+    assert report["duplicates"] == ["1", "3"]
+    assert report["context_tokens"] == 7
+
+
+def test_budget_truncates_then_omits_in_relevance_order():
+    builder = ContextBuilder(token_budget=8, min_tokens=2)
+
+    context, report = builder.build(
+        docs("a b c d e", "First part here. Second part.", "never used")
+    )
+
+    assert context == "a b c d e First part here."
+    assert report["truncated"] == "1"
+    assert report["omitted"] == ["2"]
+    assert report["context_tokens"] == 8
+
+
+def test_documents_too_long_to_truncate_usefully_are_skipped():
+    builder = ContextBuilder(token_budget=6, min_tokens=4)
+
+    _, report = builder.build(docs("a b c", "d e f g h", "i j"))
+
+    assert report["documents"] == ["0", "2"]
+    assert report["omitted"] == ["1"]
+
+
+def test_stored_vectors_are_used_and_only_missing_ones_encoded():
+    encoded = []
+
+    def encode(texts):
+        encoded.extend(texts)
+        return np.array([[0.99, 0.141]] * len(texts), "float32")
+
+    builder = ContextBuilder(encode=encode, token_budget=100, dedup_threshold=0.95)
+    stored = [np.array([1.0, 0.0], "float32"), None, np.array([0.0, 1.0], "float32")]
+
+    _, report = builder.build(
+        docs("Lions hunt at night.", "At night, lions hunt.", "Elephants eat grass."),
+        stored,
+    )
+
+    assert encoded == ["At night, lions hunt."]
+    assert report["duplicates"] == ["1"]
@@ -0,0 +1,139 @@
+import numpy as np
+import pytest
+from src.infrastructure.database.vector_db import VectorDB
+from src.infrastructure.services.embedders import (
+    Embedder,
+    OnnxEmbedder,
+    SentenceTransformerEmbedder,
+    create_embedder,
+    embedding_parity,
+)
+
+
+class LengthEmbedder(Embedder):
+    """Encodes a text as [len(text), batch size], recording each batch."""
+
+    def __init__(self, noise=0.0):
+        super().__init__("length")
+        self.noise = noise
+        self.batches = []
+
+    @property
+    def name(self):
+        return "length"
+
+    def _load(self):
+        return object()
+
+    def _encode_batch(self, texts):
+        self.batches.append(texts)
+        return np.array([[len(t), 1.0 + self.noise * len(t)] for t in texts])
+
+    def _dimension(self):
+        return 2
+
+
+def test_encode_batches_by_length_and_keeps_order():
+    embedder = LengthEmbedder()
+    texts = ["ccc", "a", "dddd", "bb"]
+
+    vectors = embedder.encode(texts, batch_size=2)
+
+    assert vectors[:, 0].tolist() == [3, 1, 4, 2]
+    assert embedder.batches == [["a", "bb"], ["ccc", "dddd"]]
+    assert embedder.encode("xy").shape == (2,)
+    assert embedder.load_seconds is not None
+
+
+def test_create_embedder_reads_env(monkeypatch):
+    monkeypatch.setenv("EMBEDDING_BACKEND", "onnx")
+    monkeypatch.setenv("EMBEDDING_QUANTIZE", "true")
+    monkeypatch.setenv("EMBEDDING_THREADS", "2")
+
+    embedder = create_embedder(model_name="all-MiniLM-L6-v2")
+
+    assert isinstance(embedder, OnnxEmbedder)
+    assert embedder.quantize and embedder.threads == 2
+    assert embedder.name == "all-MiniLM-L6-v2+onnx-int8"
+    assert embedder.hub_id == "sentence-transformers/all-MiniLM-L6-v2"
+    with pytest.raises(ValueError, match="Unknown embedding backend"):
+        create_embedder("tensorrt")
+
+
+def test_backends_use_separate_cache_namespaces(tmp_path):
+    def cache_namespace(embedder):
+        db = VectorDB(
+            db_path=str(tmp_path / embedder.name.replace("+", "_")),
+            embedding_model=embedder,
+            embedding_dim=384,
+            lazy=True,
+        )
+        return db.embedding_cache.model_name
+
+    fp32 = SentenceTransformerEmbedder("all-MiniLM-L6-v2")
+    int8 = SentenceTransformerEmbedder("all-MiniLM-L6-v2", quantize=True)
+
+    # fp32 keeps the bare model name, so existing caches stay valid
+    assert cache_namespace(fp32) == "all-MiniLM-L6-v2"
+    assert cache_namespace(int8) == "all-MiniLM-L6-v2+int8"
+
+
+def test_embedding_parity_reports_drift():
+    texts = ["a", "bb", "ccc", "dddd"]
+
+    same = embedding_parity(LengthEmbedder(), LengthEmbedder(), texts)
+    drifted = embedding_parity(LengthEmbedder(noise=0.5), LengthEmbedder(), texts)
+
+    assert same["mean_cosine"] == pytest.approx(1.0)
+    assert same["texts"] == 4
+    assert drifted["min_cosine"] < drifted["mean_cosine"] < 1.0
+    assert drifted["max_drift"] == pytest.approx(1 - drifted["min_cosine"])
+
+
+def test_onnx_embedder_matches_pytorch(tmp_path):
+    pytest.importorskip("onnx")
+    pytest.importorskip("onnxruntime")
+    torch = pytest.importorskip("torch")
+    transformers = pytest.importorskip("transformers")
+
+    # A tiny randomly initialised BERT stands in for a hub model
+    words = ["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]", "the", "cat", "sat"]
+    (tmp_path / "vocab.txt").write_text("\n".join(words))
+    model_dir = str(tmp_path)
+    transformers.BertTokenizer(str(tmp_path / "vocab.txt")).save_pretrained(
+        model_dir
+    )
+    config = transformers.BertConfig(
+        vocab_size=len(words),
+        hidden_size=16,
+        num_hidden_layers=1,
+        num_attention_heads=2,
+        intermediate_size=32,
+    )
+    torch.manual_seed(0)
+    transformers.BertModel(config).save_pretrained(model_dir)
+
+    class Reference:
+        def __init__(self):
+            self.tokenizer = transformers.AutoTokenizer.from_pretrained(model_dir)
+            self.model = transformers.BertModel.from_pretrained(model_dir).eval()
+
+        def encode(self, texts, batch_size=64):
+            encoded = self.tokenizer(texts, padding=True, return_tensors="pt")
+            with torch.no_grad():
+                hidden = self.model(**encoded).last_hidden_state
+            mask = encoded["attention_mask"][..., None].float()
+            return ((hidden * mask).sum(1) / mask.sum(1)).numpy()
+
+    texts = ["the cat sat", "cat", "the the cat sat sat", "sat cat"]
+    for quantize, tolerance in ((False, 1e-5), (True, 0.05)):
+        embedder = OnnxEmbedder(
+            model_dir,
+            threads=1,
+            quantize=quantize,
+            onnx_dir=str(tmp_path / "onnx"),
+        )
+        report = embedding_parity(embedder, Reference(), texts)
+
+        assert embedder.get_sentence_embedding_dimension() == 16
+        assert report["min_cosine"] > 1 - tolerance
@@ -0,0 +1,48 @@
+import sqlite3
+import numpy as np
+from src.infrastructure.database.embedding_cache import EmbeddingCache
+
+
+def test_memory_hits_and_misses():
+    cache = EmbeddingCache("test-model", max_entries=10)
+    assert cache.get_many(["AI content"]) == [None]
+
+    cache.put_many(["AI content"], np.array([[1.0, 0.0]], dtype="float32"))
+    [vector] = cache.get_many(["AI content"])
+
+    assert np.allclose(vector, [1.0, 0.0])
+    assert cache.stats()["memory_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_lru_evicts_oldest_entry():
+    cache = EmbeddingCache("test-model", max_entries=2)
+    cache.put_many(["a", "b", "c"], np.eye(3, dtype="float32"))
+    assert cache.get_many(["a"]) == [None]
+    assert cache.get_many(["c"])[0] is not None
+
+
+def test_disk_backend_survives_restart(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    cache = EmbeddingCache("test-model", path=path)
+    cache.put_many(["AI content"], np.array([[0.6, 0.8]], dtype="float32"))
+    cache.close()
+
+    reopened = EmbeddingCache("test-model", path=path)
+    [vector] = reopened.get_many(["AI content"])
+    assert np.allclose(vector, [0.6, 0.8])
+    assert reopened.stats()["disk_hits"] == 1
+
+    # Keys include the model name, so another model never sees these vectors
+    other_model = EmbeddingCache("other-model", path=path)
+    assert other_model.get_many(["AI content"]) == [None]
+
+
+def test_disk_lookup_of_many_texts(tmp_path):
+    path = str(tmp_path / "embeddings.sqlite")
+    texts = [f"text {i}" for i in range(5000)]
+    cache = EmbeddingCache("test-model", max_entries=10, path=path)
+    cache._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    cache.put_many(texts, np.ones((len(texts), 2), dtype="float32"))
+
+    assert all(vector is not None for vector in cache.get_many(texts))
@@ -0,0 +1,111 @@
+import faiss
+import numpy as np
+import pytest
+from src.infrastructure.database.index_factory import (
+    build_index,
+    index_type_of,
+    reconstruct_all,
+    recall_report,
+    rerank_exact,
+    search_parameters,
+    storage_report,
+)
+
+
+@pytest.fixture
+def vectors():
+    rng = np.random.default_rng(0)
+    return rng.random((500, 16), dtype="float32")
+
+
+@pytest.mark.parametrize(
+    "index_type", ["flat", "sq_fp16", "sq_int8", "pq", "ivf_flat", "ivf_pq", "hnsw"]
+)
+def test_build_index_keeps_row_ids(index_type, vectors):
+    index = build_index(index_type, 16, nlist=4, pq_m=4, pq_bits=4, hnsw_m=8)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, np.arange(500, dtype="int64") + 1000)
+
+    assert index_type_of(index) == index_type
+    _, labels = index.search(vectors[:1], 1)
+    assert labels[0][0] == 1000
+
+
+@pytest.mark.parametrize("index_type", ["flat", "ivf_flat"])
+def test_remove_and_reconstruct(index_type, vectors):
+    index = build_index(index_type, 16, nlist=4)
+    if not index.is_trained:
+        index.train(vectors)
+    index.add_with_ids(vectors, np.arange(500, dtype="int64"))
+    index.remove_ids(np.array([0, 1], dtype="int64"))
+
+    row_ids, stored = reconstruct_all(index)
+    order = np.argsort(row_ids)
+    assert row_ids[order][0] == 2
+    assert np.allclose(stored[order][0], vectors[2])
+
+
+def test_hnsw_excludes_ids_with_selector(vectors):
+    index = build_index("hnsw", 16, hnsw_m=8)
+    index.add_with_ids(vectors, np.arange(500, dtype="int64"))
+    selector = faiss.IDSelectorNot(faiss.IDSelectorBatch(np.array([0], dtype="int64")))
+    _, labels = index.search(
+        vectors[:1], 1, params=search_parameters(index, selector)
+    )
+    assert labels[0][0] != 0
+
+
+def test_recall_report_against_flat_baseline(vectors):
+    index = build_index("ivf_flat", 16, nlist=4)
+    index.train(vectors)
+    row_ids = np.arange(500, dtype="int64")
+    index.add_with_ids(vectors, row_ids)
+
+    report = recall_report(
+        index, row_ids, vectors, vectors[:20], top_k=5, grid=[{"nprobe": 4}]
+    )
+    assert report[0]["index_type"] == "flat"
+    # Probing every list is an exhaustive search
+    assert report[1]["params"] == {"nprobe": 4}
+    assert report[1]["recall"] == pytest.approx(1.0)
+    assert report[1]["p99_ms"] >= report[1]["p50_ms"]
+
+
+def test_rerank_exact_reorders_by_full_precision_distance(vectors):
+    query = vectors[:1]
+    indices = np.array([[7, 3, 5, -1]], dtype="int64")
+    # Approximate distances claim the opposite order of the exact ones
+    exact = ((vectors[[7, 3, 5]] - query) ** 2).sum(axis=1)
+    distances = np.array([[0.0, 0.1, 0.2, 3.4e38]], dtype="float32")
+    candidates = np.vstack([vectors[[7, 3, 5]], np.zeros((1, 16), "float32")])
+    found = np.array([True, True, False, False])
+
+    reranked_distances, reranked = rerank_exact(
+        query, distances, indices, candidates, found, top_k=3
+    )
+
+    # Row 5 has no full-precision vector and keeps its approximate distance
+    expected = sorted([(exact[0], 7), (exact[1], 3), (0.2, 5)])
+    assert reranked[0].tolist() == [row for _, row in expected]
+    assert np.allclose(reranked_distances[0], [d for d, _ in expected])
+
+
+def test_storage_report_measures_memory_and_recall(vectors):
+    row_ids = np.arange(500, dtype="int64")
+    report = storage_report(
+        row_ids,
+        vectors,
+        vectors[:20],
+        ("flat", "sq_fp16", "sq_int8", "pq"),
+        top_k=5,
+        index_params={"pq_m": 4, "pq_bits": 4},
+    )
+    rows = {row["index_type"]: row for row in report}
+
+    assert rows["flat"]["memory_ratio"] == 1.0
+    assert rows["flat"]["recall"] == pytest.approx(1.0)
+    assert rows["sq_fp16"]["memory_ratio"] < 0.6
+    assert rows["sq_int8"]["memory_ratio"] < rows["sq_fp16"]["memory_ratio"]
+    # Re-scoring candidates with the exact vectors recovers PQ's lost recall
+    assert rows["pq"]["recall_reranked"] > rows["pq"]["recall"]
@@ -0,0 +1,51 @@
+import os
+import faiss
+import numpy as np
+from src.infrastructure.database.index_generations import (
+    IndexGenerations,
+    read_index_mmap,
+)
+
+
+def _write_index(path, count):
+    index = faiss.IndexIDMap2(faiss.IndexFlatL2(8))
+    vectors = np.random.default_rng(0).random((count, 8), dtype="float32")
+    index.add_with_ids(vectors, np.arange(count, dtype="int64"))
+    # Replace rather than rewrite, as VectorDB does: published generations
+    # are hard links to earlier versions of the file
+    faiss.write_index(index, f"{path}.tmp")
+    os.replace(f"{path}.tmp", path)
+
+
+def test_publish_links_generations_and_prunes_old_ones(tmp_path):
+    db_path = str(tmp_path / "index")
+    generations = IndexGenerations(db_path, keep=2)
+    assert generations.current() is None
+
+    for count in (1, 2, 3):
+        _write_index(db_path, count)
+        generation = generations.publish(tombstones=[5, 4])
+
+    manifest = generations.current()
+    assert manifest["generation"] == generation == 3
+    assert manifest["tombstones"] == [4, 5]
+    assert not os.path.exists(generations.generation_path(1))
+    assert os.path.exists(generations.generation_path(2))
+
+    # Published files are immutable: rewriting db_path leaves them alone
+    _write_index(db_path, 10)
+    assert read_index_mmap(manifest["index_path"]).ntotal == 3
+
+
+def test_read_index_mmap_supports_ivf(tmp_path):
+    path = str(tmp_path / "ivf")
+    vectors = np.random.default_rng(0).random((200, 8), dtype="float32")
+    index = faiss.IndexIVFFlat(faiss.IndexFlatL2(8), 8, 4)
+    index.train(vectors)
+    index.add_with_ids(vectors, np.arange(200, dtype="int64"))
+    faiss.write_index(index, path)
+
+    mapped = read_index_mmap(path)
+    assert mapped.ntotal == 200
+    _, ids = mapped.search(vectors[:1], 1)
+    assert ids[0][0] == 0
@@ -1,5 +1,17 @@
+import time
+import logging
+import asyncio
+import httpx
+import pytest
+import requests
+from src.infrastructure.services.circuit_breaker import CircuitBreaker
 from src.infrastructure.services.langchain_service import LangChainService
-from unittest.mock import patch, MagicMock
+from src.infrastructure.services.llm_backends import (
+    OpenAICompatibleBackend,
+    StubBackend,
+    create_llm_backend,
+)
+from unittest.mock import patch, MagicMock, AsyncMock
 
 
 def test_generate_response_with_ollama():
@@ -9,10 +21,8 @@ def test_generate_response_with_ollama():
     # Initialize the LangChainService with the mocked repository
     service = LangChainService(mock_vector_db_repository)
 
-    # Patch the requests.post method used in _langchain_generate
-    with patch(
-        "src.infrastructure.services.langchain_service.requests.post"
-    ) as mock_post:
+    # Patch the pooled session used in _langchain_generate
+    with patch.object(service.session, "post") as mock_post:
         # Mock the Ollama API response
         mock_post.return_value.status_code = 200
         mock_post.return_value.json.return_value = {
@@ -26,8 +36,244 @@ def test_generate_response_with_ollama():
         mock_post.assert_called_once_with(
             "http://localhost:11434/api/generate",
             json={"model": "llama3.2", "prompt": "What is AI?", "stream": False},
-            headers={"Authorization": f"Bearer {service.api_key}"},
+            headers={"Authorization": f"Bearer {service.backend.api_key}"},
+            timeout=(service.connect_timeout, service.read_timeout),
+            stream=False,
         )
 
         # Assert the response is as expected
         assert response == "This is a test response from Ollama."
+
+
+def test_generate_response_async_with_ollama():
+    service = LangChainService(MagicMock())
+
+    with patch(
+        "src.infrastructure.services.langchain_service.httpx.AsyncClient.post",
+        new_callable=AsyncMock,
+    ) as mock_post:
+        mock_post.return_value = MagicMock(status_code=200)
+        mock_post.return_value.json.return_value = {
+            "response": "This is a test response from Ollama."
+        }
+
+        response = asyncio.run(service.generate_response_async("What is AI?"))
+
+        mock_post.assert_awaited_once_with(
+            "http://localhost:11434/api/generate",
+            json={"model": "llama3.2", "prompt": "What is AI?", "stream": False},
+            headers={"Authorization": f"Bearer {service.backend.api_key}"},
+        )
+        assert response == "This is a test response from Ollama."
+
+
+def test_generate_response_stream_with_ollama():
+    service = LangChainService(MagicMock())
+
+    with patch.object(service.session, "post") as mock_post:
+        response = mock_post.return_value
+        response.iter_lines.return_value = [
+            b'{"response": "AI ", "done": false}',
+            b"",
+            b'{"response": "is here.", "done": false}',
+            b'{"response": "", "done": true}',
+        ]
+
+        tokens = list(service.generate_response_stream("What is AI?"))
+
+        mock_post.assert_called_once_with(
+            "http://localhost:11434/api/generate",
+            json={"model": "llama3.2", "prompt": "What is AI?", "stream": True},
+            headers={"Authorization": f"Bearer {service.backend.api_key}"},
+            timeout=(service.connect_timeout, service.read_timeout),
+            stream=True,
+        )
+        assert tokens == ["AI ", "is here."]
+
+
+def test_transient_errors_are_retried_then_open_the_circuit():
+    service = LangChainService(MagicMock())
+    service.retry_backoff = 0
+    service.circuit_breaker.failure_threshold = 1
+
+    with patch.object(
+        service.session,
+        "post",
+        side_effect=requests.exceptions.ConnectionError("connection refused"),
+    ) as mock_post:
+        response = service.generate_response("What is AI?")
+        assert "connection refused" in response
+        assert mock_post.call_count == service.max_retries + 1
+
+        # The backend is now considered down: fail fast without calling it
+        response = service.generate_response("What is AI?")
+        assert response.startswith("The language model is unavailable")
+        assert mock_post.call_count == service.max_retries + 1
+
+
+def test_client_errors_are_not_retried():
+    service = LangChainService(MagicMock())
+
+    with patch.object(service.session, "post") as mock_post:
+        mock_post.return_value.status_code = 400
+        mock_post.return_value.raise_for_status.side_effect = (
+            requests.exceptions.HTTPError(response=mock_post.return_value)
+        )
+        service.generate_response("What is AI?")
+
+    assert mock_post.call_count == 1
+    assert service.circuit_breaker.state == "closed"
+
+
+def test_api_key_is_never_logged(caplog):
+    service = LangChainService(MagicMock())
+    service.backend.api_key = "secret-token"
+
+    with patch.object(service.session, "post") as mock_post, caplog.at_level(
+        logging.DEBUG
+    ):
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {"response": "ok"}
+        service.generate_response("What is AI?")
+
+    assert caplog.records
+    assert "secret-token" not in caplog.text
+
+
+def test_openai_compatible_backend_reuses_the_pooled_session():
+    backend = OpenAICompatibleBackend("http://localhost:8000/", "qwen", "key")
+    service = LangChainService(MagicMock(), backend=backend)
+
+    with patch.object(service.session, "post") as mock_post:
+        mock_post.return_value.json.return_value = {
+            "choices": [{"message": {"content": " Hi. "}}]
+        }
+        assert service.generate_response("What is AI?") == "Hi."
+        mock_post.return_value.iter_lines.return_value = [
+            b'data: {"choices": [{"delta": {"role": "assistant"}}]}',
+            b"",
+            b'data: {"choices": [{"delta": {"content": "AI "}}]}',
+            b'data: {"choices": [{"delta": {"content": "rocks"}}]}',
+            b"data: [DONE]",
+        ]
+        tokens = list(service.generate_response_stream("What is AI?"))
+
+    assert tokens == ["AI ", "rocks"]
+    url, kwargs = mock_post.call_args.args[0], mock_post.call_args.kwargs
+    assert url == "http://localhost:8000/v1/chat/completions"
+    assert kwargs["json"]["model"] == "qwen"
+    assert kwargs["json"]["messages"][-1] == {"role": "user", "content": "What is AI?"}
+    assert kwargs["headers"] == {"Authorization": "Bearer key"}
+
+
+def test_stub_backend_is_deterministic_and_paced():
+    backend = StubBackend(latency_ms=20, tokens_per_second=200, response_tokens=4)
+    service = LangChainService(MagicMock(), backend=backend)
+
+    started = time.perf_counter()
+    response = service.generate_response("What is AI?")
+    took = time.perf_counter() - started
+
+    assert response == service.generate_response("What is AI?")
+    assert response != service.generate_response("What is ML?")
+    assert response.startswith("stub-") and response.endswith(" t1 t2 t3")
+    assert took >= backend.model_seconds() == pytest.approx(0.04)
+
+    async def stream():
+        return [token async for token in service.generate_response_stream_async("q")]
+
+    assert "".join(asyncio.run(stream())) == asyncio.run(
+        service.generate_response_async("q")
+    )
+
+
+def test_llm_backend_is_selected_by_config(monkeypatch):
+    monkeypatch.setenv("LLM_BACKEND", "openai")
+    monkeypatch.setenv("LLM_BASE_URL", "http://vllm:8000")
+    monkeypatch.setenv("LLM_MODEL", "mistral")
+    backend = create_llm_backend()
+    assert backend.url == "http://vllm:8000/v1/chat/completions"
+    assert backend.model == "mistral"
+
+    assert isinstance(create_llm_backend("stub"), StubBackend)
+    with pytest.raises(ValueError, match="Unknown LLM backend"):
+        create_llm_backend("gpt-local")
+
+
+def test_failed_responses_are_closed_before_retrying():
+    service = LangChainService(MagicMock())
+    service.retry_backoff = 0
+    unavailable = MagicMock(status_code=503)
+    unavailable.raise_for_status.side_effect = requests.exceptions.HTTPError(
+        response=unavailable
+    )
+
+    with patch.object(service.session, "post", return_value=unavailable):
+        service.generate_response("What is AI?")
+    assert unavailable.close.call_count == service.max_retries + 1
+
+    async def generate():
+        response = MagicMock(status_code=503)
+        response.aclose = AsyncMock()
+        response.raise_for_status.side_effect = httpx.HTTPStatusError(
+            "503", request=MagicMock(), response=response
+        )
+        with patch.object(service, "_get_async_client") as get_client:
+            get_client.return_value.send = AsyncMock(return_value=response)
+            service._async_semaphore = asyncio.Semaphore(1)
+            tokens = [t async for t in service.generate_response_stream_async("q")]
+        return tokens, response
+
+    tokens, response = asyncio.run(generate())
+    assert tokens[0].startswith("An error occurred")
+    assert response.aclose.await_count == service.max_retries + 1
+
+
+def test_streams_broken_mid_response_count_as_failures():
+    service = LangChainService(MagicMock())
+    service.circuit_breaker.failure_threshold = 1
+
+    def lines():
+        yield b'{"response": "AI ", "done": false}'
+        raise requests.exceptions.ChunkedEncodingError("connection reset")
+
+    with patch.object(service.session, "post") as mock_post:
+        mock_post.return_value.iter_lines.return_value = lines()
+        tokens = list(service.generate_response_stream("What is AI?"))
+
+    assert tokens[0] == "AI "
+    assert tokens[1].startswith("An error occurred")
+    assert service.circuit_breaker.state == "open"
+
+    service = LangChainService(MagicMock())
+    service.circuit_breaker.failure_threshold = 1
+
+    async def async_lines():
+        yield '{"response": "AI ", "done": false}'
+        raise httpx.ReadError("connection reset")
+
+    async def generate():
+        response = MagicMock(status_code=200)
+        response.aclose = AsyncMock()
+        response.aiter_lines = async_lines
+        with patch.object(service, "_get_async_client") as get_client:
+            get_client.return_value.send = AsyncMock(return_value=response)
+            service._async_semaphore = asyncio.Semaphore(1)
+            return [t async for t in service.generate_response_stream_async("q")]
+
+    tokens = asyncio.run(generate())
+    assert tokens[1].startswith("An error occurred")
+    assert service.circuit_breaker.state == "open"
+
+
+def test_lost_half_open_trial_is_replaced_after_reset_timeout():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    time.sleep(0.06)
+
+    assert breaker.allow()  # The trial call, which never reports back
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == breaker.CLOSED
@@ -0,0 +1,69 @@
+import pytest
+from src.infrastructure.database.metadata_index import MetadataIndex
+
+RECORDS = [
+    {"metadata": {"category": "animals", "year": 1999, "tags": ["big", "wild"]}},
+    {"metadata": {"category": "animals", "year": 2005, "tags": ["small"]}},
+    {"metadata": {"category": "cooking", "year": 2010, "author": "Ann"}},
+    {"metadata": {"category": "cooking", "year": 2021, "author": "Bob"}},
+]
+
+
+@pytest.fixture
+def index():
+    index = MetadataIndex()
+    index.add(range(len(RECORDS)), RECORDS)
+    return index
+
+
+def test_equality_and_in(index):
+    assert index.matching({"category": "animals"}).tolist() == [0, 1]
+    assert index.matching({"author": {"$in": ["Bob", "Eve"]}}).tolist() == [3]
+    assert index.matching({"tags": "wild"}).tolist() == [0]
+
+
+def test_range_and_combined_filters(index):
+    assert index.matching({"year": {"$gte": 2005, "$lt": 2021}}).tolist() == [1, 2]
+    assert index.matching({"year": {"$gt": 2005}, "category": "cooking"}).tolist() == [
+        2,
+        3,
+    ]
+    assert index.matching({"year": {"$lte": 1990}}).tolist() == []
+
+
+def test_remove_updates_postings_and_ranges(index):
+    index.remove([1], [RECORDS[1]])
+    assert index.matching({"category": "animals"}).tolist() == [0]
+    assert index.matching({"year": {"$gte": 2000, "$lt": 2015}}).tolist() == [2]
+
+
+def test_invalid_filters_raise(index):
+    with pytest.raises(ValueError):
+        index.matching({"year": {"$near": 2000}})
+    with pytest.raises(ValueError):
+        index.matching({"year": {"$gte": 2000, "$lt": "2020"}})
+
+
+def test_unhashable_filter_values_raise_value_error(index):
+    with pytest.raises(ValueError, match="tags"):
+        index.matching({"tags": ["a"]})
+    with pytest.raises(ValueError, match=r"\$in"):
+        index.matching({"tags": {"$in": [["a"], "b"]}})
+    with pytest.raises(ValueError, match=r"\$in"):
+        index.matching({"tags": {"$in": "ab"}})
+
+
+def test_booleans_do_not_match_equal_numbers():
+    index = MetadataIndex()
+    records = [
+        {"metadata": {"flag": True}},
+        {"metadata": {"flag": 1}},
+        {"metadata": {"flag": False}},
+        {"metadata": {"flag": 0.0}},
+    ]
+    index.add(range(len(records)), records)
+
+    assert index.matching({"flag": True}).tolist() == [0]
+    assert index.matching({"flag": 1.0}).tolist() == [1]
+    assert index.matching({"flag": {"$in": [False]}}).tolist() == [2]
+    assert index.matching({"flag": {"$gte": 0, "$lte": 1}}).tolist() == [1, 3]
@@ -0,0 +1,79 @@
+import sqlite3
+import pytest
+from src.infrastructure.database.metadata_store import create_metadata_store
+
+
+@pytest.fixture(params=["json", "sqlite"])
+def store_factory(request, tmp_path):
+    path = str(tmp_path / f"metadata.{request.param}")
+    return lambda: create_metadata_store(request.param, path)
+
+
+def test_add_and_get_by_row_id(store_factory):
+    store = store_factory()
+    store.add(
+        [0, 1],
+        [
+            {"id": "a", "content": "First", "metadata": {"author": "John Doe"}},
+            {"id": "b", "content": "Second", "metadata": {}},
+        ],
+    )
+    assert len(store) == 2
+    records = store.get([1, 0, 7])
+    assert records[0]["id"] == "b"
+    assert records[1]["metadata"] == {"author": "John Doe"}
+    assert records[2] is None
+
+
+def test_delete_keeps_row_ids(store_factory):
+    store = store_factory()
+    store.add(
+        [0, 1, 2],
+        [{"id": doc_id, "content": doc_id, "metadata": {}} for doc_id in "abc"],
+    )
+    store.delete(store.row_ids_for(["b"]))
+    assert [row_id for row_id, _ in store.items()] == [0, 2]
+    assert [record["id"] for record in store] == ["a", "c"]
+
+
+
+def test_row_ids_for_matches_chunks_by_parent_id(store_factory):
+    store = store_factory()
+    store.add(
+        [0, 1, 2],
+        [
+            {"id": "p:0", "content": "x", "metadata": {"parent_id": "p"}},
+            {"id": "p:1", "content": "y", "metadata": {"parent_id": "p"}},
+            {"id": "q", "content": "z", "metadata": {}},
+        ],
+    )
+    assert sorted(store.row_ids_for(["p"])) == [0, 1]
+    assert store.row_ids_for(["p:1"]) == [1]
+
+def test_save_and_reopen(store_factory):
+    store = store_factory()
+    store.add([0], [{"id": "a", "content": "First", "metadata": {"tag": 1}}])
+    store.save()
+    store.close()
+
+    reopened = store_factory()
+    assert len(reopened) == 1
+    assert reopened.get([0])[0] == {
+        "id": "a",
+        "content": "First",
+        "metadata": {"tag": 1},
+    }
+
+
+def test_lookups_of_many_ids_stay_under_sql_variable_limit(store_factory):
+    store = store_factory()
+    if hasattr(store, "_conn"):
+        # As on SQLite builds before 3.32, whatever this one was compiled with
+        store._conn.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 999)
+    count = 5000
+    store.add(
+        list(range(count)),
+        [{"id": f"d{i}", "content": "", "metadata": {}} for i in range(count)],
+    )
+    assert len([r for r in store.get(range(count)) if r is not None]) == count
+    assert len(store.row_ids_for([f"d{i}" for i in range(count)])) == count
@@ -0,0 +1,79 @@
+import logging
+import pytest
+from src.infrastructure.services.metrics import (
+    MetricsRegistry,
+    STAGE_SECONDS,
+    STAGE_ERRORS,
+    span,
+)
+from src.infrastructure.services.tracing import (
+    TraceIdFilter,
+    reset_trace_id,
+    set_trace_id,
+)
+
+
+def test_render_prometheus_text_format():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests", "Requests served", ("route",))
+    size = registry.gauge("index_size", "Vectors in the index")
+    latency = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+    requests.inc(route="/retrieve")
+    requests.inc(2, route="/retrieve")
+    size.set(42)
+    latency.observe(0.05)
+    latency.observe(0.5)
+    latency.observe(5)
+
+    text = registry.render()
+
+    assert "# TYPE requests counter" in text
+    assert 'requests_total{route="/retrieve"} 3' in text
+    assert "index_size 42" in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 3' in text
+    assert "latency_seconds_count 3" in text
+    assert "latency_seconds_sum 5.55" in text
+
+
+def test_registry_reuses_metrics_and_rejects_conflicts():
+    registry = MetricsRegistry()
+    counter = registry.counter("hits", "Hits")
+    assert registry.counter("hits", "Hits") is counter
+    with pytest.raises(ValueError):
+        registry.gauge("hits", "Hits")
+    with pytest.raises(ValueError):
+        counter.inc(route="/x")  # Undeclared label
+
+
+def test_collectors_run_before_render():
+    registry = MetricsRegistry()
+    gauge = registry.gauge("documents", "Stored documents")
+    registry.add_collector(lambda: gauge.set(7))
+    assert "documents 7" in registry.render()
+
+
+def test_span_records_duration_and_errors():
+    before = STAGE_SECONDS.count(stage="test_stage")
+    with span("test_stage"):
+        pass
+    with pytest.raises(RuntimeError):
+        with span("test_stage"):
+            raise RuntimeError("boom")
+
+    assert STAGE_SECONDS.count(stage="test_stage") == before + 2
+    assert STAGE_ERRORS.value(stage="test_stage") >= 1
+
+
+def test_trace_id_filter_tags_log_records():
+    record = logging.LogRecord("test", logging.INFO, __file__, 1, "msg", (), None)
+    token = set_trace_id("abc123")
+    try:
+        TraceIdFilter().filter(record)
+    finally:
+        reset_trace_id(token)
+    assert record.trace_id == "abc123"
+
+    TraceIdFilter().filter(record)
+    assert record.trace_id == "-"
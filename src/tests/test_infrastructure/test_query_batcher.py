@@ -0,0 +1,75 @@
+import asyncio
+import threading
+from unittest.mock import Mock
+from src.domain.entities.document import Document
+from src.infrastructure.database.query_batcher import QueryBatcher
+
+
+def test_concurrent_queries_share_one_search():
+    vector_db = Mock()
+
+    def get_documents_batch(queries, top_k):
+        return [
+            [Document(id=f"{q}-{i}", content=q, metadata={}) for i in range(top_k)]
+            for q in queries
+        ]
+
+    vector_db.get_documents_batch.side_effect = get_documents_batch
+    batcher = QueryBatcher(vector_db, max_batch_size=8, max_wait_ms=200)
+    try:
+        futures = [batcher.submit(f"q{i}", top_k=1 + i % 2) for i in range(4)]
+        results = [future.result(timeout=5) for future in futures]
+    finally:
+        batcher.close()
+
+    vector_db.get_documents_batch.assert_called_once_with(["q0", "q1", "q2", "q3"], 2)
+    assert [len(documents) for documents in results] == [1, 2, 1, 2]
+    assert results[2][0].id == "q2-0"
+    stats = batcher.stats()
+    assert stats["batches"] == 1
+    assert stats["batch_sizes"] == {4: 1}
+
+
+def test_search_errors_reach_every_caller():
+    vector_db = Mock()
+    vector_db.get_documents_batch.side_effect = RuntimeError("index unavailable")
+    batcher = QueryBatcher(vector_db, max_batch_size=2, max_wait_ms=50)
+    try:
+        futures = [batcher.submit("q1"), batcher.submit("q2")]
+        for future in futures:
+            assert isinstance(future.exception(timeout=5), RuntimeError)
+    finally:
+        batcher.close()
+
+
+def test_cancelled_caller_does_not_stop_the_worker():
+    vector_db = Mock()
+    release = threading.Event()
+
+    def get_documents_batch(queries, top_k):
+        release.wait(timeout=5)
+        return [[Document(id=q, content=q, metadata={})] for q in queries]
+
+    vector_db.get_documents_batch.side_effect = get_documents_batch
+    batcher = QueryBatcher(vector_db, max_batch_size=1, max_wait_ms=0)
+
+    async def scenario():
+        # The first query is being searched when its caller gives up
+        with_timeout = asyncio.wait_for(batcher.get_documents_async("q1"), 0.05)
+        try:
+            await with_timeout
+        except asyncio.TimeoutError:
+            pass
+        # The second one is cancelled while still queued
+        queued = asyncio.ensure_future(batcher.get_documents_async("q2"))
+        await asyncio.sleep(0.01)
+        queued.cancel()
+        release.set()
+        return await asyncio.wait_for(batcher.get_documents_async("q3"), 5)
+
+    try:
+        documents = asyncio.run(scenario())
+    finally:
+        batcher.close()
+
+    assert [document.id for document in documents] == ["q3"]
@@ -0,0 +1,129 @@
+import sys
+import time
+import types
+import threading
+from unittest.mock import patch
+from src.domain.entities.document import Document
+from src.infrastructure.services.reranker import CrossEncoderReranker
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words the document contains."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32):
+        self.calls.append(list(pairs))
+        time.sleep(self.delay)
+        return [
+            sum(word in doc.lower() for word in query.lower().split())
+            for query, doc in pairs
+        ]
+
+
+DOCUMENTS = [
+    Document(id="1", content="Cats sleep a lot.", metadata={}),
+    Document(id="2", content="Python is a language.", metadata={}),
+    Document(id="3", content="Python type hints help.", metadata={}),
+]
+
+
+def make_reranker(model, **kwargs):
+    options = {"candidates": 10, "top_k": 2, "budget_ms": 1000}
+    options.update(kwargs)
+    return CrossEncoderReranker(model=model, **options)
+
+
+def test_rerank_keeps_best_scored_in_one_batch():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model)
+
+    ranked = reranker.rerank("python type hints", DOCUMENTS)
+
+    assert [doc.id for doc in ranked] == ["3", "2"]
+    assert len(model.calls) == 1 and len(model.calls[0]) == 3
+
+
+def test_rerank_caches_pair_scores():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model)
+    reranker.rerank("python type hints", DOCUMENTS[:2])
+
+    ranked = reranker.rerank("python type hints", DOCUMENTS)
+
+    # Only the new document is scored the second time
+    assert model.calls[1] == [("python type hints", "Python type hints help.")]
+    assert [doc.id for doc in ranked] == ["3", "2"]
+
+
+def test_rerank_truncates_to_latency_budget():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model, budget_ms=20, top_k=3)
+    reranker.seconds_per_pair = 0.01  # Two pairs fit in the budget
+
+    ranked = reranker.rerank("python type hints", DOCUMENTS[::-1])
+
+    assert len(model.calls[0]) == 2
+    # Scored candidates first, the unscored one keeps its retrieval place
+    assert [doc.id for doc in ranked] == ["3", "2", "1"]
+
+
+def slow_loading_cross_encoder(load_seconds):
+    """A sentence_transformers stand-in whose CrossEncoder takes a while to load."""
+
+    def load(model_name, device=None):
+        time.sleep(load_seconds)
+        return FakeCrossEncoder()
+
+    return types.SimpleNamespace(CrossEncoder=load)
+
+
+def test_warm_up_does_not_count_model_load_as_cost():
+    reranker = CrossEncoderReranker(budget_ms=20)
+    module = slow_loading_cross_encoder(0.3)
+    with patch.dict(sys.modules, {"sentence_transformers": module}):
+        reranker.warm_up()
+
+    assert reranker.seconds_per_pair < 0.01
+    assert len(reranker.model.calls) == 1
+
+
+def test_first_rerank_does_not_count_model_load_as_cost():
+    reranker = CrossEncoderReranker(budget_ms=20, top_k=3)
+    module = slow_loading_cross_encoder(0.3)
+    with patch.dict(sys.modules, {"sentence_transformers": module}):
+        reranker.rerank("python type hints", DOCUMENTS)
+
+    assert reranker.seconds_per_pair < 0.01
+    assert len(reranker.model.calls[0]) == 3
+
+
+def test_rerank_scores_one_pair_when_estimate_exceeds_budget():
+    model = FakeCrossEncoder()
+    reranker = make_reranker(model, budget_ms=20, top_k=3)
+    reranker.seconds_per_pair = 1.0  # A stale estimate: nothing would fit
+
+    ranked = reranker.rerank("python type hints", DOCUMENTS[::-1])
+
+    assert len(model.calls[0]) == 1
+    assert ranked[0].id == "3"
+    # The pair re-measured the cost, so the estimate recovers
+    assert reranker.seconds_per_pair < 1.0
+
+
+def test_rerank_skipped_when_all_slots_are_busy():
+    model = FakeCrossEncoder(delay=0.2)
+    reranker = make_reranker(model, max_concurrency=1)
+    worker = threading.Thread(
+        target=reranker.rerank, args=("python type hints", DOCUMENTS)
+    )
+    worker.start()
+    time.sleep(0.05)
+
+    ranked = reranker.rerank("cats", DOCUMENTS)
+    worker.join()
+
+    assert [doc.id for doc in ranked] == ["1", "2"]
+    assert len(model.calls) == 1
@@ -0,0 +1,51 @@
+import numpy as np
+from src.infrastructure.services.response_cache import ResponseCache
+
+VECTORS = {
+    "What is AI?": np.array([1.0, 0.0], dtype="float32"),
+    "what's AI?": np.array([0.99, 0.141], dtype="float32"),
+    "How do I cook rice?": np.array([0.0, 1.0], dtype="float32"),
+}
+
+
+def make_cache(**kwargs):
+    return ResponseCache(VECTORS.__getitem__, threshold=0.95, **kwargs)
+
+
+def test_similar_query_over_same_documents_hits():
+    cache = make_cache()
+    cache.put("What is AI?", ["1", "2"], "AI is ...")
+
+    assert cache.get("what's AI?", ["2", "1"]) == "AI is ..."
+    assert cache.get("How do I cook rice?", ["1", "2"]) is None
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_different_documents_miss():
+    cache = make_cache()
+    cache.put("What is AI?", ["1", "2"], "AI is ...")
+
+    assert cache.get("What is AI?", ["1", "3"]) is None
+
+
+def test_invalidate_drops_entries_using_the_document():
+    cache = make_cache()
+    cache.put("What is AI?", ["1", "2"], "AI is ...")
+    cache.put("How do I cook rice?", ["3"], "Boil it.")
+
+    cache.invalidate(["2"])
+
+    assert cache.get("What is AI?", ["1", "2"]) is None
+    assert cache.get("How do I cook rice?", ["3"]) == "Boil it."
+    assert cache.stats()["invalidations"] == 1
+
+
+def test_ttl_and_lru_eviction():
+    cache = make_cache(max_entries=1)
+    cache.put("What is AI?", ["1"], "AI is ...")
+    cache.put("How do I cook rice?", ["3"], "Boil it.")
+    assert cache.get("What is AI?", ["1"]) is None
+
+    cache.ttl = 1e-9
+    assert cache.get("How do I cook rice?", ["3"]) is None
+    assert cache.stats()["entries"] == 0
@@ -0,0 +1,93 @@
+import pytest
+from src.domain.entities.document import Document
+from src.infrastructure.database.sharded_vector_db import ShardedVectorDB
+
+DOCUMENTS = [
+    Document(id=f"doc-{i}", content=f"Document number {i} about topic {i}", metadata={})
+    for i in range(20)
+]
+
+
+@pytest.fixture
+def sharded_db(tmp_path):
+    db = ShardedVectorDB(str(tmp_path / "index"), num_shards=3, processes=False)
+    yield db
+    db.close()
+
+
+def shard_contents(db):
+    return [
+        sorted(doc.id for doc in shard.call("export_vectors")[0])
+        for shard in db.shards
+    ]
+
+
+def test_documents_are_partitioned_by_id(sharded_db):
+    sharded_db.add_documents(DOCUMENTS)
+
+    contents = shard_contents(sharded_db)
+    assert sum(len(ids) for ids in contents) == len(DOCUMENTS)
+    for shard, ids in enumerate(contents):
+        assert all(sharded_db.shard_for(doc_id) == shard for doc_id in ids)
+
+
+def test_search_merges_shards_by_distance(sharded_db):
+    sharded_db.add_documents(DOCUMENTS)
+
+    results = sharded_db.get_documents(DOCUMENTS[7].content, top_k=5)
+
+    assert len(results) == 5
+    assert results[0].id == "doc-7"
+
+
+def test_lexical_search_merges_shards_by_score(sharded_db):
+    sharded_db.add_documents(DOCUMENTS)
+
+    results = sharded_db.get_documents("topic 7", top_k=3, mode="lexical")
+
+    assert results[0].id == "doc-7"
+    assert sharded_db.get_documents("topic 7", top_k=3, mode="hybrid")[0].id == (
+        "doc-7"
+    )
+
+
+def test_delete_reaches_every_shard(sharded_db):
+    sharded_db.add_documents(DOCUMENTS)
+    changes = []
+    sharded_db.add_change_listener(changes.append)
+
+    deleted = sharded_db.delete_documents(["doc-8", "doc-7", "doc-8", "missing"])
+
+    assert deleted == ["doc-8", "doc-7"]
+    assert sorted(changes[0]) == ["doc-7", "doc-8"]
+    remaining = [doc_id for ids in shard_contents(sharded_db) for doc_id in ids]
+    assert "doc-7" not in remaining and "doc-8" not in remaining
+    assert len(remaining) == len(DOCUMENTS) - 2
+
+
+def test_resize_rebalances_without_losing_documents(tmp_path):
+    db_path = str(tmp_path / "index")
+    db = ShardedVectorDB(db_path, num_shards=2, processes=False)
+    db.add_documents(DOCUMENTS)
+    db.close()
+
+    # Reopening with a different shard count redistributes the vectors
+    db = ShardedVectorDB(db_path, num_shards=5, processes=False)
+    try:
+        contents = shard_contents(db)
+        assert len(contents) == 5
+        assert sorted(i for ids in contents for i in ids) == sorted(
+            doc.id for doc in DOCUMENTS
+        )
+        assert db.get_documents(DOCUMENTS[3].content, top_k=1)[0].id == "doc-3"
+    finally:
+        db.close()
+
+
+def test_worker_processes(tmp_path):
+    db = ShardedVectorDB(str(tmp_path / "index"), num_shards=2, processes=True)
+    try:
+        db.add_documents(DOCUMENTS[:4])
+        assert db.get_documents(DOCUMENTS[2].content, top_k=1)[0].id == "doc-2"
+    finally:
+        db.close()
@@ -1,6 +1,9 @@
 import os
+import numpy as np
 import pytest
+from unittest.mock import MagicMock
 from src.infrastructure.database.vector_db import VectorDB
+from src.infrastructure.database.embedding_cache import EmbeddingCache
 from src.domain.entities.document import Document
 
 
@@ -16,6 +19,8 @@ def vector_db():
         os.remove(db_path)
     if os.path.exists(metadata_path):
         os.remove(metadata_path)
+    if os.path.exists(f"{db_path}_info.json"):
+        os.remove(f"{db_path}_info.json")
 
     # Return a fresh instance of VectorDB
     # Create a fresh instance of VectorDB
@@ -33,6 +38,66 @@ def test_add_document(vector_db):
     assert len(vector_db.documents) == 1
 
 
+def test_add_documents_in_batches(vector_db):
+    vector_db.batch_size = 2
+    documents = [
+        Document(id=str(i), content=f"Batch content {i}", metadata={})
+        for i in range(5)
+    ]
+    vector_db.add_documents(documents)
+    assert len(vector_db.documents) == 5
+    assert vector_db.index.ntotal == 5
+
+    results = vector_db.get_documents(query="Batch content 3", top_k=1)
+    assert results[0].id == "3"
+
+
+def test_delete_documents_does_not_reembed(vector_db):
+    vector_db.add_documents(
+        [
+            Document(id=str(i), content=f"Delete content {i}", metadata={})
+            for i in range(4)
+        ]
+    )
+    encode_calls = []
+    original_encode = vector_db.embedding_model.encode
+    vector_db.embedding_model.encode = lambda *args, **kwargs: (
+        encode_calls.append(args) or original_encode(*args, **kwargs)
+    )
+    try:
+        vector_db.delete_documents(["1", "2"])
+    finally:
+        vector_db.embedding_model.encode = original_encode
+
+    assert encode_calls == []
+    assert vector_db.index.ntotal == 2
+    assert [doc["id"] for doc in vector_db.documents] == ["0", "3"]
+    results = vector_db.get_documents(query="Delete content 3", top_k=1)
+    assert results[0].id == "3"
+
+
+def test_repeated_text_hits_embedding_cache(vector_db):
+    vector_db.add_document(Document(id="1", content="Cached content", metadata={}))
+    misses = vector_db.embedding_cache.misses
+
+    vector_db.get_documents(query="Cached content", top_k=1)
+    vector_db._rebuild_index()
+
+    assert vector_db.embedding_cache.misses == misses
+    assert vector_db.embedding_cache.stats()["memory_hits"] >= 2
+
+
+def test_get_documents_batch(vector_db):
+    vector_db.add_documents(
+        [
+            Document(id="1", content="AI content", metadata={}),
+            Document(id="2", content="Cooking content", metadata={}),
+        ]
+    )
+    results = vector_db.get_documents_batch(["AI content", "Cooking content"], top_k=1)
+    assert [documents[0].id for documents in results] == ["1", "2"]
+
+
 def test_get_documents(vector_db):
     document = Document(id="1", content="Test content", metadata={"author": "John Doe"})
     vector_db.add_document(document)
@@ -101,3 +166,216 @@ def test_vector_db_better_similarity_search(vector_db):
         "Deep learning advancements",
     ]
     assert results[2].content in ["AI content", "AI and robotics"]
+
+
+def test_wal_mode_recovers_unflushed_changes(vector_db):
+    db_path = "./data/faiss_index_wal_test"
+    wal_db = VectorDB(
+        db_path=db_path,
+        embedding_model=vector_db.embedding_model,
+        persistence_mode="wal",
+    )
+    try:
+        wal_db.add_documents(
+            [
+                Document(id="1", content="AI content", metadata={}),
+                Document(id="2", content="Cooking content", metadata={}),
+            ]
+        )
+        wal_db.delete_document("2")
+
+        # Nothing is checkpointed yet, only the log is on disk
+        assert not os.path.exists(db_path)
+        assert os.path.exists(f"{db_path}.wal")
+
+        # Simulate a restart without flush(): the log is replayed
+        recovered = VectorDB(
+            db_path=db_path,
+            embedding_model=vector_db.embedding_model,
+            persistence_mode="wal",
+        )
+        assert [doc["id"] for doc in recovered.documents] == ["1"]
+        assert recovered.index.ntotal == 1
+        assert os.path.exists(db_path)
+        assert not os.path.exists(f"{db_path}.wal")
+    finally:
+        for path in (
+            db_path,
+            f"{db_path}_metadata.json",
+            f"{db_path}.wal",
+            f"{db_path}_info.json",
+        ):
+            if os.path.exists(path):
+                os.remove(path)
+
+
+def test_change_listeners_see_added_and_deleted_ids(vector_db):
+    changes = []
+    vector_db.add_change_listener(changes.append)
+
+    vector_db.add_document(Document(id="listened", content="AI content", metadata={}))
+    vector_db.delete_document("listened")
+    vector_db.delete_document("missing")
+
+    assert changes == [["listened"], ["listened"]]
+
+
+def test_deleting_parent_removes_its_chunks(vector_db):
+    vector_db.add_documents(
+        [
+            Document(
+                id=f"parent:{i}",
+                content=f"Chunk {i}",
+                metadata={"parent_id": "parent", "chunk_index": i},
+            )
+            for i in range(3)
+        ]
+    )
+
+    changes = []
+    vector_db.add_change_listener(changes.append)
+
+    deleted = vector_db.delete_documents(["parent", "parent:1", "parent", "missing"])
+
+    # The ids asked for that matched, once each; listeners see every record
+    assert deleted == ["parent", "parent:1"]
+    assert sorted(changes[0]) == ["parent:0", "parent:1", "parent:2"]
+    assert vector_db.documents.row_ids_for(["parent"]) == []
+
+
+@pytest.mark.parametrize("exact_limit", [2048, 0])
+def test_get_documents_with_metadata_filters(vector_db, exact_limit):
+    vector_db.filter_exact_limit = exact_limit
+    vector_db.add_documents(
+        [
+            Document(id="a", content="Lions hunt", metadata={"year": 1999}),
+            Document(id="b", content="Lions sleep", metadata={"year": 2005}),
+            Document(id="c", content="Lions roar", metadata={"year": 2010}),
+        ]
+    )
+    vector_db.delete_document("c")
+
+    results = vector_db.get_documents(
+        "Lions hunt", top_k=5, filters={"year": {"$gte": 2000}}
+    )
+
+    assert [doc.id for doc in results] == ["b"]
+    assert vector_db.get_documents("Lions", filters={"year": 1800}) == []
+
+
+def test_lazy_load_and_persisted_embedding_dim(vector_db, tmp_path):
+    db_path = str(tmp_path / "index")
+    db = VectorDB(db_path=db_path, embedding_model=vector_db.embedding_model, lazy=True)
+    assert not db.is_loaded
+    assert not os.path.exists(f"{db_path}_info.json")
+
+    db.add_document(Document(id="1", content="Lazy content", metadata={}))
+    assert db.is_loaded
+
+    # A restart sizes the index from the stored dimension, without the model
+    model = MagicMock()
+    model.encode.side_effect = AssertionError("model should not be called")
+    reopened = VectorDB(
+        db_path=db_path,
+        embedding_model=model,
+        embedding_model_name=db.embedding_model_name,
+    )
+    assert reopened.embedding_dim == db.embedding_dim
+    assert reopened.index.ntotal == 1
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_reader_follows_writer_generations(vector_db, tmp_path, index_type):
+    db_path = str(tmp_path / "index")
+    writer = VectorDB(
+        db_path=db_path,
+        embedding_model=vector_db.embedding_model,
+        index_type=index_type,
+        metadata_backend="sqlite",
+        role="writer",
+    )
+    writer.add_documents(
+        [
+            Document(id="1", content="AI content", metadata={}),
+            Document(id="2", content="Cooking content", metadata={}),
+        ]
+    )
+    reader = VectorDB(
+        db_path=db_path,
+        embedding_model=vector_db.embedding_model,
+        index_type=index_type,
+        metadata_backend="sqlite",
+        role="reader",
+    )
+    try:
+        assert reader.generation == writer.generation
+        assert {doc.id for doc in reader.get_documents("content")} == {"1", "2"}
+        with pytest.raises(RuntimeError):
+            reader.add_document(Document(id="3", content="Nope", metadata={}))
+
+        # Readers keep serving their generation until they reload
+        writer.delete_document("2")
+        writer.add_document(Document(id="3", content="Travel content", metadata={}))
+        assert reader.index.ntotal == 2
+        assert reader.reload()
+        assert reader.generation == writer.generation
+        assert {doc.id for doc in reader.get_documents("content")} == {"1", "3"}
+        assert not reader.reload()
+    finally:
+        reader.close()
+
+
+def test_compressed_storage_reranks_with_full_vectors(vector_db, tmp_path):
+    db_path = str(tmp_path / "index")
+    db = VectorDB(
+        db_path=db_path,
+        embedding_model=vector_db.embedding_model,
+        index_type="sq_fp16",
+    )
+    documents = [
+        Document(id=str(i), content=f"topic {i} content words", metadata={})
+        for i in range(20)
+    ]
+    db.add_documents(documents)
+
+    assert db.index_stats()["vectors"] == 20
+    assert os.path.getsize(f"{db_path}.vectors") == 20 * db.embedding_dim * 4
+    [hit] = db.get_documents("topic 7 content words", top_k=1)
+    assert hit.id == "7"
+    # Hits carry their exact stored vector, for reuse without re-embedding
+    assert np.array_equal(hit.embedding, db._encode(["topic 7 content words"])[0])
+
+    # Switching layout reads the exact copies instead of re-embedding
+    expected = db._encode(["topic 3 content words"])[0]
+    db.embedding_model = MagicMock()
+    db.embedding_model.encode.side_effect = AssertionError("re-embedded")
+    db.embedding_cache = EmbeddingCache("uncached", max_entries=0)
+    db.index_type = "flat"
+    db.train_index()
+    assert db.index.ntotal == 20
+    assert np.array_equal(db.index.reconstruct(3), expected)
+
+
+def test_lexical_and_hybrid_retrieval(vector_db):
+    vector_db.add_documents(
+        [
+            Document(id="a", content="Login fails with ERR-4012", metadata={"t": 1}),
+            Document(id="b", content="Login page redesign notes", metadata={"t": 2}),
+            Document(id="c", content="Pasta recipes for dinner", metadata={"t": 1}),
+        ]
+    )
+
+    lexical = vector_db.get_documents("ERR-4012", top_k=2, mode="lexical")
+    assert [doc.id for doc in lexical] == ["a"]
+    expected = vector_db.encode(["Login fails with ERR-4012"])[0]
+    assert np.allclose(lexical[0].embedding, expected)
+    hybrid = vector_db.get_documents("ERR-4012 login", top_k=3, mode="hybrid")
+    assert hybrid[0].id == "a"
+    filtered = vector_db.get_documents(
+        "login", top_k=3, filters={"t": 2}, mode="lexical"
+    )
+    assert [doc.id for doc in filtered] == ["b"]
+
+    # The BM25 index follows deletes without a rebuild
+    vector_db.delete_document("a")
+    assert vector_db.get_documents("ERR-4012", mode="lexical") == []
@@ -0,0 +1,21 @@
+import numpy as np
+from src.infrastructure.database.vector_file import VectorFile
+
+
+def test_rows_are_addressed_by_id_and_missing_rows_reported(tmp_path):
+    path = str(tmp_path / "index.vectors")
+    vectors = np.eye(4, dtype="float32")
+    store = VectorFile(path, dim=4)
+
+    store.write(np.array([0, 1, 5, 6]), vectors)
+    read, found = store.read(np.array([6, 2, 0, 9]))
+
+    assert found.tolist() == [True, False, True, False]
+    assert np.array_equal(read[0], vectors[3])
+    assert np.array_equal(read[2], vectors[0])
+
+    # Rewrites (e.g. a WAL replay) overwrite in place; a new handle sees them
+    store.write(np.array([1]), vectors[3:])
+    store.sync()
+    read, _ = VectorFile(path, dim=4).read(np.array([1]))
+    assert np.array_equal(read[0], vectors[3])
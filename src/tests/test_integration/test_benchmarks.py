@@ -0,0 +1,23 @@
+import json
+from benchmarks import run
+
+
+def test_benchmark_smoke_run(tmp_path):
+    output = tmp_path / "result.json"
+    run.main(
+        [
+            "--docs", "300",
+            "--queries", "20",
+            "--retrieve-queries", "5",
+            "--dim", "64",
+            "--output", str(output),
+        ]
+    )
+
+    results = json.loads(output.read_text())
+    assert results["ingest"]["docs_per_sec"] > 0
+    for name in ("query", "query_filtered", "retrieve"):
+        assert results[name]["count"] > 0
+        assert results[name]["p50_ms"] <= results[name]["p99_ms"]
+    assert results["startup_s"] >= 0
+    assert results["memory_final"]["peak_rss_mb"] > 0
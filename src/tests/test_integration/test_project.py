@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch
+from unittest.mock import patch, AsyncMock, MagicMock
 from src.presentation.api.main import app, vector_db
 
 client = TestClient(app)
@@ -23,14 +23,17 @@ def setup_and_teardown():
     vector_db._rebuild_index()
 
 
-@patch("src.infrastructure.services.langchain_service.requests.post")
+@patch(
+    "src.infrastructure.services.langchain_service.httpx.AsyncClient.post",
+    new_callable=AsyncMock,
+)
 def test_full_workflow(mock_post):
     """
     Test the full workflow: ingestion, retrieval, and deletion.
     """
 
     # Mock the Ollama API response
-    mock_post.return_value.status_code = 200
+    mock_post.return_value = MagicMock(status_code=200)
     mock_post.return_value.json.return_value = {
         "response": "This is a mocked response from Ollama."
     }
@@ -1,6 +1,9 @@
-from src.presentation.api.main import app, mediator, vector_db
+from src.presentation.api.main import app, mediator, vector_db, warm_up
+from src.infrastructure.services.warmup import WarmUp
 from src.domain.entities.document import Document  # Import the Document class
 from fastapi.testclient import TestClient
+import json
+from unittest.mock import patch
 
 client = TestClient(app)
 
@@ -17,6 +20,20 @@ def test_ingest_endpoint():
     assert response.json() == {"message": "Data ingested successfully"}
 
 
+def test_ingest_batch_endpoint():
+    response = client.post(
+        "/ingest/batch",
+        json={
+            "documents": [
+                {"content": "Frigatebirds sleep while flying.", "metadata": {}},
+                {"content": "Blue whales are the largest animals.", "metadata": {}},
+            ]
+        },
+    )
+    assert response.status_code == 200
+    assert response.json() == {"message": "2 documents ingested successfully"}
+
+
 def test_retrieve_endpoint():
     # First, ingest a document
     client.post(
@@ -40,3 +57,150 @@ def test_delete_endpoint():
     assert response.json() == {
         "message": f"Document with ID {document_id} deleted successfully"
     }
+
+
+def test_delete_batch_endpoint():
+    vector_db.add_documents(
+        [
+            Document(id="batch-1", content="Test content", metadata={}),
+            Document(id="batch-2", content="Test content", metadata={}),
+        ]
+    )
+    response = client.post("/delete/batch", json={"ids": ["batch-1", "batch-2"]})
+    assert response.status_code == 200
+    assert response.json() == {"message": "2 documents deleted successfully"}
+    assert vector_db.documents.row_ids_for(["batch-1", "batch-2"]) == []
+
+    # Unknown and repeated ids are not counted
+    vector_db.add_document(Document(id="batch-3", content="Test", metadata={}))
+    response = client.post(
+        "/delete/batch", json={"ids": ["batch-3", "batch-3", "missing"]}
+    )
+    assert response.json() == {"message": "1 documents deleted successfully"}
+
+
+def test_retrieve_stream_endpoint():
+    vector_db.add_document(Document(id="stream-1", content="Test content", metadata={}))
+
+    async def tokens(prompt):
+        for token in ["Hello", " world"]:
+            yield token
+
+    with patch.object(
+        mediator.langchain_service, "generate_response_stream_async", tokens
+    ):
+        response = client.post("/retrieve/stream", json={"query": "Test content"})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [block for block in response.text.split("\n\n") if block]
+    assert events[0].startswith("event: documents\n")
+    assert events[1:] == [
+        'event: token\ndata: "Hello"',
+        'event: token\ndata: " world"',
+        "event: done\ndata: null",
+    ]
+
+
+def test_retrieve_batch_endpoint_streams_jsonl():
+    client.post("/ingest", json={"content": "Gateway error GW-504", "metadata": {}})
+
+    async def answer(prompt):
+        return "Answer."
+
+    body = "\n".join(
+        [
+            '{"id": "a", "query": "GW-504", "mode": "lexical"}',
+            '{"id": "b", "query": "Test content"}',
+            '{"id": "c"}',
+        ]
+    )
+    with patch.object(mediator.langchain_service, "generate_response_async", answer):
+        response = client.post("/retrieve/batch", content=body)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    results = {
+        result["id"]: result
+        for result in map(json.loads, response.text.splitlines())
+    }
+    assert set(results) == {"a", "b", "c"}
+    assert results["a"]["index"] == 0
+    assert results["a"]["retrieved_documents"][0]["content"] == "Gateway error GW-504"
+    assert results["b"]["generated_response"] == "Answer."
+    assert set(results["b"]["timings"]) == {"search", "generate", "total"}
+    assert results["c"]["error"] == "Query field is required"
+
+    response = client.post("/retrieve/batch", content='{"query": "x"}\nnot json')
+    assert response.status_code == 400
+
+
+def test_retrieve_stream_rejects_invalid_criteria_before_streaming():
+    response = client.post(
+        "/retrieve/stream",
+        json={"query": "Test content", "filters": {"year": {"$near": 2000}}},
+    )
+    assert response.status_code == 400
+
+    response = client.post("/retrieve/stream", json={"query": ""})
+    assert response.status_code == 400
+
+
+def test_retrieve_with_invalid_filter_is_rejected():
+    response = client.post(
+        "/retrieve",
+        json={"query": "Test content", "filters": {"year": {"$near": 2000}}},
+    )
+    assert response.status_code == 400
+
+    response = client.post(
+        "/retrieve", json={"query": "Test content", "filters": {"tags": ["a"]}}
+    )
+    assert response.status_code == 400
+
+
+def test_retrieve_mode_is_selected_per_request():
+    client.post("/ingest", json={"content": "Gateway error GW-503", "metadata": {}})
+
+    response = client.post("/retrieve", json={"query": "GW-503", "mode": "lexical"})
+    assert response.status_code == 200
+    documents = response.json()["results"]["retrieved_documents"]
+    assert documents[0]["content"] == "Gateway error GW-503"
+
+    response = client.post("/retrieve", json={"query": "GW-503", "mode": "sparse"})
+    assert response.status_code == 422
+
+
+def test_metrics_endpoint_and_trace_id():
+    client.post("/ingest", json={"content": "Metrics content", "metadata": {}})
+    response = client.post(
+        "/retrieve",
+        json={"query": "Metrics content"},
+        headers={"X-Request-ID": "trace-123"},
+    )
+    assert response.headers["X-Request-ID"] == "trace-123"
+    assert client.get("/ingest-missing").headers["X-Request-ID"]
+
+    metrics = client.get("/metrics")
+    assert metrics.status_code == 200
+    assert 'rag_stage_duration_seconds_count{stage="embed"}' in metrics.text
+    assert 'rag_stage_duration_seconds_count{stage="search"}' in metrics.text
+    assert 'rag_index_size{kind="vectors"}' in metrics.text
+    assert (
+        'rag_http_request_duration_seconds_count{method="POST",route="/retrieve",'
+        'status="200"}' in metrics.text
+    )
+
+
+def test_health_and_readiness_endpoints():
+    assert client.get("/healthz").json() == {"status": "ok"}
+
+    warm_up.state = WarmUp.PENDING
+    response = client.get("/readyz")
+    assert response.status_code == 503
+    assert response.json()["status"] == "pending"
+
+    warm_up.run()
+    response = client.get("/readyz")
+    assert response.status_code == 200
+    assert set(response.json()["timings"]) == {"index", "embedding_model"}